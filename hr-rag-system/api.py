@@ -7,30 +7,114 @@ Sürekli çalışan model servisi - istemciler API üzerinden bağlanır
 
 import os
 import io
+import sys
+import time
 import base64
+import hashlib
 import logging
 import asyncio
+import threading
+from collections import Counter
+from typing import Optional
 from contextlib import asynccontextmanager
-from fastapi import FastAPI, HTTPException, BackgroundTasks
+from fastapi import FastAPI, HTTPException, BackgroundTasks, Query, Header, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from pydantic import BaseModel
 from PIL import Image
+import numpy as np
 from transformers import Qwen2_5_VLForConditionalGeneration, AutoProcessor
-from qwen_vl_utils import process_vision_info
+from qwen_vl_utils import process_vision_info, smart_resize
 import torch
 import uvicorn
 
-# Global değişkenler
-model = None
-processor = None
-device = None
+from tracing import Tracer, REQUEST_ID_HEADER
+
+# Global değişkenler - etkin model örneği (ModelSlot); sıcak değişimde atomik olarak değişir
+active_slot = None
 model_loaded = False
 
 # Logging ayarları
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Uyarlanabilir ön işleme: analiz örneğinin uzun kenarı ve gürültü kırpıntısı
+ANALYSIS_LONG_EDGE = 512
+NOISE_CROP = 256
+
+# Tarif eşikleri (enhance_contrast.py ile aynı ölçekler)
+FULL_MAX_SPREAD = 140  # p1-p99 gri aralığı bunun altındaysa düşük kontrast
+FULL_MIN_SATURATION = 0.15  # arka plan doygunluğu bunun üstündeyse renkli zemin
+LIGHT_MAX_SPREAD = 200
+LIGHT_MIN_NOISE = 3.0  # gürültü sigması (gri seviye)
+
+PREPROCESS_RECIPES = ('none', 'light', 'full')
+
+# Tam tarifin megapiksel başına süresi (ms) - ölçümle güncellenir, kazanç tahmini için
+_full_ms_per_mp = {"value": 40.0}
+_full_lock = threading.Lock()
+
+# Profil araçları (OCR_PROFILING=1 ile açılır; kapalıyken /debug/profile 404 döner,
+# istek başına profile=true yok sayılır ve tek maliyet bir bayrak kontrolüdür)
+PROFILING_ENABLED = os.environ.get('OCR_PROFILING', '0') == '1'
+PROFILE_MAX_SECONDS = 300
+PROFILE_TOP_N = 25
+
+# Bu süreyi (sn) aşan isteklerin aşama süreleri loglanır (0: kapalı)
+SLOW_REQUEST_SECONDS = float(os.environ.get('OCR_SLOW_REQUEST_SECONDS', '30'))
+
+# Aynı anda tek örnekleyici profil çalışır
+_sampler_lock = threading.Lock()
+
+# İstek izleme: traceparent / X-Request-ID başlıkları, span'ler OCR_TRACE_FILE'a
+tracer = Tracer("api.py")
+
+# Sabit çözünürlük sınırları (OCR_ADAPTIVE_RESOLUTION=0 iken vision token sayısını belirler)
+MIN_PIXELS = 640 * 28 * 28
+MAX_PIXELS = 1024 * 28 * 28
+
+# Uyarlanabilir çözünürlük: görüntü başına vision token sayısı, küçük resimdeki glif
+# yüksekliği modelin girdisinde TARGET_CHAR_PX olacak şekilde seçilir (sınırlar içinde).
+ADAPTIVE_RESOLUTION = os.environ.get('OCR_ADAPTIVE_RESOLUTION', '1') == '1'
+MIN_VISION_TOKENS = int(os.environ.get('OCR_MIN_VISION_TOKENS', '128'))
+MAX_VISION_TOKENS = int(os.environ.get('OCR_MAX_VISION_TOKENS', '1024'))
+TARGET_CHAR_PX = float(os.environ.get('OCR_TARGET_CHAR_PX', '14'))
+DENSITY_LONG_EDGE = 1024  # yoğunluk tahmini küçük resminin uzun kenarı
+MIN_GLYPHS = 8  # bundan az glif: metinsiz sayılır, en düşük çözünürlük
+VISION_PATCH_PIXELS = 28 * 28
+
+# Bellek denetimi: isteklerin tahmini çalışma belleği bütçeye sığdıkça kabul edilir.
+# Bütçe verilmezse süreç sınırı (OCR_MEMORY_LIMIT_MB, yoksa cgroup/RAM'in %85'i)
+# eksi model yüklendikten sonraki RSS'tir.
+MEMORY_BUDGET_MB = float(os.environ.get('OCR_MEMORY_BUDGET_MB', '0'))
+MEMORY_LIMIT_MB = float(os.environ.get('OCR_MEMORY_LIMIT_MB', '0'))
+MEMORY_SAFETY_FACTOR = float(os.environ.get('OCR_MEMORY_SAFETY', '1.25'))
+ADMISSION_TIMEOUT_SECONDS = float(os.environ.get('OCR_ADMISSION_TIMEOUT', '300'))
+
+# Yardımlı (spekülatif) çözme: greedy | prompt_lookup | draft. Açgözlü doğrulama
+# sayesinde çıktı greedy ile aynıdır; yalnızca ana modelin ileri geçiş sayısı azalır.
+DECODING_MODES = ('greedy', 'prompt_lookup', 'draft')
+DEFAULT_DECODING = os.environ.get('OCR_DECODING', 'greedy')
+PROMPT_LOOKUP_TOKENS = int(os.environ.get('OCR_PROMPT_LOOKUP_TOKENS', '10'))
+# Taslak model aynı tokenizer'ı ve görüntü token düzenini kullanmalı (ör. Qwen/Qwen2-VL-2B-Instruct)
+DRAFT_MODEL_ID = os.environ.get('OCR_DRAFT_MODEL')
+
+# Model ayarları (başlangıç değerleri; /admin/model ile kesintisiz değiştirilebilir)
+MODEL_ID = os.environ.get('OCR_MODEL_ID', 'Qwen/Qwen2.5-VL-3B-Instruct')
+MODEL_REVISION = os.environ.get('OCR_MODEL_REVISION')
+MODEL_DTYPE = os.environ.get('OCR_MODEL_DTYPE', 'auto')  # auto | float32 | float16 | bfloat16
+MODEL_DTYPES = ('auto', 'float32', 'float16', 'bfloat16')
+
+# Sıcak değişim: OCR_ADMIN_TOKEN verilmezse /admin uçları kapalıdır (404)
+ADMIN_TOKEN = os.environ.get('OCR_ADMIN_TOKEN')
+WARMUP_ENABLED = os.environ.get('OCR_WARMUP', '1') == '1'
+SWAP_DRAIN_TIMEOUT_SECONDS = float(os.environ.get('OCR_SWAP_DRAIN_TIMEOUT', '600'))
+
+# İleri geçiş sayacı thread başınadır (eşzamanlı istekler ayrı thread'lerde çalışır)
+_decoding_local = threading.local()
+_decoding_totals = {}
+_decoding_lock = threading.Lock()
+
 # Request/Response modelleri
 class OCRRequest(BaseModel):
     image: str  # Base64 encoded image
@@ -74,12 +158,32 @@ QUALITY STANDARDS:
 Uncertain character → [?]  
 Unreadable section → [...]"""
     max_tokens: int = 4096
+    preprocess: str = "auto"  # auto | none | light | full
+    decoding: str = ""  # greedy | prompt_lookup | draft (boşsa OCR_DECODING)
+    profile: bool = False  # OCR_PROFILING=1 ise isteğin profil özeti yanıtta döner
+    profiler: str = "cprofile"  # cprofile | torch
 
 class OCRResponse(BaseModel):
     success: bool
     text: str = ""
     error: str = ""
     processing_time: float = 0.0
+    preprocessing: dict = {}
+    stages: dict = {}
+    decoding: dict = {}
+    profile: dict = {}
+    trace_id: str = ""
+    coalesced: bool = False  # Aynı anda gelen özdeş isteğin sonucu paylaşıldı
+    model: dict = {}  # Yanıtı üreten modelin kimliği (istemci önbellek anahtarı)
+
+class ModelSwapRequest(BaseModel):
+    # Verilmeyen alanlar etkin modelin ayarlarını korur
+    model_id: Optional[str] = None
+    revision: Optional[str] = None  # snapshot (commit, etiket, dal)
+    dtype: Optional[str] = None  # auto | float32 | float16 | bfloat16
+    min_vision_tokens: Optional[int] = None
+    max_vision_tokens: Optional[int] = None
+    draft_model: Optional[str] = None  # "" taslak modeli kapatır
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -94,68 +198,226 @@ async def lifespan(app: FastAPI):
     logger.info("⏹️ Qwen OCR API kapatılıyor...")
     await cleanup_model()
 
+class ModelSlot:
+    """
+    Yüklü model örneği: model, processor, taslak model ve ayarları
+
+    Her istek başladığında etkin slot'u sabitler (pin/unpin, active sayacı)
+    ve sonuna kadar onu kullanır; sıcak değişimde eski slot emekliye ayrılır
+    (retire) ve son isteği bittiğinde bırakılır. Kullanıcısı olan slot asla
+    boşaltılmaz. Sayaç yalnızca olay döngüsünde değişir.
+    """
+
+    def __init__(self, version, settings, model, processor, device, draft_model=None):
+        self.version = version
+        self.settings = settings
+        self.model = model
+        self.processor = processor
+        self.device = device
+        self.draft_model = draft_model
+        self.active = 0
+        self.footprint = 0  # Yükleme sırasındaki RSS artışı (bayt)
+        self.load_seconds = 0.0
+        self.warmup_seconds = 0.0
+        self.loaded_at = time.time()
+        self._on_idle = None  # Emekliye ayrılınca son istek bittiğinde çağrılır
+
+    def pin(self):
+        self.active += 1
+
+    def unpin(self):
+        self.active -= 1
+        if self.active == 0 and self._on_idle is not None:
+            callback, self._on_idle = self._on_idle, None
+            callback()
+
+    def retire(self, callback):
+        """Yeni istek almayan slot'u boşalınca bırak (kullanan istek yoksa hemen)"""
+        if self.active == 0:
+            callback()
+        else:
+            self._on_idle = callback
+
+    def identity(self):
+        """Çıktıyı belirleyen ayarlar; taslak model çıktıyı değiştirmediği için dahil değil"""
+        return {key: self.settings[key] for key in
+                ("model_id", "revision", "dtype", "min_vision_tokens", "max_vision_tokens")}
+
+    def describe(self):
+        return {
+            "version": self.version,
+            "identity": self.identity(),
+            **self.settings,
+            "device": str(self.device),
+            "draft_loaded": self.draft_model is not None,
+            "footprint_mb": round(self.footprint / 1024**2, 1),
+            "load_seconds": round(self.load_seconds, 1),
+            "warmup_seconds": round(self.warmup_seconds, 1),
+            "active_requests": self.active,
+            "retiring": self._on_idle is not None,
+        }
+
+def default_model_settings():
+    """Ortam değişkenlerinden başlangıç model ayarları"""
+    return {
+        "model_id": MODEL_ID,
+        "revision": MODEL_REVISION,
+        "dtype": MODEL_DTYPE,
+        "min_vision_tokens": MIN_VISION_TOKENS,
+        "max_vision_tokens": MAX_VISION_TOKENS,
+        "draft_model": DRAFT_MODEL_ID,
+    }
+
+def _torch_dtype(name):
+    if name == "auto":
+        return torch.float16 if torch.cuda.is_available() else torch.float32
+    return getattr(torch, name)
+
+def load_model_instance(settings, version):
+    """
+    Ayarlara göre yeni model örneği yükle (bloklayan; thread'de çağrılır)
+
+    Returns:
+        ModelSlot: Isınmamış, henüz trafiğe açılmamış örnek
+    """
+    start = time.perf_counter()
+    rss_before = current_rss_bytes()
+
+    # GPU kontrolü
+    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+    logger.info(f"🤖 Qwen modeli yükleniyor: {settings['model_id']} ({settings['dtype']}, {device})")
+
+    # GPU optimizasyonları
+    if torch.cuda.is_available():
+        # Memory fraction ayarı
+        torch.cuda.set_per_process_memory_fraction(0.85)
+        # Diğer optimizasyonlar
+        torch.backends.cuda.matmul.allow_tf32 = True
+        torch.backends.cudnn.benchmark = True
+        os.environ['PYTORCH_CUDA_ALLOC_CONF'] = "max_split_size_mb:256,garbage_collection_threshold:0.6,expandable_segments:True"
+
+    # Processor yükle
+    processor = AutoProcessor.from_pretrained(
+        settings["model_id"],
+        revision=settings["revision"],
+        trust_remote_code=True,
+        # Görüntüler run_ocr'da boyutlandırılır; processor yalnızca dış sınırları uygular
+        min_pixels=min(MIN_PIXELS, settings["min_vision_tokens"] * VISION_PATCH_PIXELS),
+        max_pixels=max(MAX_PIXELS, settings["max_vision_tokens"] * VISION_PATCH_PIXELS),
+    )
+
+    # Model yükle
+    model = Qwen2_5_VLForConditionalGeneration.from_pretrained(
+        settings["model_id"],
+        revision=settings["revision"],
+        torch_dtype=_torch_dtype(settings["dtype"]),
+        device_map="auto" if torch.cuda.is_available() else "cpu",
+        trust_remote_code=True,
+        low_cpu_mem_usage=True,
+        max_memory={0: "5.1GB", "cpu": "8GB"} if torch.cuda.is_available() else None,
+    )
+
+    model.eval()
+    install_decoding_counter(model)
+
+    draft_model = None
+    if settings["draft_model"]:
+        draft_model = load_draft_model(settings["draft_model"], _torch_dtype(settings["dtype"]))
+
+    slot = ModelSlot(version, settings, model, processor, device, draft_model)
+    slot.footprint = max(0, current_rss_bytes() - rss_before)
+    slot.load_seconds = time.perf_counter() - start
+    logger.info(f"✅ Model yüklendi: v{version} ({slot.load_seconds:.1f}s)")
+    return slot
+
+def _warmup_image():
+    """Isınma için yoğun metinli sentetik sayfa (en yüksek vision token boyutu)"""
+    from PIL import ImageDraw
+
+    image = Image.new("RGB", (1240, 1754), "white")
+    draw = ImageDraw.Draw(image)
+    for row in range(60):
+        draw.text((60, 40 + row * 28), "Isinma 0123456789 PERSONEL IZIN FORMU tablo satiri", fill="black")
+    return image
+
+def warm_up(slot):
+    """
+    Örneği trafiğe açmadan önce kısa bir çıkarımla ısıt (bloklayan)
+
+    İlk çağrıdaki çekirdek seçimi, bellek ayırma ve tembel başlatmalar
+    kullanıcı isteğine yansımaz.
+    """
+    if not WARMUP_ENABLED:
+        return
+    start = time.perf_counter()
+    request = OCRRequest(image="", max_tokens=8, preprocess="none", decoding="greedy")
+    run_ocr(request, _warmup_image(), StageTimer(), slot, warmup=True)
+    slot.warmup_seconds = time.perf_counter() - start
+    logger.info(f"🔥 Model v{slot.version} ısındı ({slot.warmup_seconds:.1f}s)")
+
+def activate_slot(slot):
+    """Yeni istekleri slot'a yönlendir (olay döngüsünde; atomik atama)"""
+    global active_slot, model_loaded
+    active_slot = slot
+    model_loaded = True
+
 async def load_model_async():
     """Qwen modelini asenkron yükle"""
-    global model, processor, device, model_loaded
+    global model_loaded
 
     try:
-        logger.info("🤖 Qwen modeli yükleniyor...")
-
-        # GPU kontrolü
-        device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-        logger.info(f"📊 Kullanılacak cihaz: {device}")
+        slot = await asyncio.to_thread(load_model_instance, default_model_settings(), 1)
+        await asyncio.to_thread(warm_up, slot)
+        activate_slot(slot)
+        memory_governor.configure(current_rss_bytes())
+        logger.info("✅ Model başarıyla yüklendi ve hazır!")
 
-        # Model ID - Hugging Face'den yükle
-        model_id = "Qwen/Qwen2.5-VL-3B-Instruct"
+    except Exception as e:
+        logger.error(f"❌ Model yükleme hatası: {e}")
+        model_loaded = False
+        raise
 
-        # GPU optimizasyonları
-        if torch.cuda.is_available():
-            # Memory fraction ayarı
-            torch.cuda.set_per_process_memory_fraction(0.85)
-            # Diğer optimizasyonlar
-            torch.backends.cuda.matmul.allow_tf32 = True
-            torch.backends.cudnn.benchmark = True
-            os.environ['PYTORCH_CUDA_ALLOC_CONF'] = "max_split_size_mb:256,garbage_collection_threshold:0.6,expandable_segments:True"
-
-        # Processor yükle
-        processor = AutoProcessor.from_pretrained(
-            model_id,
-            trust_remote_code=True,
-            min_pixels=640 * 28 * 28,
-            max_pixels=1024 * 28 * 28,
-        )
+def load_draft_model(model_id, dtype=None):
+    """Yardımlı çözme için taslak modeli yükle; başarısızsa None (draft modu kapalı kalır)"""
+    try:
+        from transformers import AutoModelForVision2Seq
 
-        # Model yükle
-        model = Qwen2_5_VLForConditionalGeneration.from_pretrained(
+        logger.info(f"🤖 Taslak model yükleniyor: {model_id}")
+        draft = AutoModelForVision2Seq.from_pretrained(
             model_id,
-            torch_dtype=torch.float16 if torch.cuda.is_available() else torch.float32,
+            torch_dtype=dtype or _torch_dtype("auto"),
             device_map="auto" if torch.cuda.is_available() else "cpu",
             trust_remote_code=True,
             low_cpu_mem_usage=True,
-            max_memory={0: "5.1GB", "cpu": "8GB"} if torch.cuda.is_available() else None,
         )
+        draft.eval()
+        logger.info("✅ Taslak model hazır")
+        return draft
+    except Exception as e:
+        logger.warning(f"⚠️ Taslak model yüklenemedi, draft modu kapalı: {e}")
+        return None
 
-        model.eval()
-        model_loaded = True
-        logger.info("✅ Model başarıyla yüklendi ve hazır!")
+def release_slot(slot):
+    """Eski örneğin belleğini bırak"""
+    import gc
 
-    except Exception as e:
-        logger.error(f"❌ Model yükleme hatası: {e}")
-        model_loaded = False
-        raise
+    slot.model = None
+    slot.draft_model = None
+    slot.processor = None
+    gc.collect()
+    if torch.cuda.is_available():
+        torch.cuda.empty_cache()
 
 async def cleanup_model():
     """Model temizliği"""
-    global model, processor, device, model_loaded
+    global active_slot, model_loaded
 
     try:
         if torch.cuda.is_available():
             torch.cuda.empty_cache()
             torch.cuda.synchronize()
 
-        model = None
-        processor = None
-        device = None
+        active_slot = None
         model_loaded = False
 
         logger.info("🧹 Model temizliği tamamlandı")
@@ -186,8 +448,8 @@ async def root():
     return {
         "status": "running",
         "model_loaded": model_loaded,
-        "device": str(device) if device else "not loaded",
-        "model": "Qwen/Qwen2.5-VL-3B-Instruct"
+        "device": str(active_slot.device) if active_slot else "not loaded",
+        "model": active_slot.settings["model_id"] if active_slot else MODEL_ID
     }
 
 @app.get("/health")
@@ -197,59 +459,192 @@ async def health_check():
         "status": "healthy" if model_loaded else "model_not_loaded",
         "model_loaded": model_loaded,
         "gpu_memory": torch.cuda.get_device_properties(0).total_memory / 1024**3 if torch.cuda.is_available() else 0,
-        "gpu_used": torch.cuda.memory_allocated(0) / 1024**3 if torch.cuda.is_available() else 0
+        "gpu_used": torch.cuda.memory_allocated(0) / 1024**3 if torch.cuda.is_available() else 0,
+        "memory": memory_governor.status(),
+        "coalescing": request_coalescer.status(),
+        "decoding": decoding_summary(),
+        "model": active_slot.describe() if active_slot else None,
+        "swap": model_swapper.status()
     }
 
 @app.post("/ocr", response_model=OCRResponse)
-async def extract_text(request: OCRRequest, background_tasks: BackgroundTasks):
+async def extract_text(
+    request: OCRRequest,
+    background_tasks: BackgroundTasks,
+    response: Response,
+    traceparent: str = Header(None),
+    x_request_id: str = Header(None),
+):
     """Görüntüden metin çıkarma"""
 
-    if not model_loaded:
+    # İstemcinin trace bağlamı (yoksa yeni trace); kimlik yanıt başlığında geri döner
+    with tracer.span("api.ocr", traceparent=traceparent, request_id=x_request_id) as span:
+        response.headers[REQUEST_ID_HEADER] = span.trace_id
+        response.headers["traceparent"] = span.traceparent()
+        if request.profile:
+            # Profil isteğe özeldir, paylaşılmaz
+            result = await _extract_text(request, span)
+        else:
+            # Özdeş istek zaten çalışıyorsa onun sonucunu bekle (yeniden deneme, tekrar gönderim)
+            started = time.perf_counter()
+            result, leader_trace = await request_coalescer.run(
+                coalesce_key(request), lambda: _extract_text(request, span))
+            if leader_trace is not None:
+                span.set(coalesced_with=leader_trace)
+                result = result.model_copy(update={
+                    "coalesced": True,
+                    "trace_id": span.trace_id,
+                    "processing_time": time.perf_counter() - started,
+                })
+        span.set(success=result.success, processing_time=round(result.processing_time, 3))
+        if not result.success:
+            span.status = "error"
+            span.set(error=result.error)
+        return result
+
+async def _extract_text(request, span):
+    if not model_loaded or active_slot is None:
+        span.set(error="model_not_loaded")
         raise HTTPException(status_code=503, detail="Model henüz yüklenmedi")
 
-    import time
-    start_time = time.time()
+    # İstek sonuna kadar aynı model örneğini kullanır (sıcak değişimde eski örnek boşaltılır)
+    slot = active_slot
+    slot.pin()
+    try:
+        return await _extract_with_slot(request, span, slot)
+    finally:
+        slot.unpin()
+
+async def _extract_with_slot(request, span, slot):
+    timer = StageTimer(span)
+    profiler = None
+    profile = {}
+    if request.profile:
+        if PROFILING_ENABLED:
+            profiler = RequestProfiler(request.profiler)
+        else:
+            profile = {"error": "Profil kapalı (OCR_PROFILING=1 ile açın)"}
+
+    def work(image):
+        # Profil, çıkarımın çalıştığı thread'de başlatılmalı
+        if profiler:
+            profiler.start()
+        try:
+            return run_ocr(request, image, timer, slot)
+        finally:
+            if profiler:
+                profile.update(profiler.stop())
 
     try:
-        logger.info("🔍 OCR isteği işleniyor...")
+        logger.info(f"🔍 OCR isteği işleniyor... (trace: {span.trace_id})")
 
-        # Base64'ten görüntüyü decode et
-        image_data = base64.b64decode(request.image)
-        image = Image.open(io.BytesIO(image_data))
+        # Yalnızca başlık okunur; pikseller kabulden sonra açılır
+        image = Image.open(io.BytesIO(base64.b64decode(request.image)))
+        estimate = estimate_request_memory(image.size, request, slot)
+        span.set(memory_estimate_mb=estimate["total_mb"], vision_tokens=estimate["vision_tokens"],
+                 model_version=slot.version)
 
-        # Gelişmiş preprocessing - renkli arka plan problemini çöz
-        image = enhance_for_colored_backgrounds(image)
-        logger.info("Renkli arka plan optimizasyonu uygulandı")
-
-        # Prompt hazırla
-        prompt = request.prompt
-
-        # Mesajları hazırla
-        messages = [
-            {
-                "role": "user",
-                "content": [
-                    {"type": "text", "text": prompt},
-                    {"type": "image", "image": image},
-                ],
-            }
-        ]
-
-        # Model çıkarımı
-        prompt_text = processor.apply_chat_template(
-            messages, tokenize=False, add_generation_prompt=True
+        async with memory_governor.reserve(estimate["total_bytes"]) as waited:
+            timer.mark("admission", model_version=slot.version, memory_estimate_mb=estimate["total_mb"],
+                       vision_tokens=estimate["vision_tokens"], admission_wait_ms=round(waited * 1000, 1))
+            # Çıkarım thread'de: olay döngüsü (/health, kuyruk) bloklanmaz
+            clean_text, preprocessing, decoding = await asyncio.to_thread(work, image)
+
+        processing_time = timer.elapsed()
+        logger.info("%.2f", processing_time)
+        log_if_slow(timer, preprocessing=preprocessing.get("recipe"), max_tokens=request.max_tokens)
+        return OCRResponse(
+            success=True,
+            text=clean_text,
+            processing_time=processing_time,
+            preprocessing=preprocessing,
+            stages=timer.report(),
+            decoding=decoding,
+            profile=profile,
+            trace_id=span.trace_id,
+            model=slot.identity()
         )
 
-        image_inputs, video_inputs = process_vision_info(messages)
+    except HTTPException:
+        raise
+    except Exception as e:
+        processing_time = timer.elapsed()
+        logger.error(f"❌ OCR hatası: {e}")
+        log_if_slow(timer, error=str(e))
+
+        return OCRResponse(
+            success=False,
+            error=str(e),
+            processing_time=processing_time,
+            stages=timer.report(),
+            profile=profile,
+            trace_id=span.trace_id
+        )
 
-        inputs = processor(
-            text=[prompt_text],
-            images=image_inputs,
-            videos=video_inputs,
-            padding=True,
-            return_tensors="pt",
-        ).to(device)
+def run_ocr(request, image, timer, slot=None, warmup=False):
+    """
+    Tek OCR isteğinin çıkarımı (aşama süreleri timer'a işlenir)
 
+    Args:
+        image: Başlığı okunmuş, pikselleri henüz yüklenmemiş PIL görüntüsü
+        slot: Kullanılacak model örneği (varsayılan: etkin örnek)
+        warmup: Isınma çağrısı; çözme istatistikleri süreç toplamlarına eklenmez
+
+    Returns:
+        tuple: (temizlenmiş metin, ön işleme kaydı, çözme istatistikleri)
+    """
+    slot = slot or active_slot
+    model, processor = slot.model, slot.processor
+    mode = request.decoding or DEFAULT_DECODING
+    decoding_kwargs = assisted_decoding_kwargs(mode, slot)
+    image.load()
+    timer.mark("decode", width=image.size[0], height=image.size[1])
+
+    # Uyarlanabilir preprocessing - gerekmiyorsa geliştirme atlanır
+    image, preprocessing = adaptive_preprocess(image, request.preprocess)
+    logger.info(f"Ön işleme: {preprocessing['recipe']} (~{preprocessing['saved_ms']} ms kazanç)")
+
+    # Vision token bütçesi: seyrek/iri yazılı görüntü daha az token alır
+    preprocessing["vision"] = plan_vision_resolution(image, slot.settings)
+    timer.mark("preprocess", vision_tokens=preprocessing["vision"]["tokens"])
+
+    # Prompt hazırla
+    prompt = request.prompt
+
+    # Mesajları hazırla
+    messages = [
+        {
+            "role": "user",
+            "content": [
+                {"type": "text", "text": prompt},
+                {
+                    "type": "image",
+                    "image": image,
+                    "resized_height": preprocessing["vision"]["height"],
+                    "resized_width": preprocessing["vision"]["width"],
+                },
+            ],
+        }
+    ]
+
+    # Model çıkarımı
+    prompt_text = processor.apply_chat_template(
+        messages, tokenize=False, add_generation_prompt=True
+    )
+
+    image_inputs, video_inputs = process_vision_info(messages)
+
+    inputs = processor(
+        text=[prompt_text],
+        images=image_inputs,
+        videos=video_inputs,
+        padding=True,
+        return_tensors="pt",
+    ).to(slot.device)
+    timer.mark("processor", input_tokens=int(inputs.input_ids.shape[1]))
+
+    counter = _decoding_local.counter = {"calls": 0, "drafted": 0}
+    try:
         with torch.no_grad():
             generated_ids = model.generate(
                 **inputs,
@@ -259,39 +654,718 @@ async def extract_text(request: OCRRequest, background_tasks: BackgroundTasks):
                 num_beams=1,
                 eos_token_id=getattr(processor.tokenizer, 'eos_token_id', None),
                 pad_token_id=getattr(processor.tokenizer, 'pad_token_id', None),
+                **decoding_kwargs,
             )
+    finally:
+        _decoding_local.counter = None
 
-        # Çıktıyı işle
-        generated_ids_trimmed = [
-            out_ids[len(in_ids):] for in_ids, out_ids in zip(inputs.input_ids, generated_ids)
-        ]
+    # Çıktıyı işle
+    generated_ids_trimmed = [
+        out_ids[len(in_ids):] for in_ids, out_ids in zip(inputs.input_ids, generated_ids)
+    ]
+    generated_tokens = len(generated_ids_trimmed[0])
+    timer.mark("generate", generated_tokens=generated_tokens)
+    decoding = record_decoding(mode, generated_tokens, timer.stages["generate"] / 1000, counter,
+                               accumulate=not warmup)
 
-        output_text = processor.batch_decode(
-            generated_ids_trimmed,
-            skip_special_tokens=True,
-            clean_up_tokenization_spaces=False
-        )[0]
+    output_text = processor.batch_decode(
+        generated_ids_trimmed,
+        skip_special_tokens=True,
+        clean_up_tokenization_spaces=False
+    )[0]
 
-        # Temizle
-        clean_text = clean_output_text(output_text)
-        processing_time = time.time() - start_time
+    # Temizle
+    clean_text = clean_output_text(output_text)
+    timer.mark("postprocess")
 
-        logger.info("%.2f", processing_time)
-        return OCRResponse(
-            success=True,
-            text=clean_text,
-            processing_time=processing_time
-        )
+    return clean_text, preprocessing, decoding
 
-    except Exception as e:
-        processing_time = time.time() - start_time
-        logger.error(f"❌ OCR hatası: {e}")
+def assisted_decoding_kwargs(mode, slot):
+    """Çözme moduna göre generate() argümanları"""
+    if mode not in DECODING_MODES:
+        raise ValueError(f"Geçersiz çözme modu: {mode}")
+    if mode == "prompt_lookup":
+        # Taslaklar dizideki (prompt + üretilen) n-gram eşleşmelerinden gelir
+        return {"prompt_lookup_num_tokens": PROMPT_LOOKUP_TOKENS}
+    if mode == "draft":
+        if slot.draft_model is None:
+            raise ValueError("Taslak model yüklü değil (OCR_DRAFT_MODEL)")
+        return {"assistant_model": slot.draft_model}
+    return {}
 
-        return OCRResponse(
-            success=False,
-            error=str(e),
-            processing_time=processing_time
-        )
+def install_decoding_counter(target):
+    """
+    Ana modelin ileri geçişlerini say (kabul oranı için)
+
+    Prefill'den sonraki her geçişin girdi uzunluğu 1 + doğrulanan taslak token
+    sayısıdır; sayaç yalnızca run_ocr'ın thread'inde etkin iken işler.
+    """
+    if not hasattr(target, "register_forward_pre_hook"):
+        return
+
+    def count(module, args, kwargs):
+        counter = getattr(_decoding_local, "counter", None)
+        if counter is None:
+            return
+        tokens = kwargs.get("input_ids")
+        if tokens is None:
+            tokens = kwargs.get("inputs_embeds")
+        if counter["calls"] and tokens is not None:
+            counter["drafted"] += max(0, int(tokens.shape[1]) - 1)
+        counter["calls"] += 1
+
+    target.register_forward_pre_hook(count, with_kwargs=True)
+
+def record_decoding(mode, generated_tokens, seconds, counter, accumulate=True):
+    """
+    İsteğin çözme istatistikleri ve süreç toplamlarına ekleme
+
+    Her ana model geçişi 1 + kabul edilen taslak token üretir; bu yüzden kabul
+    edilen token = üretilen - geçiş sayısı. accumulate=False (ısınma) ise
+    toplamlar değişmez; soğuk çekirdeklerin süresi hızlanma oranını bozmaz.
+    """
+    calls = counter["calls"]
+    accepted = max(0, generated_tokens - calls) if calls else 0
+    stats = {
+        "mode": mode,
+        "generated_tokens": generated_tokens,
+        "forward_passes": calls,
+        "drafted_tokens": counter["drafted"],
+        "accepted_tokens": accepted,
+        "acceptance_rate": round(accepted / counter["drafted"], 3) if counter["drafted"] else 0.0,
+        "tokens_per_forward": round(generated_tokens / calls, 2) if calls else 0.0,
+        "tokens_per_sec": round(generated_tokens / seconds, 2) if seconds > 0 else 0.0,
+        "generate_seconds": round(seconds, 3),
+    }
+    if not accumulate:
+        return stats
+    with _decoding_lock:
+        totals = _decoding_totals.setdefault(mode, Counter())
+        totals.update(requests=1, tokens=generated_tokens, forwards=calls,
+                      drafted=counter["drafted"], accepted=accepted)
+        totals["seconds"] += seconds
+    return stats
+
+def decoding_summary():
+    """Mod başına toplam token/sn, kabul oranı ve greedy'ye göre hızlanma"""
+    with _decoding_lock:
+        totals = {mode: dict(values) for mode, values in _decoding_totals.items()}
+
+    def rate(values):
+        return values["tokens"] / values["seconds"] if values.get("seconds") else 0.0
+
+    greedy_rate = rate(totals.get("greedy", {}))
+    draft_loaded = active_slot is not None and active_slot.draft_model is not None
+    summary = {"default": DEFAULT_DECODING, "draft_model": active_slot.settings["draft_model"] if draft_loaded else None}
+    for mode, values in totals.items():
+        summary[mode] = {
+            "requests": values.get("requests", 0),
+            "tokens_per_sec": round(rate(values), 2),
+            "acceptance_rate": round(values.get("accepted", 0) / values["drafted"], 3) if values.get("drafted") else 0.0,
+            "speedup_vs_greedy": round(rate(values) / greedy_rate, 2) if greedy_rate and mode != "greedy" else None,
+        }
+    return summary
+
+@app.get("/debug/profile")
+async def debug_profile(
+    seconds: float = Query(10.0, gt=0, le=PROFILE_MAX_SECONDS),
+    interval_ms: float = Query(5.0, ge=1.0, le=1000.0),
+):
+    """
+    Sunucunun N saniyelik örnekleyici profili (OCR_PROFILING=1 gerekir)
+
+    Ayrı bir thread tüm thread'lerin yığınlarını aralıklarla örnekler; model
+    çıkarımı olay döngüsünü bloklasa da örnekleme sürer. Yanıt fonksiyon başına
+    öz/toplam örnek sayıları ve flamegraph için katlanmış yığınları içerir.
+    """
+    if not PROFILING_ENABLED:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not _sampler_lock.acquire(blocking=False):
+        raise HTTPException(status_code=409, detail="Başka bir profil çalışıyor")
+
+    try:
+        sampler = StackSampler(interval_ms / 1000.0)
+        return await asyncio.to_thread(sampler.run, seconds)
+    finally:
+        _sampler_lock.release()
+
+class StageTimer:
+    """
+    İstek aşamalarının süreleri (ms) - perf_counter ile, ihmal edilebilir maliyet
+
+    span verilirse her aşama o span'in alt span'i olarak izleme dosyasına yazılır.
+    """
+
+    def __init__(self, span=None):
+        self.start = self._last = time.perf_counter()
+        self._last_ns = time.time_ns()
+        self.span = span
+        self.stages = {}
+        self.info = {}
+
+    def mark(self, stage, **info):
+        now = time.perf_counter()
+        now_ns = time.time_ns()
+        self.stages[stage] = round((now - self._last) * 1000, 1)
+        if self.span is not None:
+            self.span.tracer.record(stage, self._last_ns, now_ns, self.span, **info)
+        self._last = now
+        self._last_ns = now_ns
+        self.info.update(info)
+
+    def elapsed(self):
+        return time.perf_counter() - self.start
+
+    def report(self):
+        return {**self.stages, "total": round(self.elapsed() * 1000, 1), **self.info}
+
+def log_if_slow(timer, **context):
+    """Eşiği aşan isteğin aşama sürelerini logla"""
+    if SLOW_REQUEST_SECONDS <= 0 or timer.elapsed() < SLOW_REQUEST_SECONDS:
+        return
+    stages = ", ".join(f"{name}={ms:.0f}ms" for name, ms in timer.stages.items())
+    details = ", ".join(f"{key}={value}" for key, value in {**timer.info, **context}.items())
+    trace = f" | trace={timer.span.trace_id}" if timer.span is not None else ""
+    logger.warning(f"🐢 Yavaş istek{trace}: {timer.elapsed():.1f}s (eşik {SLOW_REQUEST_SECONDS:.0f}s) | {stages} | {details}")
+
+class RequestProfiler:
+    """Tek isteğin cProfile veya torch.profiler özeti"""
+
+    def __init__(self, kind="cprofile"):
+        if kind not in ("cprofile", "torch"):
+            raise ValueError(f"Geçersiz profiler: {kind}")
+        self.kind = kind
+        self._profiler = None
+
+    def start(self):
+        if self.kind == "torch":
+            activities = [torch.profiler.ProfilerActivity.CPU]
+            if torch.cuda.is_available():
+                activities.append(torch.profiler.ProfilerActivity.CUDA)
+            self._profiler = torch.profiler.profile(activities=activities)
+            self._profiler.start()
+        else:
+            import cProfile
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+
+    def stop(self):
+        if self.kind == "torch":
+            self._profiler.stop()
+            sort_by = "self_cuda_time_total" if torch.cuda.is_available() else "self_cpu_time_total"
+            summary = self._profiler.key_averages().table(sort_by=sort_by, row_limit=PROFILE_TOP_N)
+        else:
+            import pstats
+            self._profiler.disable()
+            stream = io.StringIO()
+            pstats.Stats(self._profiler, stream=stream).sort_stats("cumulative").print_stats(PROFILE_TOP_N)
+            summary = stream.getvalue()
+        return {"profiler": self.kind, "summary": summary}
+
+def current_rss_bytes():
+    """Sürecin anlık RSS'i (bayt); ölçülemezse 0"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except Exception:
+        return 0
+
+def memory_limit_bytes():
+    """Süreç bellek sınırı: OCR_MEMORY_LIMIT_MB, yoksa cgroup sınırı veya fiziksel RAM'in %85'i"""
+    if MEMORY_LIMIT_MB > 0:
+        return int(MEMORY_LIMIT_MB * 1024 * 1024)
+    limits = []
+    try:
+        limits.append(os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES"))
+    except (ValueError, OSError, AttributeError):
+        pass
+    for path in ("/sys/fs/cgroup/memory.max", "/sys/fs/cgroup/memory/memory.limit_in_bytes"):
+        try:
+            with open(path) as f:
+                value = f.read().strip()
+            if value.isdigit() and int(value) < (1 << 60):
+                limits.append(int(value))
+        except OSError:
+            continue
+    return int(min(limits) * 0.85) if limits else 0
+
+def _model_dims(model):
+    """Bellek tahmini için model boyutları (config yoksa Qwen2.5-VL-3B değerleri)"""
+    import transformers
+
+    config = getattr(model, "config", None)
+    try:
+        dtype_bytes = torch.finfo(model.dtype).bits // 8
+    except Exception:
+        dtype_bytes = 2 if torch.cuda.is_available() else 4
+    # transformers 4.45+ prefill'de yalnızca son token'ın logitlerini hesaplar
+    version = tuple(int(p) for p in getattr(transformers, "__version__", "0.0").split(".")[:2] if p.isdigit())
+    vision = getattr(config, "vision_config", None)
+    heads = getattr(config, "num_attention_heads", 16)
+    return {
+        "layers": getattr(config, "num_hidden_layers", 36),
+        "kv_heads": getattr(config, "num_key_value_heads", 2),
+        "head_dim": getattr(config, "hidden_size", 2048) // heads,
+        "hidden": getattr(config, "hidden_size", 2048),
+        "intermediate": getattr(config, "intermediate_size", 11008),
+        "vocab": getattr(config, "vocab_size", 151936),
+        "vision_hidden": getattr(vision, "hidden_size", 1280),
+        "vision_intermediate": getattr(vision, "intermediate_size", 3420),
+        "vision_heads": getattr(vision, "num_heads", 16),
+        "patch_size": getattr(vision, "patch_size", 14),
+        "merge_size": getattr(vision, "spatial_merge_size", 2),
+        "dtype_bytes": dtype_bytes,
+        "full_prefill_logits": version < (4, 45),
+    }
+
+def estimate_request_memory(size, request, slot=None):
+    """
+    İsteğin tepe çalışma belleği tahmini (bayt)
+
+    Terimler: sıkıştırılmış veri ve çözülmüş pikseller (ön işleme kopyalarıyla),
+    processor ölçeklemesinden sonraki pixel_values, vision encoder aktivasyonları
+    ve tam dikkat katmanının skor matrisi, prefill aktivasyonları ile logitler
+    ve (giriş + max_tokens) için KV önbelleği. Toplam güvenlik çarpanıyla büyütülür.
+    """
+    slot = slot or active_slot
+    width, height = size
+    dims = _model_dims(slot.model)
+    dtype_bytes = dims["dtype_bytes"]
+    factor = dims["patch_size"] * dims["merge_size"]
+
+    # Uyarlanabilir modda gerçek çözünürlük pikseller yüklenince seçilir; üst sınır ayrılır
+    min_pixels, max_pixels = vision_pixel_bounds(slot.settings)
+    resized_h, resized_w = smart_resize(height, width, factor=factor, min_pixels=min_pixels, max_pixels=max_pixels)
+    patches = (resized_h // dims["patch_size"]) * (resized_w // dims["patch_size"])
+    vision_tokens = patches // (dims["merge_size"] ** 2)
+    input_tokens = vision_tokens + len(request.prompt) // 3 + 32
+    total_tokens = input_tokens + request.max_tokens
+
+    parts = {
+        "encoded": len(request.image) * 2,  # base64 metni + çözülmüş bayt
+        "decoded": width * height * 3 * 3,  # RGB + ön işleme kopyaları
+        "pixel_values": resized_h * resized_w * 3 * 2 * 4,  # zamansal yama x2, float32
+        "vision": patches * (dims["vision_hidden"] * 4 + dims["vision_intermediate"] * 3) * dtype_bytes
+                  + dims["vision_heads"] * patches * patches * dtype_bytes,
+        "prefill": input_tokens * (dims["intermediate"] * 2 + dims["hidden"] * 4) * dtype_bytes
+                   + (input_tokens if dims["full_prefill_logits"] else 1) * dims["vocab"] * 4,
+        "kv_cache": total_tokens * dims["layers"] * 2 * dims["kv_heads"] * dims["head_dim"] * dtype_bytes,
+    }
+    total = int(sum(parts.values()) * MEMORY_SAFETY_FACTOR)
+    return {
+        "total_bytes": total,
+        "total_mb": round(total / 1024**2, 1),
+        "pixels": width * height,
+        "resized": [resized_w, resized_h],
+        "vision_tokens": vision_tokens,
+        "max_tokens": request.max_tokens,
+        "parts_mb": {name: round(value / 1024**2, 1) for name, value in parts.items()},
+    }
+
+class MemoryGovernor:
+    """
+    Tahmini bellek bütçesine göre istek kabulü
+
+    İstekler geliş sırasıyla bekler; sıradaki istek, ayrılmış toplam ile kendi
+    tahmini bütçeye sığdığında ve anlık RSS sınırı aşmayacaksa kabul edilir.
+    Çalışan istek yokken RSS kontrolü atlanır (serbest bırakılmayan bellek
+    kuyruğu kilitlemesin). Bütçeden büyük tek istek 413, bekleme süresi
+    dolan istek 503 ile reddedilir.
+    """
+
+    def __init__(self):
+        self.budget = None
+        self.limit = 0
+        self.baseline = 0
+        self.reserved = 0
+        self.in_flight = 0
+        self.rejected = 0
+        self._queue = []
+        self._condition = None
+
+    def configure(self, baseline_rss):
+        self.baseline = baseline_rss
+        self._condition = None  # Sunucunun olay döngüsünde yeniden oluşturulur
+        self.limit = memory_limit_bytes()
+        if MEMORY_BUDGET_MB > 0:
+            self.budget = int(MEMORY_BUDGET_MB * 1024 * 1024)
+        elif self.limit > baseline_rss:
+            self.budget = self.limit - baseline_rss
+        else:
+            logger.warning("⚠️ Bellek sınırı belirlenemedi veya model RSS'i sınırı aşıyor, kabul denetimi kapalı")
+            return
+        logger.info(f"🧮 Bellek bütçesi: {self._mb(self.budget)} MB "
+                    f"(sınır {self._mb(self.limit)} MB, model RSS {self._mb(baseline_rss)} MB)")
+
+    async def rebase(self, baseline_rss):
+        """Model değişiminden sonra bütçeyi yeni model boyutuna göre güncelle (bekleyenler korunur)"""
+        self.baseline = baseline_rss
+        if self.budget is None or MEMORY_BUDGET_MB > 0:
+            return
+        self.budget = max(0, self.limit - baseline_rss)
+        if self._condition is not None:
+            async with self._condition:
+                self._condition.notify_all()
+
+    @staticmethod
+    def _mb(value):
+        return round(value / 1024**2, 1) if value else 0
+
+    def _fits(self, estimate):
+        if self.reserved + estimate > self.budget:
+            return False
+        return self.in_flight == 0 or not self.limit or current_rss_bytes() + estimate <= self.limit
+
+    @asynccontextmanager
+    async def reserve(self, estimate):
+        """Bütçe açılana kadar bekle ve tahmini ayır; çıkışta serbest bırak"""
+        if self.budget is None:
+            yield 0.0
+            return
+        if estimate > self.budget:
+            self.rejected += 1
+            raise HTTPException(status_code=413, detail=(
+                f"Görüntü bellek bütçesini aşıyor: tahmini {self._mb(estimate)} MB > {self._mb(self.budget)} MB"))
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+
+        ticket = object()
+        start = time.perf_counter()
+        async with self._condition:
+            self._queue.append(ticket)
+            try:
+                await asyncio.wait_for(
+                    self._condition.wait_for(lambda: self._queue[0] is ticket and self._fits(estimate)),
+                    timeout=ADMISSION_TIMEOUT_SECONDS or None)
+            except asyncio.TimeoutError:
+                self.rejected += 1
+                raise HTTPException(status_code=503, detail="Bellek bütçesi dolu, daha sonra tekrar deneyin",
+                                    headers={"Retry-After": "30"})
+            finally:
+                self._queue.remove(ticket)
+                self._condition.notify_all()
+            self.reserved += estimate
+            self.in_flight += 1
+
+        try:
+            yield time.perf_counter() - start
+        finally:
+            async with self._condition:
+                self.reserved -= estimate
+                self.in_flight -= 1
+                self._condition.notify_all()
+
+    def status(self):
+        return {
+            "rss_mb": self._mb(current_rss_bytes()),
+            "limit_mb": self._mb(self.limit),
+            "model_rss_mb": self._mb(self.baseline),
+            "budget_mb": self._mb(self.budget),
+            "reserved_mb": self._mb(self.reserved),
+            "in_flight": self.in_flight,
+            "waiting": len(self._queue),
+            "rejected": self.rejected,
+        }
+
+memory_governor = MemoryGovernor()
+
+def coalesce_key(request):
+    """Sonucu belirleyen alanların özeti: görüntü, prompt ve üretim parametreleri"""
+    digest = hashlib.sha256()
+    # Model sürümü de anahtarda: değişimden sonra gelen istek eski örneğe bağlanmaz
+    version = str(active_slot.version) if active_slot else ""
+    for part in (request.image, request.prompt, str(request.max_tokens), request.preprocess,
+                 request.decoding or DEFAULT_DECODING, version):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+class RequestCoalescer:
+    """
+    Özdeş eşzamanlı istekler için tek çıkarım (singleflight)
+
+    Anahtar için ilk gelen istek çıkarımı bağımsız bir görev olarak başlatır;
+    o görev bitene kadar gelen özdeş istekler aynı görevi bekler ve aynı
+    sonucu (hata dahil) alır. Görev bitince anahtar silinir, sonuç önbelleğe
+    alınmaz. Bekleyenlerden biri iptal edilse de görev sürer.
+    """
+
+    def __init__(self):
+        self._inflight = {}
+        self.leaders = 0
+        self.coalesced = 0
+        self.saved_seconds = 0.0
+        self.saved_tokens = 0
+
+    async def run(self, key, factory):
+        """
+        Returns:
+            tuple: (sonuç, paylaşıldıysa ilk isteğin trace kimliği, değilse None)
+        """
+        task = self._inflight.get(key)
+        if task is None:
+            self.leaders += 1
+            task = asyncio.ensure_future(factory())
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._inflight.pop(key, None)
+                                   if self._inflight.get(key) is done else None)
+            return await asyncio.shield(task), None
+
+        self.coalesced += 1
+        result = await asyncio.shield(task)
+        # Paylaşılan çıkarımın kabul beklemesi dışındaki süresi ve üretilen token'lar
+        stages = result.stages or {}
+        compute_ms = sum(ms for name, ms in stages.items()
+                         if name in ("decode", "preprocess", "processor", "generate", "postprocess"))
+        self.saved_seconds += compute_ms / 1000
+        self.saved_tokens += stages.get("generated_tokens", 0)
+        logger.info(f"🔗 Özdeş istek paylaşıldı (trace: {result.trace_id}, {compute_ms / 1000:.1f}s tasarruf)")
+        return result, result.trace_id
+
+    def status(self):
+        total = self.leaders + self.coalesced
+        return {
+            "in_flight": len(self._inflight),
+            "leaders": self.leaders,
+            "coalesced": self.coalesced,
+            "coalesced_ratio": round(self.coalesced / total, 3) if total else 0.0,
+            "saved_seconds": round(self.saved_seconds, 1),
+            "saved_tokens": self.saved_tokens,
+        }
+
+request_coalescer = RequestCoalescer()
+
+def model_bytes(slot):
+    """Örneğin parametre ve tampon boyutu (bayt); ölçülemezse yükleme RSS artışı"""
+    total = 0
+    for module in (slot.model, slot.draft_model):
+        if module is None or not hasattr(module, "parameters"):
+            continue
+        for tensor in list(module.parameters()) + list(module.buffers()):
+            total += tensor.numel() * tensor.element_size()
+    return total or slot.footprint
+
+class ModelSwapper:
+    """
+    Kesintisiz model değişimi (sıcak yedek)
+
+    Yeni örnek arka planda yüklenip ısıtılır, yeni istekler tek atamayla ona
+    yönlendirilir; eski örnekteki son istek bittiğinde eski örnek bırakılır.
+    Yükleme ya da ısınma başarısız olursa etkin örnek değişmez. Yeni örneğin
+    tahmini boyutu ve ısınma isteği yükleme ve ısınma boyunca bellek
+    bütçesinden ayrılır (sığmazsa değişim başlamaz) ve yeni örnek etkinleşince
+    geri verilir: eski örneğe sabitlenmiş, kabul bekleyen istekler boşalmayı
+    tıkamaz, anlık RSS denetimi iki örneğin birlikte kapladığı belleği görür.
+    """
+
+    def __init__(self):
+        self._task = None
+        self.current = None
+        self.history = []
+
+    @property
+    def running(self):
+        return self._task is not None and not self._task.done()
+
+    def start(self, settings):
+        self.current = {
+            "settings": settings,
+            "state": "queued",
+            "started_at": time.time(),
+            "phases": {},
+            "error": None,
+        }
+        self._task = asyncio.ensure_future(self._swap(self.current))
+        return self.current
+
+    def _phase(self, swap, state, since):
+        swap["phases"][swap["state"]] = round(time.perf_counter() - since, 2)
+        swap["state"] = state
+        logger.info(f"🔁 Model değişimi: {state}")
+        return time.perf_counter()
+
+    async def _swap(self, swap):
+        old = active_slot
+        settings = swap["settings"]
+        since = time.perf_counter()
+        try:
+            # Yeni örnek, eskisinin boyutunun dtype oranıyla ölçeklenmiş hali kadar yer tutar
+            scale = (torch.finfo(_torch_dtype(settings["dtype"])).bits
+                     / torch.finfo(_torch_dtype(old.settings["dtype"])).bits)
+            warmup = estimate_request_memory(_warmup_image().size, OCRRequest(image="", max_tokens=8), old)
+            reserve = int(model_bytes(old) * scale) + warmup["total_bytes"]
+            budget = memory_governor.budget
+            if budget is not None and reserve > budget:
+                raise RuntimeError(f"İkinci örnek için bellek yetersiz: tahmini {reserve / 1024**2:.0f} MB, "
+                                   f"bütçe {budget / 1024**2:.0f} MB (OCR_MEMORY_LIMIT_MB)")
+
+            async with memory_governor.reserve(reserve):
+                since = self._phase(swap, "loading", since)
+                slot = await asyncio.to_thread(load_model_instance, settings, old.version + 1)
+
+                since = self._phase(swap, "warming", since)
+                await asyncio.to_thread(warm_up, slot)
+
+                # Olay döngüsünde tek atama: bundan sonraki istekler yeni örnekte
+                activate_slot(slot)
+
+            # Eski örnek son isteği bitince bırakılır; bekleme yalnızca durum raporu için
+            since = self._phase(swap, "draining", since)
+            drained = asyncio.Event()
+            old.retire(lambda: self._release(old, slot, drained))
+            try:
+                await asyncio.wait_for(drained.wait(), timeout=SWAP_DRAIN_TIMEOUT_SECONDS or None)
+            except asyncio.TimeoutError:
+                swap["pending_release"] = True
+                logger.warning(f"⚠️ Eski model v{old.version} boşalmadı ({old.active} istek); "
+                               f"bellek son istek bitince bırakılacak")
+
+            self._phase(swap, "done", since)
+            swap["version"] = slot.version
+            logger.info(f"✅ Model v{old.version} -> v{slot.version} kesintisiz değiştirildi")
+
+        except Exception as e:
+            detail = e.detail if isinstance(e, HTTPException) else str(e)
+            swap["phases"][swap["state"]] = round(time.perf_counter() - since, 2)
+            swap["state"] = "failed"
+            swap["error"] = detail
+            logger.error(f"❌ Model değişimi başarısız, v{old.version} etkin kalıyor: {detail}")
+
+        finally:
+            swap["finished_at"] = time.time()
+            self.history = (self.history + [swap])[-10:]
+
+    @staticmethod
+    def _release(old, new, drained):
+        """Boşalan eski örneğin belleğini bırak ve bütçeyi güncelle (olay döngüsünde çağrılır)"""
+        try:
+            released = model_bytes(old)
+            release_slot(old)
+            asyncio.ensure_future(memory_governor.rebase(memory_governor.baseline - released + model_bytes(new)))
+            logger.info(f"🧹 Eski model v{old.version} bırakıldı")
+        except Exception as e:
+            logger.error(f"❌ Eski model v{old.version} bırakılamadı: {e}")
+        finally:
+            drained.set()
+
+    def status(self):
+        return {"running": self.running, "current": self.current, "history": len(self.history)}
+
+model_swapper = ModelSwapper()
+
+class StackSampler:
+    """
+    sys._current_frames ile örnekleyici profil
+
+    Her örnekte örnekleyici dışındaki tüm thread'lerin yığını alınır; yığının
+    tepesindeki fonksiyon öz (self), yığındaki her fonksiyon toplam (total)
+    örnek sayar.
+    """
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+
+    @staticmethod
+    def _frame_name(frame):
+        code = frame.f_code
+        return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+    def run(self, seconds):
+        own_id = threading.get_ident()
+        self_counts = Counter()
+        total_counts = Counter()
+        stacks = Counter()
+        samples = 0
+
+        deadline = time.perf_counter() + seconds
+        while time.perf_counter() < deadline:
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(self._frame_name(frame))
+                    frame = frame.f_back
+                # Boşta bekleyen thread'ler (select, wait) örneğe alınmaz
+                if not stack or stack[0].startswith(("select ", "wait ", "_worker ", "run_forever ")):
+                    continue
+                self_counts[stack[0]] += 1
+                total_counts.update(set(stack))
+                stacks[";".join(reversed(stack))] += 1
+            samples += 1
+            time.sleep(self.interval)
+
+        def top(counter):
+            return [{"function": name, "samples": count, "ratio": round(count / samples, 3)}
+                    for name, count in counter.most_common(PROFILE_TOP_N)]
+
+        return {
+            "seconds": seconds,
+            "interval_ms": self.interval * 1000,
+            "samples": samples,
+            "self": top(self_counts),
+            "total": top(total_counts),
+            "collapsed": [f"{stack} {count}" for stack, count in stacks.most_common(200)],
+        }
+
+def _check_admin(token):
+    """Yönetim ucu yetkisi: OCR_ADMIN_TOKEN yoksa uç yokmuş gibi davranılır"""
+    import secrets
+
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not token or not secrets.compare_digest(token, ADMIN_TOKEN):
+        raise HTTPException(status_code=401, detail="Geçersiz yönetici anahtarı")
+
+def merge_model_settings(current, request):
+    """Değişim isteğini etkin ayarlarla birleştir ve doğrula"""
+    settings = dict(current)
+    for field in ("model_id", "revision", "dtype", "min_vision_tokens", "max_vision_tokens", "draft_model"):
+        value = getattr(request, field)
+        if value is not None:
+            settings[field] = value
+    settings["draft_model"] = settings["draft_model"] or None
+
+    if settings["dtype"] not in MODEL_DTYPES:
+        raise HTTPException(status_code=422, detail=f"Geçersiz dtype: {settings['dtype']} ({', '.join(MODEL_DTYPES)})")
+    if not 4 <= settings["min_vision_tokens"] <= settings["max_vision_tokens"]:
+        raise HTTPException(status_code=422, detail="Vision token sınırları geçersiz (4 <= min <= max)")
+    return settings
+
+@app.post("/admin/model", status_code=202)
+async def swap_model(request: ModelSwapRequest, x_admin_token: str = Header(None)):
+    """
+    Modeli kesintisiz değiştir (OCR_ADMIN_TOKEN, X-Admin-Token başlığı)
+
+    Yeni ayarlarla (model/snapshot, dtype, vision token sınırları, taslak
+    model) ikinci bir örnek arka planda yüklenir ve ısıtılır; trafik ona
+    atomik olarak geçer, eski örnek boşaltılıp bırakılır. İlerleme
+    GET /admin/model ile izlenir.
+    """
+    _check_admin(x_admin_token)
+    if not model_loaded:
+        raise HTTPException(status_code=503, detail="Model henüz yüklenmedi")
+    if model_swapper.running:
+        raise HTTPException(status_code=409, detail="Başka bir model değişimi sürüyor")
+
+    settings = merge_model_settings(active_slot.settings, request)
+    logger.info(f"🔁 Model değişimi başlatıldı: {settings}")
+    return model_swapper.start(settings)
+
+@app.get("/admin/model")
+async def model_status(x_admin_token: str = Header(None)):
+    """Etkin model ve son değişimin durumu"""
+    _check_admin(x_admin_token)
+    return {
+        "active": active_slot.describe() if active_slot else None,
+        "swap": model_swapper.current,
+        "history": model_swapper.history,
+    }
 
 def enhance_for_colored_backgrounds(image):
     """Renkli arka plan üzerindeki metinleri belirginleştir"""
@@ -315,6 +1389,208 @@ def enhance_for_colored_backgrounds(image):
     
     return image
 
+def enhance_light(image):
+    """Hafif ön işleme - yalnızca kontrast (gürültüyü büyüten keskinleştirme yok)"""
+    from PIL import ImageEnhance
+
+    if image.mode != 'RGB':
+        image = image.convert('RGB')
+    return ImageEnhance.Contrast(image).enhance(1.4)
+
+def analyze_image_stats(image):
+    """
+    Ön işleme kararı için ucuz görüntü istatistikleri
+
+    Yayılım ve arka plan doygunluğu seyreltilmiş (her n. piksel) kopyadan,
+    gürültü tam çözünürlüklü merkez kırpıntının Laplace artığından ölçülür.
+
+    Returns:
+        dict: spread (0-255), background_saturation (0-1), noise (gri seviye sigması)
+    """
+    if image.mode != 'RGB':
+        image = image.convert('RGB')
+    w, h = image.size
+    step = max(1, max(h, w) // ANALYSIS_LONG_EDGE)
+    # NEAREST seyreltme ince yazının uç değerlerini korur (ortalama alan küçültme korumaz)
+    sample = image.resize((max(1, w // step), max(1, h // step)), Image.NEAREST)
+    r, g, b = (np.asarray(channel, dtype=np.int32) for channel in sample.split())
+
+    gray = (r * 299 + g * 587 + b * 114) // 1000
+    cdf = np.cumsum(np.bincount(gray.ravel(), minlength=256))
+    low, median, high = (int(np.searchsorted(cdf, q * cdf[-1])) for q in (0.01, 0.5, 0.99))
+
+    # Açık tonlu yarı arka plan kabul edilir
+    top = np.maximum(np.maximum(r, g), b)
+    saturation = (top - np.minimum(np.minimum(r, g), b)) * 255 // np.maximum(top, 1)
+    background = saturation[gray >= median]
+    background_saturation = float(np.median(background)) / 255.0 if background.size else 0.0
+
+    cy, cx, half = h // 2, w // 2, NOISE_CROP // 2
+    crop = np.asarray(image.crop((max(0, cx - half), max(0, cy - half), cx + half, cy + half)), dtype=np.float32)
+    g = crop @ np.array([0.299, 0.587, 0.114], np.float32)
+    noise = 0.0
+    if g.shape[0] > 2 and g.shape[1] > 2:
+        # Immerkær çekirdeği; Gauss gürültüsüne yanıtın standart sapması 6σ
+        residual = (g[:-2, :-2] - 2 * g[:-2, 1:-1] + g[:-2, 2:]
+                    - 2 * g[1:-1, :-2] + 4 * g[1:-1, 1:-1] - 2 * g[1:-1, 2:]
+                    + g[2:, :-2] - 2 * g[2:, 1:-1] + g[2:, 2:])
+        noise = 1.4826 * float(np.median(np.abs(residual))) / 6.0
+
+    return {
+        "spread": float(high - low),
+        "background_saturation": round(background_saturation, 3),
+        "noise": round(noise, 2),
+    }
+
+def choose_preprocess_recipe(stats):
+    """İstatistiklere göre ön işleme tarifi: none, light veya full"""
+    if stats["background_saturation"] >= FULL_MIN_SATURATION or stats["spread"] < FULL_MAX_SPREAD:
+        return "full"
+    if stats["spread"] < LIGHT_MAX_SPREAD or stats["noise"] >= LIGHT_MIN_NOISE:
+        return "light"
+    return "none"
+
+def adaptive_preprocess(image, recipe="auto"):
+    """
+    Görüntüye istatistiklerine uygun ön işleme tarifini uygula
+
+    Returns:
+        tuple: (işlenmiş görüntü, karar kaydı: recipe, stats, süreler, tahmini kazanç)
+    """
+    import time
+
+    if recipe != "auto" and recipe not in PREPROCESS_RECIPES:
+        raise ValueError(f"Geçersiz ön işleme tarifi: {recipe}")
+
+    info = {"recipe": recipe, "stats": None, "analysis_ms": 0.0}
+    if recipe == "auto":
+        start = time.time()
+        info["stats"] = analyze_image_stats(image)
+        info["recipe"] = choose_preprocess_recipe(info["stats"])
+        info["analysis_ms"] = round((time.time() - start) * 1000, 1)
+
+    start = time.time()
+    if info["recipe"] == "full":
+        image = enhance_for_colored_backgrounds(image)
+    elif info["recipe"] == "light":
+        image = enhance_light(image)
+    elif image.mode != 'RGB':
+        image = image.convert('RGB')
+    enhance_ms = (time.time() - start) * 1000
+    info["enhance_ms"] = round(enhance_ms, 1)
+
+    megapixels = image.size[0] * image.size[1] / 1e6
+    with _full_lock:
+        if info["recipe"] == "full" and megapixels:
+            _full_ms_per_mp["value"] = 0.8 * _full_ms_per_mp["value"] + 0.2 * (enhance_ms / megapixels)
+        full_ms = _full_ms_per_mp["value"] * megapixels
+    info["saved_ms"] = round(full_ms - enhance_ms - info["analysis_ms"], 1) if info["recipe"] != "full" \
+        else 0.0 - info["analysis_ms"]
+
+    return image, info
+
+def vision_pixel_bounds(settings=None):
+    """Geçerli moddaki (uyarlanabilir / sabit) piksel sınırları; settings model örneğinin ayarları"""
+    if ADAPTIVE_RESOLUTION:
+        settings = settings or {}
+        return (settings.get("min_vision_tokens", MIN_VISION_TOKENS) * VISION_PATCH_PIXELS,
+                settings.get("max_vision_tokens", MAX_VISION_TOKENS) * VISION_PATCH_PIXELS)
+    return MIN_PIXELS, MAX_PIXELS
+
+def estimate_text_density(image):
+    """
+    Küçük resimden ucuz metin yoğunluğu tahmini
+
+    Otsu ile ikilenen küçük resmin bağlı bileşenlerinden çizgi/çerçeve ve
+    gürültü boyutundakiler elenir; kalanlar glif (harf/kelime parçası) sayılır.
+
+    Returns:
+        dict: glyphs, char_height (orijinal piksel, medyan glif yüksekliği),
+        ink_ratio ya da cv2 yoksa None
+    """
+    try:
+        import cv2
+    except ImportError:
+        return None
+
+    gray = image.convert('L')
+    step = max(1, max(gray.size) // DENSITY_LONG_EDGE)
+    thumb = np.asarray(gray.reduce(step) if step > 1 else gray)
+
+    # Seyrek sayfada mürekkep %1'in altında kalabilir: yüzdelik yerine en koyu birkaç yüz piksel
+    # (açık zeminde koyu, koyu zeminde açık yazı için iki uç da bakılır)
+    pixels = thumb.ravel()
+    k = max(1, min(200, pixels.size // 1000))
+    ordered = np.partition(pixels, (k, pixels.size - 1 - k))
+    median = float(np.median(pixels))
+    if max(median - float(ordered[k]), float(ordered[pixels.size - 1 - k]) - median) < 32:
+        return {"glyphs": 0, "char_height": 0.0, "ink_ratio": 0.0}
+
+    _, mask = cv2.threshold(thumb, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+    ink_ratio = float(np.count_nonzero(mask)) / mask.size
+    if ink_ratio > 0.5:
+        # Koyu zemin üzerinde açık yazı
+        mask = cv2.bitwise_not(mask)
+        ink_ratio = 1.0 - ink_ratio
+
+    _, _, stats, _ = cv2.connectedComponentsWithStats(mask, connectivity=8)
+    stats = stats[1:]
+    heights = stats[:, cv2.CC_STAT_HEIGHT]
+    widths = stats[:, cv2.CC_STAT_WIDTH]
+    areas = stats[:, cv2.CC_STAT_AREA]
+    # Yatay çizgiler en-boy oranından, dikey çizgi/çerçeve/resimler yükseklikten elenir
+    glyph = ((heights >= 2) & (areas >= 3) & (widths <= heights * 20)
+             & (heights <= max(thumb.shape[0] * 0.05, 40)))
+
+    return {
+        "glyphs": int(np.count_nonzero(glyph)),
+        "char_height": float(np.median(heights[glyph])) * step if glyph.any() else 0.0,
+        "ink_ratio": round(ink_ratio, 4),
+    }
+
+def plan_vision_resolution(image, settings=None):
+    """
+    Görüntünün modele verileceği boyutu seç
+
+    Uyarlanabilir modda ölçek, medyan glif yüksekliğini TARGET_CHAR_PX'e getirir;
+    token sayısı [MIN_VISION_TOKENS, MAX_VISION_TOKENS] aralığında kalır ve
+    görüntü kendi boyutundan büyütülmez. Metin bulunamazsa en düşük sınır
+    kullanılır. Sabit modda processor'ın önceki sınırları uygulanır.
+
+    Returns:
+        dict: width, height (28'in katı), tokens, mode ve yoğunluk ölçümleri
+    """
+    start = time.perf_counter()
+    width, height = image.size
+    min_pixels, max_pixels = vision_pixel_bounds(settings)
+    density = estimate_text_density(image) if ADAPTIVE_RESOLUTION else None
+
+    if density is None:
+        mode = "fixed"
+        target_pixels = None
+    else:
+        mode = "adaptive"
+        if density["glyphs"] < MIN_GLYPHS or density["char_height"] <= 0:
+            target_pixels = min_pixels
+        else:
+            scale = TARGET_CHAR_PX / density["char_height"]
+            target_pixels = width * height * scale * scale
+        # Görüntü kendi boyutunun üstüne büyütülmez (alt sınır hariç)
+        target_pixels = min(target_pixels, max(width * height, min_pixels))
+        min_pixels = max_pixels = int(min(max(target_pixels, min_pixels), max_pixels))
+
+    resized_height, resized_width = smart_resize(height, width, factor=28, min_pixels=min_pixels, max_pixels=max_pixels)
+    plan = {
+        "mode": mode,
+        "width": resized_width,
+        "height": resized_height,
+        "tokens": resized_width * resized_height // VISION_PATCH_PIXELS,
+        "analysis_ms": round((time.perf_counter() - start) * 1000, 1),
+    }
+    if density is not None:
+        plan.update(density)
+    return plan
+
 def clean_output_text(text):
     """Çıktı metnini temizleme"""
     if not text:
@@ -352,7 +1628,112 @@ def clean_output_text(text):
 
     return text.strip()
 
+def benchmark_decoding(image_paths, modes, max_tokens=4096, prompt=None, preprocess="auto"):
+    """
+    Yardımlı çözme modlarını aynı görüntülerde greedy ile karşılaştır
+
+    Her görüntü önce greedy, sonra her modla işlenir; metinler birebir
+    karşılaştırılır. İlk görüntü ölçüm öncesi bir kez ısınma için çalıştırılır.
+
+    Returns:
+        dict: Mod başına özdeş çıktı sayısı, farklılıklar, token/sn, hızlanma ve kabul oranı
+    """
+    def run(image_path, mode):
+        request = OCRRequest(image="", max_tokens=max_tokens, preprocess=preprocess, decoding=mode,
+                             **({"prompt": prompt} if prompt else {}))
+        text, _, decoding = run_ocr(request, Image.open(image_path), StageTimer())
+        return text, decoding
+
+    for image_path in image_paths:
+        try:
+            run(image_path, "greedy")
+            break
+        except Exception:
+            continue
+
+    report = {mode: {"images": 0, "identical": 0, "mismatches": [], "tokens": 0, "seconds": 0.0,
+                     "greedy_tokens": 0, "greedy_seconds": 0.0, "drafted": 0, "accepted": 0}
+              for mode in modes}
+    for image_path in image_paths:
+        try:
+            greedy_text, greedy = run(image_path, "greedy")
+        except Exception as e:
+            logger.error(f"❌ Görüntü atlandı ({image_path}): {e}")
+            continue
+        for mode in modes:
+            text, decoding = run(image_path, mode)
+            entry = report[mode]
+            entry["images"] += 1
+            if text == greedy_text:
+                entry["identical"] += 1
+            else:
+                first_diff = next((i for i, (a, b) in enumerate(zip(text, greedy_text)) if a != b),
+                                  min(len(text), len(greedy_text)))
+                entry["mismatches"].append({"image": image_path, "first_diff_char": first_diff})
+                logger.warning(f"⚠️ {mode} çıktısı greedy'den farklı: {image_path} (karakter {first_diff})")
+            entry["tokens"] += decoding["generated_tokens"]
+            entry["seconds"] += decoding["generate_seconds"]
+            entry["greedy_tokens"] += greedy["generated_tokens"]
+            entry["greedy_seconds"] += greedy["generate_seconds"]
+            entry["drafted"] += decoding["drafted_tokens"]
+            entry["accepted"] += decoding["accepted_tokens"]
+
+    for entry in report.values():
+        entry["tokens_per_sec"] = entry["tokens"] / entry["seconds"] if entry["seconds"] else 0.0
+        entry["greedy_tokens_per_sec"] = entry["greedy_tokens"] / entry["greedy_seconds"] if entry["greedy_seconds"] else 0.0
+        entry["speedup"] = entry["greedy_seconds"] / entry["seconds"] if entry["seconds"] else 0.0
+        entry["acceptance_rate"] = entry["accepted"] / entry["drafted"] if entry["drafted"] else 0.0
+    return report
+
+def _run_decoding_benchmark(args):
+    """Komut satırı: yardımlı çözme karşılaştırma tablosu (farklı çıktı varsa çıkış kodu 1)"""
+    import glob
+    import json
+
+    image_paths = []
+    for pattern in args.benchmark_decoding:
+        if os.path.isdir(pattern):
+            image_paths.extend(sorted(
+                os.path.join(pattern, name) for name in os.listdir(pattern)
+                if name.lower().endswith(('.png', '.jpg', '.jpeg', '.tif', '.tiff', '.bmp', '.webp'))))
+        else:
+            image_paths.extend(sorted(glob.glob(pattern)))
+    if not image_paths:
+        print("❌ Görüntü bulunamadı")
+        return 1
+
+    asyncio.run(load_model_async())
+    report = benchmark_decoding(image_paths, args.modes, max_tokens=args.max_tokens, prompt=args.prompt)
+
+    print(f"{'Mod':<15}{'Görüntü':>9}{'Özdeş':>7}{'Greedy t/sn':>13}{'Mod t/sn':>10}{'Hızlanma':>10}{'Kabul':>8}")
+    print("-" * 72)
+    for mode, stats in report.items():
+        print(f"{mode:<15}{stats['images']:>9}{stats['identical']:>7}{stats['greedy_tokens_per_sec']:>13.2f}"
+              f"{stats['tokens_per_sec']:>10.2f}{stats['speedup']:>9.2f}x{stats['acceptance_rate']:>8.0%}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"💾 Sonuç {args.output} dosyasına kaydedildi")
+
+    return 1 if any(stats["mismatches"] for stats in report.values()) else 0
+
 if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Qwen OCR API Server")
+    parser.add_argument("--benchmark-decoding", nargs="+", metavar="GÖRÜNTÜ",
+                        help="Sunucu yerine yardımlı çözmeyi bu görüntülerde (dosya, dizin, glob) greedy ile karşılaştır")
+    parser.add_argument("--modes", nargs="+", choices=DECODING_MODES[1:], default=["prompt_lookup"],
+                        help="Karşılaştırılacak modlar (draft için OCR_DRAFT_MODEL gerekir)")
+    parser.add_argument("--max-tokens", type=int, default=4096)
+    parser.add_argument("--prompt", help="Varsayılan tablo prompt'u yerine")
+    parser.add_argument("--output", help="Raporu JSON olarak kaydet")
+    args = parser.parse_args()
+
+    if args.benchmark_decoding:
+        sys.exit(_run_decoding_benchmark(args))
+
     uvicorn.run(
         app,
         host="0.0.0.0",
@@ -14,6 +14,8 @@ import logging
 import requests
 from PIL import Image
 
+from tracing import Tracer
+
 # Logging ayarları
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -21,6 +23,9 @@ logger = logging.getLogger(__name__)
 # API ayarları
 API_BASE_URL = "http://localhost:8000"
 
+# İstek izleme - trace bağlamı api.py'ye başlıklarla taşınır (span'ler OCR_TRACE_FILE'a)
+tracer = Tracer("app.py")
+
 def check_api_health():
     """API sağlık kontrolü"""
     try:
@@ -84,7 +89,9 @@ def extract_text_from_image_api(image):
     """API üzerinden görüntüden metin çıkar"""
     try:
         # Base64'e çevir
-        image_base64 = image_to_base64(image)
+        with tracer.span("client.encode") as span:
+            image_base64 = image_to_base64(image)
+            span.set(bytes=len(image_base64 or ""))
         if not image_base64:
             return None
 
@@ -136,11 +143,14 @@ Unreadable section → [...]"""
 
         logger.info("🔍 API üzerinden OCR işlemi başlatılıyor...")
 
-        # API çağrısı
-        response = requests.post(
-            f"{API_BASE_URL}/ocr",
-            json=payload
-        )
+        # API çağrısı (sunucu span'leri bu span'in altına bağlanır)
+        with tracer.span("client.http", url=f"{API_BASE_URL}/ocr") as span:
+            response = requests.post(
+                f"{API_BASE_URL}/ocr",
+                json=payload,
+                headers=span.headers()
+            )
+            span.set(status_code=response.status_code)
 
         if response.status_code == 200:
             result = response.json()
@@ -227,20 +237,25 @@ def main():
             print("API'yi başlatmak için: python api.py")
             return
 
-        # Görüntüyü işle
-        image = preprocess_image(image_path)
-        if not image:
-            print("❌ Görüntü yüklenemedi!")
-            return
-
-        # API üzerinden OCR çıkarım
-        raw_text = extract_text_from_image_api(image)
-        if not raw_text:
-            print("❌ OCR başarısız!")
-            return
-
-        # Temizle
-        clean_text = clean_output_text(raw_text)
+        with tracer.span("app.ocr", image=image_name) as root:
+            print(f"🧭 Trace: {root.trace_id}")
+
+            # Görüntüyü işle
+            with tracer.span("client.preprocess"):
+                image = preprocess_image(image_path)
+            if not image:
+                print("❌ Görüntü yüklenemedi!")
+                return
+
+            # API üzerinden OCR çıkarım
+            raw_text = extract_text_from_image_api(image)
+            if not raw_text:
+                print("❌ OCR başarısız!")
+                return
+
+            # Temizle
+            with tracer.span("client.clean"):
+                clean_text = clean_output_text(raw_text)
 
         # Sonucu göster
         print("\n" + "="*50)
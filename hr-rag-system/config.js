@@ -55,12 +55,35 @@ module.exports = {
       retryDelay: 1000,
       supportedFormats: ['.png', '.jpg', '.jpeg', '.bmp', '.gif', '.tiff', '.webp'],
       minPixels: 256 * 28 * 28,
-      maxPixels: 1280 * 28 * 28
+      maxPixels: 1280 * 28 * 28,
+      // Sayfa görüntüsü hash'ine göre kalıcı OCR önbelleği (dir verilmezse ~/.cache/sametei/qwen-ocr)
+      cache: {
+        enabled: true,
+        dir: process.env.QWEN_OCR_CACHE_DIR,
+        maxMb: 256,
+        maxEntries: 20000
+      }
     },
     
     // Genel OCR ayarları
     minTextThreshold: 10, // PDF'de minimum metin karakteri
+
+    // Kalıcı Python PDF servisi (utils/pdf_service.py) - sayfa metni, resim tespiti ve render
+    pdfService: {
+      pythonPath: process.env.PYTHON_PATH, // Verilmezse 'python'
+      timeout: 120000, // İstek başına (ms)
+      renderDpi: 300,
+      renderDir: process.env.PDF_SERVICE_RENDER_DIR, // Verilmezse /dev/shm (tmpfs) veya sistem temp
+      maxDocs: 4 // Aynı anda açık tutulan PDF sayısı
+    },
     
+    // Uçtan uca istek izleme (utils/tracing.js, tracing.py) - file verilmezse span yazılmaz
+    // Sorgu: OCR_TRACE_FILE=<dosya> python tracing.py <trace_id>
+    tracing: {
+      file: process.env.OCR_TRACE_FILE,
+      maxMb: 50
+    },
+
     // API tabanlı OCR için özel ayarlar
     api: {
       checkHealthOnStartup: true, // Başlangıçta API sağlığını kontrol et
@@ -6,39 +6,333 @@ Tek dosya halinde çalıştırılabilir OCR uygulaması
 
 Kullanım:
     python dotOCR.py <görüntü_dosyası> [--type TYPE] [--output OUTPUT]
+    python dotOCR.py --serve [--port PORT]
 
 Örnekler:
     python dotOCR.py temp/1.png
     python dotOCR.py temp/2.PNG --type text_only
     python dotOCR.py temp/1.png --output result.txt
+    python dotOCR.py --serve                 # Modeli bellekte tutan daemon
+
+Daemon çalışıyorsa normal çağrılar isteği ona iletir (model tekrar yüklenmez),
+çalışmıyorsa model süreç içinde yüklenir.
 """
 
 import os
 import sys
 import json
-import torch
+import socket
+import socketserver
+import threading
 import argparse
 import logging
 import time
+import glob
+import itertools
+import functools
+import tempfile
+from contextlib import contextmanager
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from PIL import Image
-from transformers import AutoModel, AutoTokenizer
 
 # Logging konfigürasyonu
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Daemon ayarları
+DEFAULT_DAEMON_HOST = os.environ.get('DOTOCR_HOST', '127.0.0.1')
+DEFAULT_DAEMON_PORT = int(os.environ.get('DOTOCR_PORT', '8765'))
+DAEMON_CONNECT_TIMEOUT = 1.0
+
+# Model API'si dosya yolu istediğinde geçici dosyalar için RAM tabanlı dizin
+TMPFS_DIR = '/dev/shm' if os.path.isdir('/dev/shm') else None
+
+# Üretim profilleri - KV cache her profilde açıktır, token bütçesi
+# görüntünün metin yoğunluğundan [min_new_tokens, max_new_tokens] aralığında hesaplanır
+GENERATION_PROFILES = {
+    'fast': {
+        'long_edge_max': 1024,
+        'min_new_tokens': 128,
+        'max_new_tokens': 1024,
+        'budget_scale': 1.0,
+    },
+    'accurate': {
+        'long_edge_max': 1600,
+        'min_new_tokens': 256,
+        'max_new_tokens': 2048,
+        'budget_scale': 1.5,
+    },
+    'long-document': {
+        'long_edge_max': 1600,
+        'min_new_tokens': 1024,
+        'max_new_tokens': 4096,
+        'budget_scale': 2.0,
+    },
+}
+DEFAULT_PROFILE = 'accurate'
+
+# Metinle tamamen dolu bir sayfanın kenar yoğunluğuna karşılık gelen yaklaşık token sayısı
+TOKENS_PER_EDGE_DENSITY = 12000
+
+
+def estimate_text_density(image, thumb_size=256):
+    """
+    Küçük bir önizleme üzerinde kenar yoğunluğundan metin yoğunluğunu tahmin et
+
+    Returns:
+        float: Güçlü kenar pikseli oranı (0-1)
+    """
+    from PIL import ImageFilter
+
+    scale = min(1.0, thumb_size / float(max(image.size)))
+    thumb_w, thumb_h = max(1, int(image.width * scale)), max(1, int(image.height * scale))
+    thumb = image.resize((thumb_w, thumb_h), Image.BILINEAR).convert('L')
+
+    # Filtre kenar piksellerini de kenar sayar, çerçeveyi hesaba katma
+    edges = thumb.filter(ImageFilter.FIND_EDGES)
+    if thumb_w > 2 and thumb_h > 2:
+        edges = edges.crop((1, 1, thumb_w - 1, thumb_h - 1))
+
+    strong = sum(edges.histogram()[64:])
+    return strong / float(edges.width * edges.height)
+
+
+def token_budget(density, profile=DEFAULT_PROFILE):
+    """Metin yoğunluğuna ve profile göre max_new_tokens değerini hesapla"""
+    settings = GENERATION_PROFILES[profile]
+    estimate = density * TOKENS_PER_EDGE_DENSITY * settings['budget_scale']
+    return int(min(settings['max_new_tokens'], max(settings['min_new_tokens'], estimate)))
+
+
+# Şablon (ROI) modu ayarları
+TEMPLATE_LONG_EDGE_MAX = 2400   # Alan kırpıları için sayfa çözünürlüğü
+TEMPLATE_ALIGN_WIDTH = 800      # Hizalamanın yapıldığı küçük görüntü genişliği
+TEMPLATE_MIN_SCORE = 0.3        # Bu korelasyonun altında şablon eşleşmemiş sayılır
+FIELD_MAX_NEW_TOKENS = 64       # Alan başına varsayılan token bütçesi
+FIELD_PADDING = 4               # Kırpı kenar payı (referans piksel)
+FIELD_ENGINES = ('got', 'qwen')  # Alan kırpılarını okuyan model
+
+# Qwen2.5-VL (api.py) - şablon modunda alan kırpıları için isteğe bağlı motor
+QWEN_API_URL = os.environ.get('QWEN_API_URL', 'http://localhost:8000')
+QWEN_FIELD_CONCURRENCY = int(os.environ.get('QWEN_FIELD_CONCURRENCY', '4'))
+
+
+def load_form_templates(templates_path):
+    """
+    Form şablonlarını JSON dosyasından yükle
+
+    Beklenen yapı (kutular referans görüntü pikselleri cinsinden [x, y, w, h]):
+        {
+          "izin_formu": {
+            "reference": "izin_formu.png",
+            "fields": {
+              "ad_soyad": {"box": [120, 340, 600, 48]},
+              "baslangic_tarihi": {"box": [120, 420, 260, 48], "max_new_tokens": 24}
+            }
+          }
+        }
+
+    Args:
+        templates_path (str): Şablon JSON dosyası
+
+    Returns:
+        dict: Form tipi -> şablon (referans görüntü yüklenmiş halde)
+    """
+    mtime = os.path.getmtime(templates_path)
+    return _load_form_templates_cached(os.path.abspath(templates_path), mtime)
+
+
+@functools.lru_cache(maxsize=8)
+def _load_form_templates_cached(templates_path, mtime):
+    with open(templates_path, 'r', encoding='utf-8') as f:
+        definitions = json.load(f)
+
+    base_dir = os.path.dirname(templates_path)
+    templates = {}
+
+    for form_type, definition in definitions.items():
+        reference_path = os.path.join(base_dir, definition['reference'])
+        with Image.open(reference_path) as ref:
+            reference = ref.convert('L')
+
+        fields = definition.get('fields', {})
+        if not fields:
+            raise ValueError(f"'{form_type}' şablonunda alan tanımı yok")
+
+        for name, field in fields.items():
+            if len(field.get('box', [])) != 4:
+                raise ValueError(f"'{form_type}.{name}' için box [x, y, w, h] olmalı")
+
+        templates[form_type] = {
+            'reference': reference,
+            'fields': fields,
+            'prompt': definition.get('prompt')
+        }
+
+    logger.info(f"📐 {len(templates)} form şablonu yüklendi: {', '.join(templates)}")
+    return templates
+
+
+def align_to_template(image, reference, align_width=TEMPLATE_ALIGN_WIDTH):
+    """
+    Sayfayı referans form görüntüsüne hizala (OpenCV ECC, afin dönüşüm)
+
+    Args:
+        image (PIL.Image.Image): Taranmış sayfa
+        reference (PIL.Image.Image): Şablonun gri tonlamalı referans görüntüsü
+        align_width (int): Hizalamanın yapılacağı genişlik
+
+    Returns:
+        tuple: (referans koordinatlarını sayfa koordinatlarına çeviren 2x3 matris, korelasyon skoru)
+    """
+    import cv2
+    import numpy as np
+
+    ref_w, ref_h = reference.size
+    small_w = min(align_width, ref_w)
+    small_h = max(1, int(ref_h * small_w / float(ref_w)))
+
+    def prepare(img, size):
+        return np.asarray(img.convert('L').resize(size, Image.BILINEAR), dtype=np.uint8)
+
+    def ink_bbox(array):
+        _, ink = cv2.threshold(array, 0, 255, cv2.THRESH_BINARY_INV | cv2.THRESH_OTSU)
+        return cv2.boundingRect(cv2.findNonZero(ink)) if cv2.countNonZero(ink) else None
+
+    # Başlangıç tahmini: mürekkep alanlarının sınırlayıcı kutularını eşle
+    # (ECC büyük kayma/ölçek farklarında tek başına yakınsamaz)
+    ref_box = ink_bbox(prepare(reference, (small_w, small_h)))
+    page_box = ink_bbox(prepare(image, (small_w, small_h)))
+    if ref_box and page_box and ref_box[2] > 1 and ref_box[3] > 1:
+        sx, sy = page_box[2] / float(ref_box[2]), page_box[3] / float(ref_box[3])
+        initial = np.array([
+            [sx, 0, page_box[0] - sx * ref_box[0]],
+            [0, sy, page_box[1] - sy * ref_box[1]]
+        ], dtype=np.float32)
+    else:
+        initial = np.eye(2, 3, dtype=np.float32)
+
+    # Kabadan inceye ECC iyileştirmesi; ince çizgiler için hafif bulanıklaştırılır
+    levels = [4, 2, 1]
+    warp = initial.copy()
+    warp[:, 2] /= levels[0]
+    score = 0.0
+    criteria = (cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 100, 1e-5)
+    try:
+        for i, factor in enumerate(levels):
+            size = (max(8, small_w // factor), max(8, small_h // factor))
+            if i > 0:
+                warp[:, 2] *= levels[i - 1] / float(factor)
+            score, warp = cv2.findTransformECC(
+                cv2.GaussianBlur(prepare(reference, size).astype(np.float32), (0, 0), 1.5),
+                cv2.GaussianBlur(prepare(image, size).astype(np.float32), (0, 0), 1.5),
+                warp, cv2.MOTION_AFFINE, criteria, None, 5
+            )
+    except cv2.error as e:
+        logger.warning(f"⚠️ Şablon hizalaması yakınsamadı, kaba tahmin kullanılacak: {e}")
+        warp = initial
+        score = 0.0
+
+    # Küçük referans -> küçük sayfa dönüşümünü tam çözünürlüklere taşı
+    ref_scale = np.diag([small_w / float(ref_w), small_h / float(ref_h), 1.0])
+    page_scale = np.diag([image.width / float(small_w), image.height / float(small_h)])
+    matrix = page_scale @ warp.astype(np.float64) @ ref_scale
+
+    return matrix, float(score)
+
+
+def map_field_box(box, matrix, image_size, padding=FIELD_PADDING):
+    """Referans koordinatlarındaki kutuyu sayfadaki kırpma kutusuna çevir"""
+    x, y, w, h = box
+    corners = [
+        (x - padding, y - padding), (x + w + padding, y - padding),
+        (x - padding, y + h + padding), (x + w + padding, y + h + padding)
+    ]
+    mapped = [
+        (matrix[0][0] * cx + matrix[0][1] * cy + matrix[0][2],
+         matrix[1][0] * cx + matrix[1][1] * cy + matrix[1][2])
+        for cx, cy in corners
+    ]
+
+    left = max(0, int(min(px for px, _ in mapped)))
+    top = max(0, int(min(py for _, py in mapped)))
+    right = min(image_size[0], int(max(px for px, _ in mapped)) + 1)
+    bottom = min(image_size[1], int(max(py for _, py in mapped)) + 1)
+
+    return left, top, right, bottom
+
+
+def qwen_extract_images(items, api_url=None, concurrency=QWEN_FIELD_CONCURRENCY, timeout=None):
+    """
+    Hazır görüntüleri Qwen2.5-VL servisine (api.py /ocr) eşzamanlı gönder
+
+    İstekler aynı anda gönderilir; servis bunları bellek bütçesine göre kabul
+    eder ve model boştayken sıradakini hemen alır.
+
+    Args:
+        items (list): {'image', 'prompt', 'max_new_tokens'} sözlükleri
+        api_url (str): Servis adresi (varsayılan: QWEN_API_URL)
+        concurrency (int): Aynı anda gönderilen en fazla istek
+        timeout (float): İstek başına bekleme süresi (None: sınırsız)
+
+    Returns:
+        list: Girdi sırasıyla sonuç sözlükleri
+    """
+    import io
+    import base64
+    import requests
+
+    api_url = (api_url or QWEN_API_URL).rstrip('/')
+
+    def run(item):
+        buffer = io.BytesIO()
+        item['image'].save(buffer, 'PNG')
+        payload = {
+            'image': base64.b64encode(buffer.getvalue()).decode('ascii'),
+            'prompt': item['prompt'],
+            'max_tokens': item['max_new_tokens'],
+        }
+        try:
+            response = requests.post(f"{api_url}/ocr", json=payload, timeout=timeout)
+            response.raise_for_status()
+            return response.json()
+        except (requests.RequestException, ValueError) as e:
+            return {'success': False, 'error': str(e), 'text': ''}
+
+    if not items:
+        return []
+    with ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(items))),
+                            thread_name_prefix='dotocr-qwen') as pool:
+        return list(pool.map(run, items))
+
+
 class DOTOCR:
-    def __init__(self, model_path=None):
+    def __init__(self, model_path=None, profile=DEFAULT_PROFILE):
         """
         DOT-OCR başlatıcı
 
         Args:
             model_path (str): GOT-OCR2 model dizini yolu
+            profile (str): Varsayılan üretim profili (GENERATION_PROFILES)
         """
+        if profile not in GENERATION_PROFILES:
+            raise ValueError(f"Bilinmeyen profil: {profile}")
+
         self.model_path = model_path or r"C:\Users\samet\Downloads\GOT-OCR2_0"
+        self.profile = profile
         self.model = None
         self.tokenizer = None
         self.is_initialized = False
+        # Model chat() bellekteki PIL görüntüsünü kabul ediyor mu
+        self.accepts_images = False
+        # chat() içindeki generate çağrısına uygulanan token bütçesi ve son çağrının ürettiği token sayısı
+        self._max_new_tokens = None
+        self._generated_tokens = None
+
+        # torch sadece model gerçekten kullanılacaksa import edilir;
+        # daemon'a iletilen çağrılar bu maliyeti hiç ödemez
+        import torch
         self.device = 'cuda' if torch.cuda.is_available() else 'cpu'
 
         logger.info(f"DOT-OCR başlatılıyor. Cihaz: {self.device}")
@@ -46,6 +340,9 @@ class DOTOCR:
     def initialize_model(self):
         """GOT-OCR2 modelini yükle ve başlat"""
         try:
+            import torch
+            from transformers import AutoModel, AutoTokenizer
+
             if not os.path.isdir(self.model_path):
                 raise FileNotFoundError(f"Model dizini bulunamadı: {self.model_path}")
 
@@ -67,10 +364,11 @@ class DOTOCR:
                 device_map=self.device
             ).eval()
 
-            # Generation config ayarları
+            # Generation config ayarları - KV cache açık, token bütçesi her istekte ayarlanır
+            pad_id = eos_id = None
             if hasattr(self.model, 'generation_config') and self.model.generation_config is not None:
-                self.model.generation_config.use_cache = False
-                self.model.generation_config.max_new_tokens = 200
+                self.model.generation_config.use_cache = True
+                self.model.generation_config.max_new_tokens = GENERATION_PROFILES[self.profile]['max_new_tokens']
                 self.model.generation_config.temperature = 0.0
                 self.model.generation_config.do_sample = False
                 self.model.generation_config.repetition_penalty = 1.0
@@ -87,11 +385,14 @@ class DOTOCR:
 
             # Config ayarları
             if hasattr(self.model, 'config') and self.model.config is not None:
-                self.model.config.use_cache = False
+                self.model.config.use_cache = True
                 if pad_id is not None:
                     self.model.config.pad_token_id = pad_id
                     self.model.config.eos_token_id = eos_id
 
+            self._enable_in_memory_images()
+            self._enable_token_budget()
+
             self.is_initialized = True
             logger.info("✅ Model başarıyla yüklendi!")
             logger.info(f"📍 Cihaz: {self.device}")
@@ -104,31 +405,72 @@ class DOTOCR:
             logger.error(f"❌ Model yükleme hatası: {e}")
             return False
 
-    def _resize_image(self, image_path, long_edge_max=1600):
-        """Görüntüyü hız optimizasyonu için yeniden boyutlandır"""
-        try:
-            img = Image.open(image_path).convert('RGB')
-            w, h = img.size
-            long_edge = max(w, h)
+    def _enable_in_memory_images(self):
+        """
+        GOT-OCR2 chat() görüntüyü load_image ile her seferinde diskten açar.
+        load_image'ı sarmalayarak PIL görüntülerinin doğrudan geçmesini sağla.
+        """
+        load_image = getattr(self.model, 'load_image', None)
+        if not callable(load_image):
+            self.accepts_images = False
+            logger.info("ℹ️ Model bellekteki görüntüleri desteklemiyor, geçici dosya kullanılacak")
+            return
+
+        def load_image_or_passthrough(image_file):
+            if isinstance(image_file, Image.Image):
+                return image_file
+            return load_image(image_file)
+
+        self.model.load_image = load_image_or_passthrough
+        self.accepts_images = True
 
-            if long_edge <= long_edge_max:
-                return image_path
+    def _enable_token_budget(self):
+        """
+        GOT-OCR2 chat() generate'e kendi max_new_tokens=4096 değerini verir,
+        generation_config'teki bütçe bu yüzden hiç uygulanmaz. generate'i
+        sarmalayarak profil bütçesini gerçek çağrıya geçir ve üretilen token
+        sayısını çıktının boyundan ölç.
+        """
+        generate = getattr(self.model, 'generate', None)
+        if not callable(generate):
+            logger.info("ℹ️ Model generate sarmalanamadı, token bütçesi generation_config ile verilecek")
+            return
 
-            scale = long_edge_max / float(long_edge)
-            new_w, new_h = max(1, int(w * scale)), max(1, int(h * scale))
-            img = img.resize((new_w, new_h))
+        def generate_with_budget(*args, **kwargs):
+            if self._max_new_tokens is not None:
+                kwargs['max_new_tokens'] = self._max_new_tokens
+            output = generate(*args, **kwargs)
 
-            # Geçici dosya oluştur
-            temp_dir = os.path.join(os.path.dirname(image_path), "_runtime")
-            os.makedirs(temp_dir, exist_ok=True)
-            temp_path = os.path.join(temp_dir, f"resized_{int(time.time())}.png")
-            img.save(temp_path, format='PNG')
+            # Çıktı prompt token'larını da içerir
+            input_ids = args[0] if args else kwargs.get('input_ids')
+            sequences = getattr(output, 'sequences', output)
+            try:
+                prompt_length = input_ids.shape[-1] if input_ids is not None else 0
+                self._generated_tokens = int(sequences.shape[-1] - prompt_length)
+            except AttributeError:
+                self._generated_tokens = None
+            return output
 
-            return temp_path
+        self.model.generate = generate_with_budget
 
-        except Exception as e:
-            logger.warning(f"Görüntü yeniden boyutlandırma hatası: {e}")
-            return image_path
+    @contextmanager
+    def _model_input(self, image):
+        """Hazırlanmış görüntüyü modelin kabul ettiği girdiye çevir"""
+        if self.accepts_images:
+            yield image
+            return
+
+        # Model dosya yolu istiyor: RAM tabanlı dizinde benzersiz geçici dosya
+        fd, temp_path = tempfile.mkstemp(prefix='dotocr_', suffix='.png', dir=TMPFS_DIR)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                image.save(f, format='PNG', compress_level=1)
+            yield temp_path
+        finally:
+            try:
+                os.unlink(temp_path)
+            except OSError:
+                pass
 
     def _get_extraction_prompt(self):
         """Detaylı extraction prompt - yüksek doğruluk için optimize edilmiş"""
@@ -166,18 +508,71 @@ class DOTOCR:
             "Unreadable section → [...]"
         )
 
-    def extract_text(self, image_path, custom_prompt=None):
+    def prepare_image(self, image_path, long_edge_max=1600):
+        """
+        Görüntüyü tek seferde çöz, doğrula ve hız için yeniden boyutlandır
+
+        Modele ihtiyaç duymaz ve thread-safe'tir; toplu işlemde sonraki
+        görüntüler model çalışırken arka planda hazırlanır.
+
+        Args:
+            image_path (str): Görüntü dosya yolu
+            long_edge_max (int): Uzun kenar üst sınırı
+
+        Returns:
+            PIL.Image.Image: Modele verilecek RGB görüntü
+        """
+        if not os.path.exists(image_path):
+            raise FileNotFoundError(f'Görüntü bulunamadı: {image_path}')
+
+        with Image.open(image_path) as img:
+            w, h = img.size
+            scale = min(1.0, long_edge_max / float(max(w, h)))
+            target = (max(1, int(w * scale)), max(1, int(h * scale)))
+
+            # JPEG'lerde hedef boyuta yakın ölçekte çöz (tam çözünürlük hiç açılmaz)
+            if scale < 1.0:
+                img.draft('RGB', target)
+
+            image = img.convert('RGB')
+
+        if image.size != target:
+            image = image.resize(target)
+
+        return image
+
+    def _set_max_new_tokens(self, max_new_tokens):
+        """Bir sonraki chat() çağrısı için token bütçesini ayarla"""
+        self._max_new_tokens = max_new_tokens
+        self._generated_tokens = None
+        generation_config = getattr(self.model, 'generation_config', None)
+        if generation_config is not None:
+            generation_config.max_new_tokens = max_new_tokens
+
+    def _count_tokens(self, text):
+        """Üretilen metnin token sayısı"""
+        try:
+            return len(self.tokenizer.encode(text, add_special_tokens=False))
+        except Exception:
+            return 0
+
+    def extract_text(self, image_path, custom_prompt=None, image=None, profile=None, max_new_tokens=None):
         """
         Görüntüden metin çıkar
 
         Args:
             image_path (str): Görüntü dosya yolu
             custom_prompt (str): Özel prompt (varsa)
+            image (PIL.Image.Image): prepare_image ile önceden hazırlanmış görüntü (varsa)
+            profile (str): Üretim profili (varsayılan: örneğin profili)
+            max_new_tokens (int): Sabit token bütçesi (verilmezse yoğunluktan hesaplanır)
 
         Returns:
             dict: Çıkarım sonucu
         """
         try:
+            import torch
+
             if not self.is_initialized:
                 if not self.initialize_model():
                     return {
@@ -186,18 +581,21 @@ class DOTOCR:
                         'text': ''
                     }
 
-            # Görüntü kontrolü
-            if not os.path.exists(image_path):
-                return {
-                    'success': False,
-                    'error': f'Görüntü bulunamadı: {image_path}',
-                    'text': ''
-                }
+            profile = profile or self.profile
+            if profile not in GENERATION_PROFILES:
+                raise ValueError(f"Bilinmeyen profil: {profile}")
 
-            logger.info(f"📷 Görüntü yükleniyor: {os.path.basename(image_path)}")
+            if image is None:
+                logger.info(f"📷 Görüntü yükleniyor: {os.path.basename(image_path)}")
+                image = self.prepare_image(
+                    image_path, long_edge_max=GENERATION_PROFILES[profile]['long_edge_max']
+                )
 
-            # Görüntü yükleme kontrolü
-            _ = Image.open(image_path)
+            # Token bütçesini metin yoğunluğuna göre belirle
+            density = estimate_text_density(image)
+            if max_new_tokens is None:
+                max_new_tokens = token_budget(density, profile)
+            self._set_max_new_tokens(max_new_tokens)
 
             # Hız optimizasyonları
             if torch.cuda.is_available():
@@ -207,60 +605,60 @@ class DOTOCR:
                 except:
                     pass
 
-            # Görüntüyü yeniden boyutlandır
-            resized_path = self._resize_image(image_path, long_edge_max=1600)
-
             # Prompt oluştur
             prompt = custom_prompt or self._get_extraction_prompt()
 
-            logger.info("🔍 OCR işlemi başlatılıyor...")
+            logger.info(f"🔍 OCR işlemi başlatılıyor (profil: {profile}, yoğunluk: {density:.3f}, "
+                        f"max_new_tokens: {max_new_tokens})...")
 
             start_time = time.time()
 
-            with torch.inference_mode():
+            with torch.inference_mode(), self._model_input(image) as model_input:
                 try:
                     # GOT-OCR2 için basit metin çıkarımı
                     result = self.model.chat(
                         self.tokenizer,
-                        resized_path,
+                        model_input,
                         question=prompt
                     )
                 except TypeError:
                     try:
                         result = self.model.chat(
                             self.tokenizer,
-                            resized_path,
+                            model_input,
                             question=prompt
                         )
                     except TypeError:
                         # Son çare: prompt'suz
                         result = self.model.chat(
                             self.tokenizer,
-                            resized_path,
+                            model_input,
                             ocr_type='ocr'
                         )
 
             processing_time = time.time() - start_time
+            # Gerçek generate çıktısının boyu; ölçülemediyse metin yeniden token'lanır
+            generated_tokens = self._generated_tokens
+            if generated_tokens is None:
+                generated_tokens = self._count_tokens(result)
+            truncated = generated_tokens >= max_new_tokens
 
-            # Geçici dosyayı temizle
-            if resized_path != image_path and os.path.exists(resized_path):
-                try:
-                    os.unlink(resized_path)
-                    # _runtime klasörünü de temizle
-                    runtime_dir = os.path.dirname(resized_path)
-                    if os.path.exists(runtime_dir) and not os.listdir(runtime_dir):
-                        os.rmdir(runtime_dir)
-                except:
-                    pass
-
-            logger.info(".2f")
+            logger.info(f"⏱️ OCR süresi: {processing_time:.2f}s ({generated_tokens} token)")
+            if truncated:
+                logger.warning(f"⚠️ Çıktı token bütçesine ({max_new_tokens}) ulaştı, kesilmiş olabilir")
 
             return {
                 'success': True,
                 'text': result,
                 'processing_time': processing_time,
                 'model': 'GOT-OCR2',
-                'device': self.device
+                'device': self.device,
+                'profile': profile,
+                'text_density': density,
+                'max_new_tokens': max_new_tokens,
+                'generated_tokens': generated_tokens,
+                'tokens_per_sec': generated_tokens / processing_time if processing_time > 0 else 0.0,
+                'truncated': truncated
             }
 
         except Exception as e:
@@ -271,60 +669,557 @@ class DOTOCR:
                 'text': ''
             }
 
-def main():
-    """Komut satırı arayüzü"""
-    parser = argparse.ArgumentParser(
-        description='DOT-OCR (GOT-OCR2) Komut Satırı Uygulaması',
-        formatter_class=argparse.RawDescriptionHelpFormatter,
-        epilog="""
-Kullanım örnekleri:
-  python dotOCR.py 1.png                    # temp/1.png dosyasını işle
-  python dotOCR.py 2.PNG --output result.txt    # Çıktıyı dosyaya kaydet
-  python dotOCR.py temp/image.jpg --custom-prompt "Özel promptunuz"
+    def _timed_prepare(self, item, long_edge_max):
+        """prepare_image'ı süre ölçümüyle çalıştır (arka plan thread'i için)"""
+        if isinstance(item, dict):
+            # Önceden hazırlanmış görüntü (ör. şablon modunda alan kırpısı)
+            return item['image'], 0.0
+        start_time = time.time()
+        image = self.prepare_image(item, long_edge_max=long_edge_max)
+        return image, time.time() - start_time
 
-Not: Sadece dosya adı yazarsanız (örn: 1.png) otomatik olarak temp/ klasöründen aranır.
-     Tek kapsamlı prompt kullanılır - RAG sistemi için optimize edilmiştir.
+    def extract_batch(self, image_paths, custom_prompt=None, prefetch_workers=2, profile=None):
         """
-    )
+        Birden fazla görüntüyü işle
 
-    parser.add_argument('image_path', help='İşlenecek görüntü dosyası')
-    parser.add_argument('--model-path', default=r"C:\Users\samet\Downloads\GOT-OCR2_0",
-                       help='GOT-OCR2 model dizini yolu')
-    parser.add_argument('--custom-prompt', help='Özel prompt')
-    parser.add_argument('--output', '-o', help='Çıktı dosyası')
-    parser.add_argument('--quiet', '-q', action='store_true', help='Sadece sonucu göster')
+        Model bir görüntü üzerinde çalışırken sonraki görüntülerin çözme,
+        yeniden boyutlandırma ve doğrulama adımları thread havuzunda yapılır.
 
-    args = parser.parse_args()
+        Args:
+            image_paths (list): Görüntü dosya yolları ya da hazır görüntüler
+                ({'image', 'image_path', 'prompt', 'max_new_tokens'} sözlükleri)
+            custom_prompt (str): Özel prompt (varsa)
+            prefetch_workers (int): Arka planda hazırlık yapan thread sayısı
+            profile (str): Üretim profili (varsayılan: örneğin profili)
 
-    # Dosya yolunu ayarla - eğer sadece dosya adı verilmişse temp klasöründen ara
-    if not os.path.exists(args.image_path):
-        # Eğer sadece dosya adı verilmişse (path ayırıcı içermiyorsa) temp klasöründen ara
-        if os.sep not in args.image_path and '/' not in args.image_path:
-            temp_path = os.path.join('temp', args.image_path)
-            if os.path.exists(temp_path):
-                args.image_path = temp_path
+        Yields:
+            dict: Girdi sırasıyla her görüntünün çıkarım sonucu ve süreleri
+        """
+        image_paths = list(image_paths)
+
+        def label(item):
+            return item.get('image_path') if isinstance(item, dict) else item
+
+        if not self.is_initialized and not self.initialize_model():
+            for item in image_paths:
+                yield {
+                    'success': False,
+                    'error': 'Model başlatılamadı',
+                    'text': '',
+                    'image_path': label(item)
+                }
+            return
+
+        profile = profile or self.profile
+        long_edge_max = GENERATION_PROFILES[profile]['long_edge_max']
+        prefetch_workers = max(1, prefetch_workers)
+        queued = iter(image_paths)
+        pending = deque()
+
+        def submit_next():
+            item = next(queued, None)
+            if item is not None:
+                pending.append((item, pool.submit(self._timed_prepare, item, long_edge_max)))
+
+        pool = ThreadPoolExecutor(max_workers=prefetch_workers, thread_name_prefix='dotocr-prefetch')
+        try:
+            # Havuz + model için sürekli hazır bekleyen bir görüntü
+            for _ in range(prefetch_workers + 1):
+                submit_next()
+
+            while pending:
+                item, future = pending.popleft()
+                submit_next()
+                image_path = label(item)
+                options = item if isinstance(item, dict) else {}
+
+                start_time = time.time()
+                try:
+                    image, prepare_time = future.result()
+                except Exception as e:
+                    logger.error(f"❌ Görüntü hazırlama hatası ({image_path}): {e}")
+                    result = {'success': False, 'error': str(e), 'text': ''}
+                    prepare_time = None
+                    wait_time = time.time() - start_time
+                else:
+                    wait_time = time.time() - start_time
+                    result = self.extract_text(
+                        image_path, options.get('prompt', custom_prompt), image=image, profile=profile,
+                        max_new_tokens=options.get('max_new_tokens')
+                    )
+                    del image
+
+                result.update({
+                    'image_path': image_path,
+                    'prepare_time': prepare_time,
+                    'wait_time': wait_time,
+                    'elapsed': time.time() - start_time
+                })
+                yield result
+        finally:
+            # Erken kapatılırsa bekleyen hazırlıkları iptal et
+            for _, future in pending:
+                future.cancel()
+            pool.shutdown(wait=True)
+
+    def benchmark_profiles(self, image_paths, profiles=None, custom_prompt=None):
+        """
+        Üretim profillerini aynı görüntü kümesi üzerinde karşılaştır
+
+        Args:
+            image_paths (list): Görüntü dosya yolları
+            profiles (list): Karşılaştırılacak profiller (varsayılan: hepsi)
+            custom_prompt (str): Özel prompt (varsa)
+
+        Returns:
+            dict: Profil başına tokens/sn, kesilme oranı ve süre özetleri
+        """
+        report = {}
+
+        for profile in profiles or GENERATION_PROFILES:
+            logger.info(f"📏 Profil ölçülüyor: {profile}")
+            results = list(self.extract_batch(image_paths, custom_prompt, profile=profile))
+            succeeded = [r for r in results if r.get('success')]
+
+            generated_tokens = sum(r['generated_tokens'] for r in succeeded)
+            inference_time = sum(r['processing_time'] for r in succeeded)
+            truncated = sum(1 for r in succeeded if r['truncated'])
+
+            report[profile] = {
+                'images': len(results),
+                'succeeded': len(succeeded),
+                'generated_tokens': generated_tokens,
+                'inference_time': inference_time,
+                'tokens_per_sec': generated_tokens / inference_time if inference_time > 0 else 0.0,
+                'truncation_rate': truncated / len(succeeded) if succeeded else 0.0,
+                'mean_processing_time': inference_time / len(succeeded) if succeeded else 0.0
+            }
+
+        return report
+
+    def _get_field_prompt(self):
+        """Tek bir form alanı kırpısı için kısa prompt"""
+        return (
+            "Extract ONLY the text in this image exactly as written. "
+            "Preserve Turkish characters and date/number formats. "
+            "If the field is empty, output nothing. Plain text only."
+        )
+
+    def extract_fields(self, image_path, templates, form_type=None, profile=None, engine='got'):
+        """
+        Şablon modunda yalnızca tanımlı form alanlarını OCR'la
+
+        Sayfa referans forma hizalanır, alan kutuları sayfaya taşınır ve model
+        sadece bu kırpılar üzerinde çalışır. Kırpılar GOT-OCR2 ile extract_batch
+        üzerinden art arda, Qwen2.5-VL ile api.py servisine eşzamanlı gönderilir.
+
+        Args:
+            image_path (str): Görüntü dosya yolu
+            templates (dict): load_form_templates çıktısı
+            form_type (str): Form tipi (verilmezse en iyi eşleşen şablon seçilir)
+            profile (str): Üretim profili (varsayılan: örneğin profili)
+            engine (str): Alan kırpılarını okuyan model ('got' veya 'qwen')
+
+        Returns:
+            dict: Alan adı -> metin eşlemesi ve alan bazında ayrıntılar
+        """
+        start_time = time.time()
+
+        try:
+            if form_type is not None and form_type not in templates:
+                raise ValueError(f"Bilinmeyen form tipi: {form_type}")
+            if engine not in FIELD_ENGINES:
+                raise ValueError(f"Bilinmeyen alan motoru: {engine}")
+
+            image = self.prepare_image(image_path, long_edge_max=TEMPLATE_LONG_EDGE_MAX)
+
+            # Form tipini ve hizalamayı belirle
+            candidates = [form_type] if form_type else list(templates)
+            alignments = {
+                name: align_to_template(image, templates[name]['reference'])
+                for name in candidates
+            }
+            form_type = max(alignments, key=lambda name: alignments[name][1])
+            matrix, score = alignments[form_type]
+
+            # Adıyla seçilen şablon da denetlenir: yanlış forma kırpı yapılmaz
+            if score < TEMPLATE_MIN_SCORE:
+                raise ValueError(f"Şablon eşleşmedi (en iyi: {form_type}, skor: {score:.2f})")
+
+            logger.info(f"📐 Şablon: {form_type} (hizalama skoru: {score:.2f}, motor: {engine})")
+
+            template = templates[form_type]
+            fields = {}
+            details = {}
+            crops = []
+            cropped_pixels = 0
+            generated_tokens = 0
+
+            for name, field in template['fields'].items():
+                crop_box = map_field_box(field['box'], matrix, image.size)
+                left, top, right, bottom = crop_box
+
+                if right - left < 2 or bottom - top < 2:
+                    fields[name] = ''
+                    details[name] = {'box': list(crop_box), 'success': False, 'error': 'Alan sayfa dışında'}
+                    continue
+
+                crop = image.crop(crop_box)
+                cropped_pixels += crop.width * crop.height
+                crops.append({
+                    'name': name,
+                    'box': crop_box,
+                    'image': crop,
+                    'image_path': f"{image_path}#{name}",
+                    'prompt': field.get('prompt') or template['prompt'] or self._get_field_prompt(),
+                    'max_new_tokens': field.get('max_new_tokens', FIELD_MAX_NEW_TOKENS)
+                })
+
+            if engine == 'qwen':
+                results = qwen_extract_images(crops)
             else:
-                print(f"❌ Hata: '{args.image_path}' dosyası bulunamadı")
-                print(f"   Temp klasöründen arandı: {temp_path}")
-                return 1
+                results = list(self.extract_batch(crops, profile=profile))
+
+            for crop, result in zip(crops, results):
+                name = crop['name']
+                fields[name] = result.get('text', '').strip()
+                generated_tokens += result.get('generated_tokens', 0)
+                details[name] = {
+                    'box': list(crop['box']),
+                    'success': result['success'],
+                    'processing_time': result.get('processing_time', 0.0),
+                    'truncated': result.get('truncated', False)
+                }
+                if not result['success']:
+                    details[name]['error'] = result.get('error', '')
+
+            return {
+                'success': True,
+                'form_type': form_type,
+                'alignment_score': score,
+                'engine': engine,
+                'fields': fields,
+                'field_details': details,
+                'generated_tokens': generated_tokens,
+                'pixel_ratio': cropped_pixels / float(image.width * image.height),
+                'processing_time': time.time() - start_time,
+                'model': 'Qwen2.5-VL' if engine == 'qwen' else 'GOT-OCR2',
+                'device': self.device
+            }
+
+        except Exception as e:
+            logger.error(f"❌ Şablon OCR hatası: {e}")
+            return {
+                'success': False,
+                'error': str(e),
+                'fields': {},
+                'processing_time': time.time() - start_time
+            }
+
+class _DaemonRequestHandler(socketserver.StreamRequestHandler):
+    """Tek satırlık JSON isteği okuyup JSON satır(lar)ı ile yanıt döner"""
+
+    def handle(self):
+        line = self.rfile.readline()
+        if not line:
+            return
+
+        try:
+            request = json.loads(line.decode('utf-8'))
+        except Exception as e:
+            response = {'success': False, 'error': f'Geçersiz istek: {e}', 'text': ''}
         else:
-            print(f"❌ Hata: '{args.image_path}' dosyası bulunamadı")
-            return 1
+            response = self.server.dispatch(request)
+
+        # Toplu isteklerde her sonuç hazır oldukça ayrı satır olarak gönderilir
+        responses = [response] if isinstance(response, dict) else response
+        for item in responses:
+            self.wfile.write((json.dumps(item, ensure_ascii=False) + '\n').encode('utf-8'))
+            self.wfile.flush()
+
+
+class DOTOCRDaemon(socketserver.ThreadingTCPServer):
+    """Modeli bellekte tutan ve localhost üzerinden OCR isteklerini karşılayan servis"""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, ocr, host=DEFAULT_DAEMON_HOST, port=DEFAULT_DAEMON_PORT):
+        """
+        Args:
+            ocr (DOTOCR): Modeli yüklenmiş OCR örneği
+            host (str): Dinlenecek adres
+            port (int): Dinlenecek port
+        """
+        super().__init__((host, port), _DaemonRequestHandler)
+        self.ocr = ocr
+        # Model aynı anda tek istek işler
+        self._model_lock = threading.Lock()
+
+    def dispatch(self, request):
+        """İsteği komutuna göre işle (toplu isteklerde sonuç üreteci döner)"""
+        cmd = request.get('cmd', 'ocr')
+
+        if cmd == 'ping':
+            return {
+                'success': True,
+                'model_path': self.ocr.model_path,
+                'device': self.ocr.device,
+                'pid': os.getpid()
+            }
+
+        if cmd == 'shutdown':
+            threading.Thread(target=self.shutdown, daemon=True).start()
+            return {'success': True}
+
+        if cmd not in ('ocr', 'batch', 'fields'):
+            return {'success': False, 'error': f'Bilinmeyen komut: {cmd}', 'text': ''}
+
+        model_path = request.get('model_path')
+        if model_path and not _same_path(model_path, self.ocr.model_path):
+            return {
+                'success': False,
+                'error': f'Daemon farklı bir model ile çalışıyor: {self.ocr.model_path}',
+                'error_code': 'model_mismatch',
+                'text': ''
+            }
+
+        if cmd == 'batch':
+            return self._run_batch(request)
+
+        if cmd == 'fields':
+            try:
+                templates = load_form_templates(request.get('templates_path', ''))
+            except Exception as e:
+                return {'success': False, 'error': f'Şablonlar yüklenemedi: {e}', 'fields': {}}
+
+            with self._model_lock:
+                result = self.ocr.extract_fields(
+                    request.get('image_path', ''),
+                    templates,
+                    request.get('form_type'),
+                    profile=request.get('profile'),
+                    engine=request.get('engine', 'got')
+                )
+
+            result['daemon'] = True
+            return result
+
+        with self._model_lock:
+            result = self.ocr.extract_text(
+                request.get('image_path', ''),
+                request.get('custom_prompt'),
+                profile=request.get('profile')
+            )
+
+        result['daemon'] = True
+        return result
+
+    def _run_batch(self, request):
+        """Toplu isteği işle, sonuçları sırayla üret"""
+        with self._model_lock:
+            for result in self.ocr.extract_batch(
+                request.get('image_paths', []),
+                request.get('custom_prompt'),
+                prefetch_workers=request.get('prefetch_workers', 2),
+                profile=request.get('profile')
+            ):
+                result['daemon'] = True
+                yield result
+
+
+def _same_path(a, b):
+    """İki dosya yolunun aynı yeri gösterip göstermediğini kontrol et"""
+    return os.path.normcase(os.path.abspath(a)) == os.path.normcase(os.path.abspath(b))
+
+
+def _open_daemon_stream(request, host, port, timeout):
+    """Daemon'a bağlanıp isteği gönder; bağlantı kurulamazsa None döner"""
+    try:
+        sock = socket.create_connection((host, port), timeout=DAEMON_CONNECT_TIMEOUT)
+    except OSError:
+        return None
+
+    try:
+        sock.settimeout(timeout)
+        sock.sendall((json.dumps(request, ensure_ascii=False) + '\n').encode('utf-8'))
+    except OSError as e:
+        logger.warning(f"Daemon iletişim hatası: {e}")
+        sock.close()
+        return None
+
+    return sock
+
+
+def _read_daemon_stream(sock):
+    """
+    Daemon'dan gelen JSON satırlarını sırayla üret
+
+    Çözümlenemeyen satır akışı kesmez; o öğe için hata sonucu üretilir
+    (error_code: invalid_response) ve sonraki satırlarla devam edilir.
+    """
+    with sock, sock.makefile('rb') as stream:
+        for line in stream:
+            try:
+                yield json.loads(line.decode('utf-8'))
+            except ValueError as e:
+                logger.warning(f"Daemon yanıtı çözümlenemedi: {e}")
+                yield {
+                    'success': False,
+                    'error': f'Daemon yanıtı çözümlenemedi: {e}',
+                    'error_code': 'invalid_response',
+                    'text': ''
+                }
+
+
+def send_to_daemon(request, host=DEFAULT_DAEMON_HOST, port=DEFAULT_DAEMON_PORT, timeout=None):
+    """
+    Çalışan daemon'a istek gönder
+
+    Args:
+        request (dict): Gönderilecek JSON isteği
+        host (str): Daemon adresi
+        port (int): Daemon portu
+        timeout (float): Yanıt için bekleme süresi (None: sınırsız)
+
+    Returns:
+        dict: Daemon yanıtı, daemon çalışmıyorsa None
+    """
+    sock = _open_daemon_stream(request, host, port, timeout)
+    if sock is None:
+        return None
+
+    stream = _read_daemon_stream(sock)
+    try:
+        response = next(stream, None)
+    except OSError as e:
+        logger.warning(f"Daemon iletişim hatası: {e}")
+        return None
+    finally:
+        # Tek yanıtlık istek: bağlantı çöp toplayıcıyı beklemeden kapatılır
+        stream.close()
+
+    # Tek istekte çözümlenemeyen yanıt daemon yokmuş gibi ele alınır (model yerelde yüklenir)
+    if response is not None and response.get('error_code') == 'invalid_response':
+        return None
+    return response
+
+
+def stream_from_daemon(request, host=DEFAULT_DAEMON_HOST, port=DEFAULT_DAEMON_PORT, timeout=None):
+    """
+    Çalışan daemon'a toplu istek gönder
+
+    Returns:
+        iterator: Daemon'dan gelen sonuçların üreteci, daemon çalışmıyorsa None
+    """
+    sock = _open_daemon_stream(request, host, port, timeout)
+    if sock is None:
+        return None
+    return _read_daemon_stream(sock)
+
+
+def serve(model_path, host=DEFAULT_DAEMON_HOST, port=DEFAULT_DAEMON_PORT):
+    """Modeli bir kez yükle ve daemon olarak istekleri karşıla"""
+    if send_to_daemon({'cmd': 'ping'}, host, port) is not None:
+        logger.error(f"❌ {host}:{port} üzerinde zaten çalışan bir daemon var")
+        return 1
+
+    ocr = DOTOCR(model_path)
+    if not ocr.initialize_model():
+        return 1
+
+    server = DOTOCRDaemon(ocr, host, port)
+    logger.info(f"🛰️ DOT-OCR daemon dinliyor: {host}:{port}")
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logger.info("⏹️ Daemon durduruluyor...")
+    finally:
+        server.server_close()
+
+    return 0
+
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp', '.gif', '.tiff', '.tif', '.webp')
+
+
+def _is_image_file(path):
+    return os.path.isfile(path) and path.lower().endswith(IMAGE_EXTENSIONS)
+
 
+def collect_image_paths(inputs):
+    """
+    Dosya, dizin ve glob girdilerini görüntü yollarına çevir
+
+    Args:
+        inputs (list): Komut satırından gelen girdiler
+
+    Returns:
+        tuple: (görüntü yolları, bulunamayan girdiler, toplu mod mu)
+    """
+    image_paths = []
+    missing = []
+    batch = len(inputs) > 1
+
+    for item in inputs:
+        if any(c in item for c in '*?['):
+            batch = True
+            matches = sorted(p for p in glob.glob(item, recursive=True) if _is_image_file(p))
+            if matches:
+                image_paths.extend(matches)
+            else:
+                missing.append(item)
+        elif os.path.isdir(item):
+            batch = True
+            image_paths.extend(sorted(
+                p for p in (os.path.join(item, name) for name in os.listdir(item))
+                if _is_image_file(p)
+            ))
+        elif os.path.exists(item):
+            image_paths.append(item)
+        # Eğer sadece dosya adı verilmişse (path ayırıcı içermiyorsa) temp klasöründen ara
+        elif os.sep not in item and '/' not in item and os.path.exists(os.path.join('temp', item)):
+            image_paths.append(os.path.join('temp', item))
+        else:
+            missing.append(item)
+
+    return image_paths, missing, batch
+
+
+def _run_single(args, image_path):
+    """Tek görüntüyü işle ve sonucu göster/kaydet"""
     # Servis başlat
     if not args.quiet:
         print("🚀 DOT-OCR başlatılıyor...")
-        print(f"📂 Görüntü: {args.image_path}")
+        print(f"📂 Görüntü: {image_path}")
         print(f"🤖 Model: {args.model_path}")
         print("-" * 50)
 
-    ocr = DOTOCR(args.model_path)
+    result = None
+    if not args.no_daemon:
+        result = send_to_daemon({
+            'cmd': 'ocr',
+            'image_path': os.path.abspath(image_path),
+            'custom_prompt': args.custom_prompt,
+            'model_path': args.model_path,
+            'profile': args.profile
+        }, args.host, args.port)
 
-    # OCR işle
-    result = ocr.extract_text(
-        args.image_path,
-        args.custom_prompt
-    )
+        if result is not None and result.get('error_code') == 'model_mismatch':
+            logger.warning(f"⚠️ {result['error']} - model bu süreçte yüklenecek")
+            result = None
+        elif result is not None and not args.quiet:
+            print(f"🛰️ İstek daemon'a iletildi ({args.host}:{args.port})")
+
+    if result is None:
+        ocr = DOTOCR(args.model_path, profile=args.profile)
+
+        # OCR işle
+        result = ocr.extract_text(
+            image_path,
+            args.custom_prompt
+        )
 
     # Sonuç göster/gönder
     if args.output:
@@ -351,5 +1246,253 @@ Not: Sadece dosya adı yazarsanız (örn: 1.png) otomatik olarak temp/ klasörü
 
     return 0
 
+
+def _run_batch(args, image_paths):
+    """Görüntüleri toplu işle, sonuçları JSONL olarak akıt"""
+    # İlerleme bilgisi stderr'e yazılır, stdout yalnızca JSONL içerir
+    def info(message):
+        if not args.quiet:
+            print(message, file=sys.stderr)
+
+    info(f"🚀 DOT-OCR toplu işlem: {len(image_paths)} görüntü")
+    info(f"🤖 Model: {args.model_path}")
+
+    start_time = time.time()
+
+    results = stream = None
+    if not args.no_daemon:
+        stream = stream_from_daemon({
+            'cmd': 'batch',
+            'image_paths': [os.path.abspath(p) for p in image_paths],
+            'custom_prompt': args.custom_prompt,
+            'model_path': args.model_path,
+            'prefetch_workers': args.prefetch_workers,
+            'profile': args.profile
+        }, args.host, args.port)
+
+        if stream is not None:
+            first = next(stream, None)
+            if first is not None and first.get('error_code') == 'model_mismatch':
+                logger.warning(f"⚠️ {first['error']} - model bu süreçte yüklenecek")
+                # Daemon bağlantısı model yerelde yüklenmeden önce kapatılır
+                stream.close()
+                stream = None
+            else:
+                info(f"🛰️ İstek daemon'a iletildi ({args.host}:{args.port})")
+                results = itertools.chain([first] if first is not None else [], stream)
+
+    if results is None:
+        ocr = DOTOCR(args.model_path, profile=args.profile)
+        results = ocr.extract_batch(image_paths, args.custom_prompt, args.prefetch_workers)
+
+    out = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+    processed = succeeded = 0
+    inference_time = 0.0
+
+    try:
+        for result in results:
+            processed += 1
+            # Çözümlenemeyen daemon satırı: sonuçlar girdi sırasıyla geldiği için yol sıradan bulunur
+            if 'image_path' not in result and processed <= len(image_paths):
+                result['image_path'] = image_paths[processed - 1]
+            if result.get('success'):
+                succeeded += 1
+            inference_time += result.get('processing_time') or 0.0
+
+            out.write(json.dumps(result, ensure_ascii=False) + '\n')
+            out.flush()
+
+            status = '✅' if result.get('success') else '❌'
+            info(f"{status} [{processed}/{len(image_paths)}] {os.path.basename(result.get('image_path', ''))} "
+                 f"- hazırlık: {result.get('prepare_time') or 0:.2f}s, "
+                 f"bekleme: {result.get('wait_time') or 0:.2f}s, "
+                 f"OCR: {result.get('processing_time') or 0:.2f}s, "
+                 f"token: {result.get('generated_tokens') or 0}/{result.get('max_new_tokens') or 0}")
+    finally:
+        # Döngü erken biterse (yazma hatası, Ctrl+C) daemon bağlantısı açık kalmaz
+        if stream is not None:
+            stream.close()
+        if out is not sys.stdout:
+            out.close()
+
+    total_time = time.time() - start_time
+    images_per_minute = processed / total_time * 60 if total_time > 0 else 0.0
+
+    info("-" * 50)
+    info(f"📊 {processed} görüntü işlendi ({succeeded} başarılı, {processed - succeeded} hatalı)")
+    info(f"⏱️  Toplam süre: {total_time:.2f}s, model süresi: {inference_time:.2f}s")
+    info(f"🚄 Hız: {images_per_minute:.1f} görüntü/dakika")
+    if args.output:
+        info(f"💾 Sonuçlar {args.output} dosyasına kaydedildi")
+
+    return 0 if succeeded == processed else 1
+
+
+def _run_templates(args, image_paths, batch):
+    """Şablon modunda alanları çıkar; tek görüntüde JSON, toplu işlemde JSONL yazar"""
+    try:
+        templates = load_form_templates(args.templates)
+    except Exception as e:
+        print(f"❌ Şablonlar yüklenemedi: {e}", file=sys.stderr)
+        return 1
+
+    ocr = None
+    use_daemon = not args.no_daemon
+    out = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+    failed = 0
+
+    try:
+        for image_path in image_paths:
+            result = None
+            if use_daemon:
+                result = send_to_daemon({
+                    'cmd': 'fields',
+                    'image_path': os.path.abspath(image_path),
+                    'templates_path': os.path.abspath(args.templates),
+                    'form_type': args.form_type,
+                    'model_path': args.model_path,
+                    'profile': args.profile,
+                    'engine': args.field_engine
+                }, args.host, args.port)
+
+                if result is None or result.get('error_code') == 'model_mismatch':
+                    use_daemon = False
+                    result = None
+
+            if result is None:
+                if ocr is None:
+                    ocr = DOTOCR(args.model_path, profile=args.profile)
+                result = ocr.extract_fields(image_path, templates, args.form_type, engine=args.field_engine)
+
+            result['image_path'] = image_path
+            if not result.get('success'):
+                failed += 1
+
+            if batch:
+                out.write(json.dumps(result, ensure_ascii=False) + '\n')
+            else:
+                json.dump(result, out, ensure_ascii=False, indent=2)
+                out.write('\n')
+            out.flush()
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+    return 1 if failed else 0
+
+
+def _run_benchmark(args, image_paths):
+    """Profilleri aynı görüntüler üzerinde karşılaştır ve tablo olarak göster"""
+    ocr = DOTOCR(args.model_path, profile=args.profile)
+    if not ocr.initialize_model():
+        return 1
+
+    report = ocr.benchmark_profiles(image_paths, custom_prompt=args.custom_prompt)
+
+    print(f"{'Profil':<15}{'Görüntü':>9}{'Token':>9}{'Token/sn':>10}{'Kesilme':>9}{'Ort. süre':>11}")
+    print("-" * 63)
+    for profile, stats in report.items():
+        print(f"{profile:<15}{stats['succeeded']:>9}{stats['generated_tokens']:>9}"
+              f"{stats['tokens_per_sec']:>10.1f}{stats['truncation_rate']:>9.0%}"
+              f"{stats['mean_processing_time']:>10.2f}s")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"💾 Sonuç {args.output} dosyasına kaydedildi")
+
+    return 0
+
+
+def main():
+    """Komut satırı arayüzü"""
+    parser = argparse.ArgumentParser(
+        description='DOT-OCR (GOT-OCR2) Komut Satırı Uygulaması',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Kullanım örnekleri:
+  python dotOCR.py 1.png                    # temp/1.png dosyasını işle
+  python dotOCR.py 2.PNG --output result.txt    # Çıktıyı dosyaya kaydet
+  python dotOCR.py temp/image.jpg --custom-prompt "Özel promptunuz"
+  python dotOCR.py temp/                    # Dizindeki tüm görüntüler (JSONL)
+  python dotOCR.py "scans/**/*.png" -o sonuc.jsonl
+  python dotOCR.py form.png --profile fast  # Hızlı profil (düşük token bütçesi)
+  python dotOCR.py temp/ --benchmark        # Profillerin token/sn ve kesilme oranı
+  python dotOCR.py scan.png --templates forms.json            # Yalnız form alanları (JSON)
+  python dotOCR.py scans/ --templates forms.json --form-type izin_formu
+  python dotOCR.py scan.png --templates forms.json --field-engine qwen  # Alanlar Qwen2.5-VL ile
+  python dotOCR.py --serve                  # Modeli bellekte tutan daemon'u başlat
+  python dotOCR.py --stop-daemon            # Çalışan daemon'u durdur
+
+Not: Sadece dosya adı yazarsanız (örn: 1.png) otomatik olarak temp/ klasöründen aranır.
+     Tek kapsamlı prompt kullanılır - RAG sistemi için optimize edilmiştir.
+     Daemon çalışıyorsa istek ona iletilir, yoksa model bu süreçte yüklenir.
+     Birden fazla görüntü, dizin veya glob verilirse her sonuç bir JSON satırı
+     olarak yazılır; sonraki görüntüler model çalışırken arka planda hazırlanır.
+        """
+    )
+
+    parser.add_argument('image_paths', nargs='*', metavar='image_path',
+                       help='İşlenecek görüntü dosyası, dizin veya glob')
+    parser.add_argument('--model-path', default=r"C:\Users\samet\Downloads\GOT-OCR2_0",
+                       help='GOT-OCR2 model dizini yolu')
+    parser.add_argument('--custom-prompt', help='Özel prompt')
+    parser.add_argument('--output', '-o', help='Çıktı dosyası')
+    parser.add_argument('--quiet', '-q', action='store_true', help='Sadece sonucu göster')
+    parser.add_argument('--profile', choices=list(GENERATION_PROFILES), default=DEFAULT_PROFILE,
+                       help='Üretim profili (token bütçesi ve çözünürlük)')
+    parser.add_argument('--benchmark', action='store_true',
+                       help='Tüm profilleri verilen görüntülerde karşılaştır')
+    parser.add_argument('--templates', help='Form şablonları JSON dosyası (alan bazlı OCR)')
+    parser.add_argument('--form-type', help='Şablon modunda form tipi (verilmezse otomatik seçilir)')
+    parser.add_argument('--field-engine', choices=FIELD_ENGINES, default='got',
+                       help='Şablon modunda alan kırpılarını okuyan model (qwen: api.py servisi)')
+    parser.add_argument('--prefetch-workers', type=int, default=2,
+                       help='Toplu işlemde görüntüleri arka planda hazırlayan thread sayısı')
+    parser.add_argument('--serve', action='store_true',
+                       help='Modeli bellekte tutan daemon olarak çalış')
+    parser.add_argument('--stop-daemon', action='store_true', help='Çalışan daemon\'u durdur')
+    parser.add_argument('--host', default=DEFAULT_DAEMON_HOST, help='Daemon adresi')
+    parser.add_argument('--port', type=int, default=DEFAULT_DAEMON_PORT, help='Daemon portu')
+    parser.add_argument('--no-daemon', action='store_true',
+                       help='Daemon\'a iletme, modeli bu süreçte yükle')
+
+    args = parser.parse_args()
+
+    if args.serve:
+        return serve(args.model_path, args.host, args.port)
+
+    if args.stop_daemon:
+        if send_to_daemon({'cmd': 'shutdown'}, args.host, args.port) is None:
+            print(f"❌ {args.host}:{args.port} üzerinde çalışan daemon bulunamadı")
+            return 1
+        print("⏹️ Daemon durduruldu")
+        return 0
+
+    if not args.image_paths:
+        parser.error('image_path gerekli (veya --serve kullanın)')
+
+    image_paths, missing, batch = collect_image_paths(args.image_paths)
+
+    for item in missing:
+        print(f"❌ Hata: '{item}' dosyası bulunamadı", file=sys.stderr if batch else sys.stdout)
+        if not batch and os.sep not in item and '/' not in item:
+            print(f"   Temp klasöründen arandı: {os.path.join('temp', item)}")
+
+    if not image_paths:
+        return 1
+
+    if args.benchmark:
+        return _run_benchmark(args, image_paths)
+
+    if args.templates:
+        return _run_templates(args, image_paths, batch)
+
+    if not batch:
+        return _run_single(args, image_paths[0])
+
+    status = _run_batch(args, image_paths)
+    return status or (1 if missing else 0)
+
 if __name__ == "__main__":
     exit(main())
@@ -0,0 +1,470 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Kademeli OCR Yönlendiricisi
+Her sayfa önce en ucuz motorla (SmartOCR / Tesseract) okunur; sonuç yetersizse
+GOT-OCR2 (dotOCR daemon'u) veya Qwen2.5-VL (api.py) motoruna yükseltilir
+
+Kullanım:
+    python ocr_router.py <pdf_veya_görüntü> [--config eşikler.json] [--engines tesseract,got,qwen]
+
+Yükseltme sinyalleri:
+    - Tesseract ortalama kelime güveni (min_confidence)
+    - Sözlük isabet oranı (min_dictionary_hit_rate, TurkishCorrector.word_quality)
+    - Mürekkepli sayfada çok az kelime (min_words)
+    - Renkli zemin (max_background_saturation) ve algılanan tablolar -> doğrudan Qwen
+
+Eşikler DEFAULT_THRESHOLDS'tan başlar; OCR_ROUTER_CONFIG (veya --config) JSON
+dosyası ve OCR_ROUTER_<EŞİK_ADI> ortam değişkenleri ile değiştirilebilir.
+Çıktı: ocr_py.py ile aynı biçimde JSON, ek olarak sayfa başına yönlendirme
+raporu (hangi motor yanıtladı, neden yükseltildi, tahmini kazanılan süre).
+"""
+
+import os
+import sys
+import io
+import json
+import time
+import base64
+import logging
+import argparse
+import tempfile
+import threading
+
+import cv2
+import numpy as np
+from PIL import Image
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BASE_DIR, 'utils', 'tesseract-backup'))
+sys.path.insert(0, os.path.join(BASE_DIR, 'scripts', 'preprocessing'))
+
+from ocr_py import SmartOCR, render_pdf_pages, pdf_page_info  # noqa: E402
+from page_cache import PageCache  # noqa: E402
+from enhance_contrast import analyze_image  # noqa: E402
+import dotOCR  # noqa: E402
+
+logger = logging.getLogger(__name__)
+
+# Motorlar ucuzdan pahalıya
+ENGINES = ('tesseract', 'got', 'qwen')
+
+# Yükseltme eşikleri
+DEFAULT_THRESHOLDS = {
+    "min_confidence": 75.0,             # Tesseract ortalama kelime güveni (0-100)
+    "min_dictionary_hit_rate": 0.7,     # Sözlükte bulunan / düzgün biçimli kelime oranı
+    "min_words": 8,                     # Mürekkepli sayfada bundan az kelime -> yükselt
+    "min_ink_ratio": 0.01,              # Bu orandan az koyu piksel varsa sayfa boş sayılır
+    "max_background_saturation": 0.15,  # Arka plan doygunluğu bunun üstündeyse renkli zemin -> Qwen
+    "tables_to_qwen": True,             # Tablo algılanan sayfalar Qwen'e (TSV istemiyle)
+}
+
+# Qwen'in sayfa başına süresi (sn) - kazanç tahmininin tabanı, ölçümle güncellenir
+DEFAULT_QWEN_PAGE_SECONDS = float(os.environ.get('OCR_ROUTER_QWEN_SECONDS', '60'))
+
+# Qwen düz metin istemi (tablo sayfalarında api.py'nin varsayılan TSV istemi kullanılır)
+QWEN_TEXT_PROMPT = (
+    "Extract all text from this document image exactly as written. "
+    "Preserve Turkish characters (ç, ğ, ı, ö, ş, ü, Ç, Ğ, İ, Ö, Ş, Ü), line breaks and numbers. "
+    "Output only the text, no explanations or markdown."
+)
+
+
+def load_thresholds(path=None):
+    """
+    Eşikleri yükle: varsayılanlar < JSON dosyası < OCR_ROUTER_* ortam değişkenleri
+
+    Returns:
+        dict: Eşik adı -> değer
+    """
+    thresholds = dict(DEFAULT_THRESHOLDS)
+
+    path = path or os.environ.get('OCR_ROUTER_CONFIG')
+    if path:
+        with open(path, encoding='utf-8') as f:
+            overrides = json.load(f)
+        unknown = set(overrides) - set(DEFAULT_THRESHOLDS)
+        if unknown:
+            raise ValueError(f"Bilinmeyen eşik(ler): {', '.join(sorted(unknown))}")
+        thresholds.update(overrides)
+
+    for name, default in DEFAULT_THRESHOLDS.items():
+        value = os.environ.get(f'OCR_ROUTER_{name.upper()}')
+        if value is None:
+            continue
+        if isinstance(default, bool):
+            thresholds[name] = value.lower() in ('1', 'true', 'yes')
+        else:
+            thresholds[name] = type(default)(value)
+
+    return thresholds
+
+
+def page_signals(image):
+    """
+    Sayfanın renk ve mürekkep sinyalleri (enhance_contrast.analyze_image ile aynı ölçekler)
+
+    Returns:
+        dict: background_saturation (0-1), ink_ratio (0-1), analysis_ms
+    """
+    start = time.time()
+    rgb = np.asarray(image.convert('RGB'))
+    stats = analyze_image(cv2.cvtColor(rgb, cv2.COLOR_RGB2BGR))
+
+    step = max(1, max(rgb.shape[:2]) // 512)
+    gray = cv2.cvtColor(np.ascontiguousarray(rgb[::step, ::step]), cv2.COLOR_RGB2GRAY)
+    ink_ratio = float(np.count_nonzero(gray < 128)) / gray.size if gray.size else 0.0
+
+    return {
+        "background_saturation": stats["background_saturation"],
+        "ink_ratio": round(ink_ratio, 4),
+        "analysis_ms": round((time.time() - start) * 1000, 1),
+    }
+
+
+def escalation_plan(signals, thresholds):
+    """
+    Tesseract sonucunun sinyallerinden yükseltme zincirini belirle
+
+    Renkli zemin ve tablolar Qwen'e gider (GOT düz metin üretir); düşük güven,
+    düşük sözlük isabeti veya eksik okuma önce GOT'a, yetmezse Qwen'e gider.
+
+    Returns:
+        tuple: (denenecek motorlar listesi, nedenler listesi); boş liste = Tesseract kabul
+    """
+    qwen_reasons = []
+    if signals["background_saturation"] >= thresholds["max_background_saturation"]:
+        qwen_reasons.append(f"renkli zemin ({signals['background_saturation']:.2f})")
+    if signals["tables"] and thresholds["tables_to_qwen"]:
+        qwen_reasons.append(f"tablo ({signals['tables']})")
+    if qwen_reasons:
+        return ['qwen', 'got'], qwen_reasons
+
+    reasons = []
+    has_ink = signals["ink_ratio"] >= thresholds["min_ink_ratio"]
+    if signals["words"] < thresholds["min_words"]:
+        if has_ink:
+            reasons.append(f"az kelime ({signals['words']}, mürekkep {signals['ink_ratio']:.3f})")
+    else:
+        if signals["confidence"] < thresholds["min_confidence"]:
+            reasons.append(f"düşük güven ({signals['confidence']:.1f})")
+        if signals["hit_rate"] is not None and signals["hit_rate"] < thresholds["min_dictionary_hit_rate"]:
+            reasons.append(f"düşük sözlük isabeti ({signals['hit_rate']:.2f})")
+
+    return (['got', 'qwen'], reasons) if reasons else ([], [])
+
+
+class GotEngine:
+    """GOT-OCR2 - çalışan dotOCR daemon'u üzerinden (model bu süreçte yüklenmez)"""
+
+    name = 'got'
+
+    def __init__(self, host=dotOCR.DEFAULT_DAEMON_HOST, port=dotOCR.DEFAULT_DAEMON_PORT, profile=None):
+        self.host = host
+        self.port = port
+        self.profile = profile
+        self._available = None
+
+    def available(self):
+        if self._available is None:
+            self._available = dotOCR.send_to_daemon({'cmd': 'ping'}, self.host, self.port) is not None
+            if not self._available:
+                logger.warning(f"⚠️ GOT-OCR2 daemon'u bulunamadı ({self.host}:{self.port}), atlanacak")
+        return self._available
+
+    def extract(self, image, kind='text'):
+        # Daemon dosya yolu ister; geçici PNG mümkünse RAM'de (tmpfs) tutulur
+        fd, image_path = tempfile.mkstemp(suffix='.png', dir=dotOCR.TMPFS_DIR)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                image.save(f, 'PNG')
+            request = {'cmd': 'ocr', 'image_path': image_path}
+            if self.profile:
+                request['profile'] = self.profile
+            result = dotOCR.send_to_daemon(request, self.host, self.port)
+        finally:
+            os.unlink(image_path)
+
+        if result is None:
+            self._available = False
+            return {'success': False, 'error': 'GOT-OCR2 daemon yanıt vermedi', 'text': ''}
+        return result
+
+
+class QwenEngine:
+    """Qwen2.5-VL - api.py HTTP servisi"""
+
+    name = 'qwen'
+
+    def __init__(self, api_url=None, timeout=None, max_tokens=2048):
+        self.api_url = (api_url or os.environ.get('QWEN_API_URL', 'http://localhost:8000')).rstrip('/')
+        self.timeout = timeout
+        self.max_tokens = max_tokens
+        self._available = None
+
+    def available(self):
+        if self._available is None:
+            import requests
+
+            try:
+                response = requests.get(f"{self.api_url}/health", timeout=10)
+                self._available = response.ok and bool(response.json().get('model_loaded'))
+            except requests.RequestException:
+                self._available = False
+            if not self._available:
+                logger.warning(f"⚠️ Qwen2.5-VL API hazır değil ({self.api_url}), atlanacak")
+        return self._available
+
+    def extract(self, image, kind='text'):
+        import requests
+
+        buffer = io.BytesIO()
+        image.save(buffer, 'PNG')
+        payload = {
+            'image': base64.b64encode(buffer.getvalue()).decode('ascii'),
+            'max_tokens': self.max_tokens,
+        }
+        if kind != 'table':
+            payload['prompt'] = QWEN_TEXT_PROMPT
+
+        try:
+            response = requests.post(f"{self.api_url}/ocr", json=payload, timeout=self.timeout)
+            response.raise_for_status()
+            return response.json()
+        except requests.RequestException as e:
+            return {'success': False, 'error': str(e), 'text': ''}
+
+
+class OCRRouter:
+    """
+    Kademeli OCR yönlendiricisi
+
+    Her sayfa SmartOCR ile okunur; sinyaller eşikleri geçerse sonuç kabul
+    edilir, geçmezse escalation_plan'daki motorlar sırayla denenir. Yükseltilen
+    motorun sonucu da sözlük isabetiyle denetlenir; hiçbiri eşiği geçmezse en
+    yüksek isabetli sonuç kullanılır.
+    """
+
+    def __init__(self, smart_ocr=None, thresholds=None, engines=ENGINES, got=None, qwen=None,
+                 qwen_page_seconds=DEFAULT_QWEN_PAGE_SECONDS):
+        self.smart_ocr = smart_ocr or SmartOCR()
+        self.thresholds = thresholds or load_thresholds()
+        self.engines = {}
+        if 'got' in engines:
+            self.engines['got'] = got or GotEngine()
+        if 'qwen' in engines:
+            self.engines['qwen'] = qwen or QwenEngine()
+
+        # Qwen'in sayfa başına süresi (hareketli ortalama) - "her sayfa Qwen'e" tabanı
+        self._qwen_seconds = qwen_page_seconds
+        self._lock = threading.Lock()
+
+    def _quality(self, text):
+        return self.smart_ocr.corrector.word_quality(text)
+
+    def _escalate(self, engine_name, image, kind):
+        """Tek bir yükseltme denemesi"""
+        engine = self.engines.get(engine_name)
+        if engine is None or not engine.available():
+            return None
+
+        start = time.time()
+        result = engine.extract(image, kind)
+        elapsed = time.time() - start
+
+        if engine_name == 'qwen' and result.get('success'):
+            with self._lock:
+                self._qwen_seconds = 0.8 * self._qwen_seconds + 0.2 * elapsed
+
+        text = (result.get('text') or '').strip() if result.get('success') else ''
+        quality = self._quality(text)
+        attempt = {
+            "engine": engine_name,
+            "time": round(elapsed, 3),
+            "success": bool(result.get('success')),
+            "words": quality["words"],
+            "hit_rate": quality["hit_rate"],
+        }
+        if not result.get('success'):
+            attempt["error"] = result.get('error', '')
+        return attempt, text
+
+    def route_page(self, image, page_num=1):
+        """
+        Tek sayfayı kademeli olarak OCR'la
+
+        Returns:
+            tuple: (sayfa başlıklı metin, yönlendirme raporu)
+        """
+        start = time.time()
+        signals = page_signals(image)
+
+        page_text, timing = self.smart_ocr.process_page(image, page_num)
+        text = page_text.split('\n', 1)[1] if page_text else ''
+        quality = self._quality(text)
+        signals.update({
+            "confidence": timing.get("mean_confidence", 0.0),
+            "words": quality["words"],
+            "hit_rate": quality["hit_rate"],
+            "tables": (timing.get("layout") or {}).get("tables", 0),
+        })
+
+        attempts = [{
+            "engine": "tesseract",
+            "time": round(time.time() - start, 3),
+            "success": True,
+            "words": quality["words"],
+            "hit_rate": quality["hit_rate"],
+            "confidence": signals["confidence"],
+            "cache": timing.get("cache"),
+        }]
+        candidates = [("tesseract", text, quality["hit_rate"] or 0.0)]
+
+        chain, reasons = escalation_plan(signals, self.thresholds)
+        kind = 'table' if signals["tables"] else 'text'
+        engine_used = "tesseract"
+
+        if chain:
+            logger.info(f"⤴️ Sayfa {page_num}: yükseltiliyor ({', '.join(reasons)})")
+        for engine_name in chain:
+            outcome = self._escalate(engine_name, image, kind)
+            if outcome is None:
+                continue
+            attempt, escalated_text = outcome
+            attempts.append(attempt)
+            if not attempt["success"] or not escalated_text:
+                continue
+
+            hit_rate = attempt["hit_rate"] or 0.0
+            candidates.append((engine_name, escalated_text, hit_rate))
+            if hit_rate >= self.thresholds["min_dictionary_hit_rate"]:
+                engine_used, text = engine_name, escalated_text
+                break
+        else:
+            if len(candidates) > 1:
+                # Hiçbir motor eşiği geçemedi: en yüksek isabetli sonuç
+                engine_used, text, _ = max(candidates, key=lambda c: c[2])
+
+        elapsed = time.time() - start
+        with self._lock:
+            baseline = self._qwen_seconds
+        report = {
+            "page": page_num,
+            "engine": engine_used,
+            "escalated": len(attempts) > 1,
+            "reasons": reasons,
+            "signals": signals,
+            "attempts": attempts,
+            "time": round(elapsed, 3),
+            "qwen_baseline": round(baseline, 3),
+            "saved_time": round(baseline - elapsed, 3),
+        }
+        logger.info(f"✅ Sayfa {page_num}: {engine_used} ({elapsed:.2f}s, tahmini kazanç {baseline - elapsed:.1f}s)")
+
+        return self.smart_ocr._with_page_header(page_num, text), report
+
+    def route_pdf(self, pdf_path, on_page=None):
+        """
+        PDF'in tüm sayfalarını yönlendirerek OCR'la (sayfalar RGB render edilir)
+
+        Args:
+            on_page: Her sayfa bittiğinde (page_num, page_text, report) ile çağrılır
+        """
+        start = time.time()
+        try:
+            page_count, _ = pdf_page_info(pdf_path)
+            results = []
+            for page_num, image in render_pdf_pages(pdf_path, self.smart_ocr.dpi, color=True):
+                try:
+                    page_text, report = self.route_page(image, page_num)
+                except Exception as e:
+                    logger.error(f"❌ Sayfa {page_num} hatası: {e}")
+                    page_text, report = "", {"page": page_num, "error": str(e)}
+                results.append((page_num, page_text, report))
+                if on_page:
+                    on_page(page_num, page_text, report)
+        except Exception as e:
+            logger.error(f"❌ PDF işleme hatası: {e}")
+            return {"success": False, "error": str(e), "text": ""}
+
+        final_text = "\n\n".join(text for _, text, _ in results if text)
+        return {
+            "success": True,
+            "text": final_text,
+            "pages": page_count,
+            "character_count": len(final_text),
+            "total_time": round(time.time() - start, 3),
+            "routing": self.summarize([report for _, _, report in results]),
+            "page_reports": [report for _, _, report in results],
+        }
+
+    def summarize(self, reports):
+        """Belge özeti: motor dağılımı ve "her sayfa Qwen'e" tabanına göre kazanç"""
+        reports = [r for r in reports if "engine" in r]
+        engines = {name: 0 for name in ENGINES}
+        for report in reports:
+            engines[report["engine"]] += 1
+
+        spent = sum(r["time"] for r in reports)
+        baseline = sum(r["qwen_baseline"] for r in reports)
+        return {
+            "engines": engines,
+            "escalated_pages": sum(1 for r in reports if r["escalated"]),
+            "thresholds": self.thresholds,
+            "time": round(spent, 3),
+            "qwen_baseline_time": round(baseline, 3),
+            "saved_time": round(baseline - spent, 3),
+            "saved_ratio": round(1 - spent / baseline, 3) if baseline else None,
+        }
+
+
+def main():
+    """Komut satırı arayüzü"""
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+
+    parser = argparse.ArgumentParser(description='Kademeli OCR yönlendiricisi (Tesseract -> GOT-OCR2 -> Qwen2.5-VL)')
+    parser.add_argument('input_path', help='PDF veya görüntü dosyası')
+    parser.add_argument('--config', help='Eşik JSON dosyası (OCR_ROUTER_CONFIG)')
+    parser.add_argument('--engines', default=','.join(ENGINES),
+                        help='Kullanılacak motorlar (ör. tesseract,qwen)')
+    args = parser.parse_args()
+
+    try:
+        if not os.path.exists(args.input_path):
+            raise FileNotFoundError(f"Dosya bulunamadı: {args.input_path}")
+
+        engines = [name.strip() for name in args.engines.split(',') if name.strip()]
+        unknown = set(engines) - set(ENGINES)
+        if unknown:
+            raise ValueError(f"Bilinmeyen motor(lar): {', '.join(sorted(unknown))}")
+
+        smart_ocr = SmartOCR(
+            lang=os.environ.get("TESSERACT_LANG", "tur+eng"),
+            dpi=int(os.environ.get("OCR_DPI", "300")),
+            conf_threshold=float(os.environ.get("OCR_CONF_THRESHOLD", "70")),
+            cache=PageCache.from_env()
+        )
+        router = OCRRouter(smart_ocr, load_thresholds(args.config), engines)
+
+        if args.input_path.lower().endswith('.pdf'):
+            result = router.route_pdf(args.input_path)
+        else:
+            with Image.open(args.input_path) as image:
+                page_text, report = router.route_page(image.convert('RGB'), 1)
+            result = {
+                "success": True,
+                "text": page_text,
+                "pages": 1,
+                "character_count": len(page_text),
+                "routing": router.summarize([report]),
+                "page_reports": [report],
+            }
+    except Exception as e:
+        result = {"success": False, "error": str(e), "text": ""}
+
+    print(json.dumps(result, ensure_ascii=False))
+    return 0 if result["success"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
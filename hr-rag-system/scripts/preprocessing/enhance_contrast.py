@@ -2,6 +2,19 @@
 """
 Kontrast Geliştirme Scripti
 DOT-OCR için görüntü kontrastını optimize eder
+
+Kullanım:
+    python enhance_contrast.py <input_path> <output_path> [--recipe auto|none|light|full]
+    python enhance_contrast.py --worker [--manifest <dosya>] [--workers N] [--recipe ...]
+
+Worker modunda stdin'den (veya manifest dosyasından) her satırda bir
+"girdi<TAB>çıktı" çifti ya da {"input": ..., "output": ...} JSON'u okunur;
+her görüntü için stdout'a bir JSON durum satırı, en sonda özet satırı yazılır.
+
+Varsayılan "auto" tarifinde önce görüntünün seyreltilmiş bir kopyasından
+histogram yayılımı, arka plan doygunluğu ve gürültü ölçülür; temiz dijital
+render'larda geliştirme atlanır (none), hafif sorunlularda yalnızca CLAHE
+(light), düşük kontrastlı veya renkli zeminlerde tam işlem (full) uygulanır.
 """
 
 import sys
@@ -9,61 +22,331 @@ import cv2
 import numpy as np
 from PIL import Image, ImageEnhance
 import os
+import json
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
-def enhance_contrast(input_path, output_path):
-    try:
-        # Görüntüyü yükle
-        image = cv2.imread(input_path)
-        if image is None:
-            print(f"Hata: Görüntü yüklenemedi: {input_path}")
-            return False
-
-        # Basit grayscale dönüşümü (çok daha yumuşak)
-        if len(image.shape) == 3:
-            # Renkli görüntü ise basit grayscale yap
-            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-        else:
-            gray = image
-
-        # Hafif kontrast artırma (CLAHE) – yerel kontrastı güçlendirir
+# CLAHE nesnesi iç tampon tuttuğu için thread'ler arasında paylaşılmaz;
+# her thread kendi örneğini bir kez oluşturup tüm görüntülerde kullanır
+_thread_state = threading.local()
+
+# Analiz: seyreltilmiş kopyanın uzun kenarı ve gürültü ölçümü için merkez kırpıntı boyutu
+ANALYSIS_LONG_EDGE = 512
+NOISE_CROP = 256
+
+# Gürültü tahmini çekirdeği (Immerkær); Gauss gürültüsüne yanıtın standart sapması 6σ
+_NOISE_KERNEL = np.array([[1, -2, 1], [-2, 4, -2], [1, -2, 1]], np.float32)
+
+# Tarif eşikleri
+FULL_MAX_SPREAD = 140  # p1-p99 gri aralığı bunun altındaysa düşük kontrast
+FULL_MIN_SATURATION = 0.15  # arka plan doygunluğu bunun üstündeyse renkli zemin
+LIGHT_MAX_SPREAD = 200
+LIGHT_MIN_NOISE = 3.0  # gürültü sigması (gri seviye)
+
+RECIPES = ('none', 'light', 'full')
+
+# Tam tarifin megapiksel başına süresi (ms) - çalıştıkça ölçümle güncellenir,
+# atlanan işlemlerin kazandırdığı süre bununla tahmin edilir
+_full_ms_per_mp = {"value": 15.0}
+_full_lock = threading.Lock()
+
+
+def _hist_percentiles(channel, quantiles, mask=None):
+    """8 bit kanalın yüzdelikleri (histogram üzerinden, sıralama yapmadan)"""
+    hist = cv2.calcHist([channel], [0], mask, [256], [0, 256]).ravel()
+    cdf = np.cumsum(hist)
+    if not cdf[-1]:
+        return [0.0 for _ in quantiles]
+    return [float(np.searchsorted(cdf, q * cdf[-1])) for q in quantiles]
+
+
+def analyze_image(image):
+    """
+    Ön işleme kararı için ucuz görüntü istatistikleri
+
+    Yayılım ve arka plan doygunluğu seyreltilmiş (her n. piksel) kopyadan,
+    gürültü tam çözünürlüklü merkez kırpıntının Laplace artığından ölçülür.
+
+    Returns:
+        dict: spread (0-255), background_saturation (0-1), noise (gri seviye sigması)
+    """
+    h, w = image.shape[:2]
+    step = max(1, max(h, w) // ANALYSIS_LONG_EDGE)
+    sample = image[::step, ::step]
+    color = sample.ndim == 3
+
+    gray = np.ascontiguousarray(cv2.cvtColor(sample, cv2.COLOR_BGR2GRAY) if color else sample)
+    low, median, high = _hist_percentiles(gray, (0.01, 0.5, 0.99))
+
+    saturation = 0.0
+    if color:
+        sat = cv2.cvtColor(np.ascontiguousarray(sample), cv2.COLOR_BGR2HSV)[:, :, 1]
+        # Açık tonlu yarı arka plan kabul edilir
+        background = (gray >= median).astype(np.uint8)
+        saturation = _hist_percentiles(sat, (0.5,), background)[0] / 255.0
+
+    cy, cx = h // 2, w // 2
+    half = NOISE_CROP // 2
+    crop = image[max(0, cy - half):cy + half, max(0, cx - half):cx + half]
+    if crop.ndim == 3:
+        crop = cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY)
+    residual = cv2.filter2D(crop.astype(np.float32), -1, _NOISE_KERNEL)[1:-1, 1:-1]
+    noise = 1.4826 * float(np.median(np.abs(residual))) / 6.0 if residual.size else 0.0
+
+    return {
+        "spread": round(float(high - low), 1),
+        "background_saturation": round(saturation, 3),
+        "noise": round(noise, 2),
+    }
+
+
+def choose_recipe(stats):
+    """İstatistiklere göre ön işleme tarifi: none, light veya full"""
+    if stats["background_saturation"] >= FULL_MIN_SATURATION or stats["spread"] < FULL_MAX_SPREAD:
+        return 'full'
+    if stats["spread"] < LIGHT_MAX_SPREAD or stats["noise"] >= LIGHT_MIN_NOISE:
+        return 'light'
+    return 'none'
+
+
+def get_clahe():
+    """Bu thread'e ait CLAHE örneği (ilk kullanımda oluşturulur)"""
+    clahe = getattr(_thread_state, 'clahe', None)
+    if clahe is None:
         try:
             clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
-            gray = clahe.apply(gray)
         except Exception:
-            # CLAHE yoksa normalize ile devam
-            gray = cv2.normalize(gray, None, 0, 255, cv2.NORM_MINMAX)
+            clahe = False  # CLAHE yoksa normalize kullanılır
+        _thread_state.clahe = clahe
+    return clahe
+
+
+def enhance_image(image, clahe=None, recipe='full'):
+    """
+    Yüklenmiş görüntüye kontrast geliştirme uygula (gri tonlamalı sonuç döner)
+
+    recipe: none (yalnızca gri), light (gri + CLAHE), full (+ unsharp mask ve closing)
+    """
+    # Basit grayscale dönüşümü (çok daha yumuşak)
+    if len(image.shape) == 3:
+        # Renkli görüntü ise basit grayscale yap
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    else:
+        gray = image
+
+    if recipe == 'none':
+        return gray
+
+    # Hafif kontrast artırma (CLAHE) – yerel kontrastı güçlendirir
+    clahe = get_clahe() if clahe is None else clahe
+    if clahe:
+        gray = clahe.apply(gray)
+    else:
+        # CLAHE yoksa normalize ile devam
+        gray = cv2.normalize(gray, None, 0, 255, cv2.NORM_MINMAX)
+
+    if recipe == 'light':
+        # Gürültülü görüntülerde keskinleştirme gürültüyü de büyütür
+        return gray
+
+    # Unsharp mask (çok hafif keskinleştirme)
+    blurred = cv2.GaussianBlur(gray, (0, 0), 1.0)
+    sharp = cv2.addWeighted(gray, 1.5, blurred, -0.5, 0)
+
+    # İnce çizgileri birleştirmek için küçük closing (aşırıya kaçmadan)
+    kernel = np.ones((2, 2), np.uint8)
+    sharp = cv2.morphologyEx(sharp, cv2.MORPH_CLOSE, kernel, iterations=1)
+
+    # Binary threshold yerine adaptive threshold (daha yumuşak)
+    # Bu adım tamamen kaldırıldı - sadece grayscale kalacak
+    return sharp
 
-        # Unsharp mask (çok hafif keskinleştirme)
-        blurred = cv2.GaussianBlur(gray, (0, 0), 1.0)
-        sharp = cv2.addWeighted(gray, 1.5, blurred, -0.5, 0)
 
-        # İnce çizgileri birleştirmek için küçük closing (aşırıya kaçmadan)
-        kernel = np.ones((2, 2), np.uint8)
-        sharp = cv2.morphologyEx(sharp, cv2.MORPH_CLOSE, kernel, iterations=1)
+def enhance_file(input_path, output_path, recipe='auto'):
+    """
+    Dosyadan oku, geliştir, kaydet (hata durumunda istisna fırlatır)
 
-        # Binary threshold yerine adaptive threshold (daha yumuşak)
-        # Bu adım tamamen kaldırıldı - sadece grayscale kalacak
+    Returns:
+        dict: Seçilen tarif, istatistikler, süreler ve tahmini kazanılan süre (ms)
+    """
+    image = cv2.imread(input_path)
+    if image is None:
+        raise ValueError(f"Görüntü yüklenemedi: {input_path}")
 
-        # Sonucu kaydet
-        cv2.imwrite(output_path, sharp)
-        print(f"Basit grayscale uygulandı: {output_path}")
+    info = {"recipe": recipe, "stats": None, "analysis_ms": 0.0}
+    if recipe == 'auto':
+        start = time.time()
+        info["stats"] = analyze_image(image)
+        info["recipe"] = choose_recipe(info["stats"])
+        info["analysis_ms"] = round((time.time() - start) * 1000, 1)
+
+    start = time.time()
+    result = enhance_image(image, recipe=info["recipe"])
+    enhance_ms = (time.time() - start) * 1000
+    info["enhance_ms"] = round(enhance_ms, 1)
+
+    megapixels = image.shape[0] * image.shape[1] / 1e6
+    with _full_lock:
+        if info["recipe"] == 'full' and megapixels:
+            # Hareketli ortalama ile tam tarif maliyetini güncelle
+            _full_ms_per_mp["value"] = 0.8 * _full_ms_per_mp["value"] + 0.2 * (enhance_ms / megapixels)
+        full_ms = _full_ms_per_mp["value"] * megapixels
+    info["saved_ms"] = round(full_ms - enhance_ms - info["analysis_ms"], 1) if info["recipe"] != 'full' \
+        else 0.0 - info["analysis_ms"]
+
+    if not cv2.imwrite(output_path, result):
+        raise ValueError(f"Görüntü kaydedilemedi: {output_path}")
+    return info
+
+
+def enhance_contrast(input_path, output_path, recipe='auto'):
+    try:
+        info = enhance_file(input_path, output_path, recipe)
+        print(f"Basit grayscale uygulandı ({info['recipe']}, ~{info['saved_ms']} ms kazanç): {output_path}")
         return True
 
+    except ValueError as e:
+        print(f"Hata: {e}")
+        return False
     except Exception as e:
         print(f"Basitleştirilmiş kontrast hatası: {e}")
         return False
 
+
+def parse_job(line):
+    """Worker girdisi satırını (girdi, çıktı) çiftine çevir; boş satırda None"""
+    line = line.strip()
+    if not line:
+        return None
+    if line.startswith('{'):
+        job = json.loads(line)
+        return job['input'], job['output']
+    if '\t' in line:
+        input_path, output_path = line.split('\t', 1)
+    else:
+        input_path, output_path = line.split(None, 1)
+    return input_path.strip(), output_path.strip()
+
+
+def _process_job(index, input_path, output_path, recipe='auto'):
+    """Tek görüntüyü işle ve durum satırı sözlüğünü döndür"""
+    start = time.time()
+    status = {"index": index, "input": input_path, "output": output_path, "success": True}
+    try:
+        if not os.path.exists(input_path):
+            raise ValueError(f"Girdi dosyası bulunamadı: {input_path}")
+        status.update(enhance_file(input_path, output_path, recipe))
+    except Exception as e:
+        status.update(success=False, error=str(e))
+    status["elapsed_ms"] = round((time.time() - start) * 1000, 1)
+    return status
+
+
+def run_worker(lines, workers=None, out=None, recipe='auto'):
+    """
+    Satır akışındaki işleri thread havuzunda işle
+
+    Her görüntü bittiğinde bir JSON durum satırı yazılır (tamamlanma
+    sırasıyla, "index" girdi sırasını verir). Bellekte en fazla
+    2 x workers bekleyen iş tutulur; girdi akışı bitince özet satırı yazılır.
+    """
+    out = out or sys.stdout
+    workers = workers or os.cpu_count() or 1
+    if workers > 1:
+        # Paralellik thread havuzundan gelir; OpenCV'nin iç thread'leri havuzu aşırı abone etmesin
+        cv2.setNumThreads(1)
+
+    write_lock = threading.Lock()
+    slots = threading.Semaphore(workers * 2)
+    summary = {"type": "summary", "processed": 0, "failed": 0, "saved_ms": 0.0,
+               "recipes": {name: 0 for name in RECIPES}}
+    start = time.time()
+
+    def _emit(line):
+        with write_lock:
+            out.write(json.dumps(line, ensure_ascii=False) + "\n")
+            out.flush()
+
+    def _done(future):
+        status = future.result()
+        with write_lock:
+            summary["processed"] += 1
+            summary["failed"] += 0 if status["success"] else 1
+            if status["success"]:
+                summary["recipes"][status["recipe"]] += 1
+                summary["saved_ms"] = round(summary["saved_ms"] + status["saved_ms"], 1)
+        _emit(status)
+        slots.release()
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        index = 0
+        for line in lines:
+            try:
+                job = parse_job(line)
+            except Exception as e:
+                _emit({"index": index, "success": False, "error": f"Geçersiz satır: {e}"})
+                with write_lock:
+                    summary["processed"] += 1
+                    summary["failed"] += 1
+                index += 1
+                continue
+            if job is None:
+                continue
+
+            slots.acquire()
+            pool.submit(_process_job, index, *job, recipe).add_done_callback(_done)
+            index += 1
+
+    summary["total_time"] = round(time.time() - start, 3)
+    summary["images_per_sec"] = round(summary["processed"] / summary["total_time"], 2) if summary["total_time"] else None
+    _emit(summary)
+    return summary
+
+
+def _recipe_arg(args):
+    """--recipe argümanı (varsayılan auto)"""
+    recipe = args[args.index('--recipe') + 1] if '--recipe' in args else 'auto'
+    if recipe != 'auto' and recipe not in RECIPES:
+        raise SystemExit(f"Geçersiz tarif: {recipe} (auto, {', '.join(RECIPES)})")
+    return recipe
+
+
+def worker_main(args):
+    """--worker modu argümanları: [--manifest <dosya>] [--workers N]"""
+    import io
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8', line_buffering=True)
+
+    manifest = args[args.index('--manifest') + 1] if '--manifest' in args else None
+    workers = int(args[args.index('--workers') + 1]) if '--workers' in args else None
+    recipe = _recipe_arg(args)
+
+    if manifest:
+        with open(manifest, encoding='utf-8') as f:
+            summary = run_worker(f, workers, recipe=recipe)
+    else:
+        summary = run_worker(sys.stdin, workers, recipe=recipe)
+    return summary["failed"] == 0
+
+
 if __name__ == "__main__":
-    if len(sys.argv) != 3:
-        print("Kullanım: python enhance_contrast.py <input_path> <output_path>")
+    if '--worker' in sys.argv:
+        sys.exit(0 if worker_main(sys.argv[1:]) else 1)
+
+    recipe = _recipe_arg(sys.argv)
+    args = [arg for arg in sys.argv[1:] if arg not in ('--recipe', recipe)]
+
+    if len(args) != 2:
+        print("Kullanım: python enhance_contrast.py <input_path> <output_path> [--recipe auto|none|light|full]")
+        print("         python enhance_contrast.py --worker [--manifest <dosya>] [--workers N] [--recipe ...]")
         sys.exit(1)
 
-    input_path = sys.argv[1]
-    output_path = sys.argv[2]
+    input_path = args[0]
+    output_path = args[1]
 
     if not os.path.exists(input_path):
         print(f"Girdi dosyası bulunamadı: {input_path}")
         sys.exit(1)
 
-    success = enhance_contrast(input_path, output_path)
+    success = enhance_contrast(input_path, output_path, recipe)
     sys.exit(0 if success else 1)
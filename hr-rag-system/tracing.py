@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Süreçler Arası İstek İzleme
+W3C traceparent başlığı ile bağlam taşıma ve yerel JSONL span dışa aktarımı
+
+Bir OCR çağrısı istemci (app.py / localQwenVL.js) ve sunucu (api.py) arasında
+aynı trace kimliğini taşır. Her aşama bir span olarak OCR_TRACE_FILE dosyasına
+satır başına bir JSON (OTLP alan adlarıyla) yazılır; birden çok süreç aynı
+dosyaya ekleme yapabilir. OCR_TRACE_FILE verilmezse span'ler yazılmaz, yalnızca
+kimlikler üretilip başlıklarla taşınır.
+
+Sorgu örneği:
+    python tracing.py <trace_id>     # trace'in span'lerini zaman sırasıyla göster
+"""
+
+import os
+import sys
+import json
+import time
+import secrets
+import threading
+import contextvars
+from contextlib import contextmanager
+
+# Span dosyası ve döndürme sınırı (OCR_TRACE_FILE / OCR_TRACE_MAX_MB)
+TRACE_FILE = os.environ.get('OCR_TRACE_FILE')
+TRACE_MAX_MB = float(os.environ.get('OCR_TRACE_MAX_MB', '50'))
+
+# İstek kimliği başlığı (trace kimliği ile aynıdır)
+REQUEST_ID_HEADER = 'X-Request-ID'
+
+_current_span = contextvars.ContextVar('current_span', default=None)
+
+
+def new_trace_id():
+    return secrets.token_hex(16)
+
+
+def new_span_id():
+    return secrets.token_hex(8)
+
+
+def parse_traceparent(header):
+    """
+    W3C traceparent başlığını çöz ("00-<trace_id>-<span_id>-<flags>")
+
+    Returns:
+        tuple: (trace_id, parent_span_id) ya da geçersizse None
+    """
+    if not header:
+        return None
+    parts = header.strip().split('-')
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    try:
+        int(parts[1], 16)
+        int(parts[2], 16)
+    except ValueError:
+        return None
+    if parts[1] == '0' * 32 or parts[2] == '0' * 16:
+        return None
+    return parts[1], parts[2]
+
+
+def request_id_to_trace_id(request_id):
+    """Serbest biçimli X-Request-ID'den trace kimliği (32 hex değilse hash'lenir)"""
+    request_id = (request_id or '').strip().lower().replace('-', '')
+    if len(request_id) == 32 and all(ch in '0123456789abcdef' for ch in request_id):
+        return request_id
+    import hashlib
+    return hashlib.sha256(request_id.encode('utf-8')).hexdigest()[:32]
+
+
+class Span:
+    """Tek bir zamanlanmış işlem"""
+
+    def __init__(self, tracer, name, trace_id, parent_id=None, attributes=None, start_ns=None):
+        self.tracer = tracer
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = new_span_id()
+        self.parent_id = parent_id
+        self.attributes = dict(attributes or {})
+        self.start_ns = start_ns or time.time_ns()
+        self.end_ns = None
+        self.status = 'ok'
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def traceparent(self):
+        """Bu span'i üst span yapan W3C traceparent başlığı"""
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    def headers(self):
+        """Giden HTTP isteğine eklenecek izleme başlıkları"""
+        return {'traceparent': self.traceparent(), REQUEST_ID_HEADER: self.trace_id}
+
+    def end(self, end_ns=None, error=None):
+        if self.end_ns is not None:
+            return
+        self.end_ns = end_ns or time.time_ns()
+        if error is not None:
+            self.status = 'error'
+            self.attributes['error'] = str(error)
+        self.tracer.export(self)
+
+    def to_dict(self):
+        return {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "parentSpanId": self.parent_id,
+            "name": self.name,
+            "service": self.tracer.service,
+            # OTLP JSON'da 64 bit zaman damgaları metin olarak yazılır
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "durationMs": round((self.end_ns - self.start_ns) / 1e6, 3),
+            "status": self.status,
+            "attributes": self.attributes,
+        }
+
+
+class Tracer:
+    """
+    Span üretici ve JSONL dışa aktarıcı
+
+    Etkin span contextvars ile izlenir; iç içe span() çağrıları (async
+    işleyiciler dahil) otomatik olarak üst span'e bağlanır.
+    """
+
+    def __init__(self, service, path=TRACE_FILE, max_mb=TRACE_MAX_MB):
+        self.service = service
+        self.path = path
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return bool(self.path)
+
+    def start_span(self, name, parent=None, traceparent=None, request_id=None, **attributes):
+        """
+        Yeni span başlat
+
+        Üst bağlam sırasıyla: parent span, traceparent başlığı, X-Request-ID,
+        etkin span; hiçbiri yoksa yeni bir trace başlar.
+        """
+        parent_id = None
+        if parent is not None:
+            trace_id, parent_id = parent.trace_id, parent.span_id
+        elif parse_traceparent(traceparent):
+            trace_id, parent_id = parse_traceparent(traceparent)
+        elif request_id:
+            trace_id = request_id_to_trace_id(request_id)
+        else:
+            current = _current_span.get()
+            if current is not None:
+                trace_id, parent_id = current.trace_id, current.span_id
+            else:
+                trace_id = new_trace_id()
+        return Span(self, name, trace_id, parent_id, attributes)
+
+    @contextmanager
+    def span(self, name, **kwargs):
+        """Span'i etkin yaparak çalıştır; hata olursa span hata durumuyla kapanır"""
+        span = self.start_span(name, **kwargs)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.end(error=e)
+            raise
+        finally:
+            _current_span.reset(token)
+            span.end()
+
+    def record(self, name, start_ns, end_ns, parent, **attributes):
+        """Süresi önceden ölçülmüş aşamayı span olarak kaydet"""
+        span = Span(self, name, parent.trace_id, parent.span_id, attributes, start_ns=start_ns)
+        span.end(end_ns)
+        return span
+
+    def export(self, span):
+        if not self.path:
+            return
+        line = json.dumps(span.to_dict(), ensure_ascii=False) + '\n'
+        with self._lock:
+            try:
+                directory = os.path.dirname(os.path.abspath(self.path))
+                os.makedirs(directory, exist_ok=True)
+                if self.max_bytes and os.path.exists(self.path) and os.path.getsize(self.path) > self.max_bytes:
+                    os.replace(self.path, self.path + '.1')
+                with open(self.path, 'a', encoding='utf-8') as f:
+                    f.write(line)
+            except OSError:
+                # İzleme asla isteği bozmaz
+                pass
+
+
+def current_span():
+    return _current_span.get()
+
+
+def load_trace(trace_id, path=TRACE_FILE):
+    """Dosyadaki (ve döndürülmüş .1 kopyasındaki) trace span'lerini başlangıç sırasıyla getir"""
+    spans = []
+    for candidate in (path + '.1', path):
+        if not os.path.exists(candidate):
+            continue
+        with open(candidate, encoding='utf-8') as f:
+            for line in f:
+                if trace_id in line:
+                    span = json.loads(line)
+                    if span.get('traceId') == trace_id:
+                        spans.append(span)
+    return sorted(spans, key=lambda s: int(s['startTimeUnixNano']))
+
+
+def main():
+    """Komut satırı: python tracing.py <trace_id> - span ağacını göster"""
+    import io
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+
+    if len(sys.argv) < 2 or not TRACE_FILE:
+        print("Kullanım: OCR_TRACE_FILE=<dosya> python tracing.py <trace_id>")
+        return 1
+
+    spans = load_trace(sys.argv[1])
+    if not spans:
+        print(f"❌ Trace bulunamadı: {sys.argv[1]}")
+        return 1
+
+    children = {}
+    for span in spans:
+        children.setdefault(span.get('parentSpanId'), []).append(span)
+    known = {span['spanId'] for span in spans}
+    origin = int(spans[0]['startTimeUnixNano'])
+
+    def show(span, depth):
+        offset = (int(span['startTimeUnixNano']) - origin) / 1e6
+        flag = ' ❌' if span['status'] == 'error' else ''
+        print(f"{'  ' * depth}{span['name']} [{span['service']}] +{offset:.1f}ms {span['durationMs']:.1f}ms{flag}")
+        for child in children.get(span['spanId'], []):
+            show(child, depth + 1)
+
+    for span in spans:
+        if span.get('parentSpanId') not in known:
+            show(span, 0)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
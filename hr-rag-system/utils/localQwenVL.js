@@ -1,6 +1,7 @@
 const axios = require('axios');
 const fs = require('fs');
 const path = require('path');
+const { Tracer } = require('./tracing');
 
 /**
  * Local Qwen2.5-VL OCR API Client
@@ -12,6 +13,13 @@ class LocalQwenVL {
     this.timeout = 0; // Timeout kaldırıldı (sınırsız bekleme)
     this.maxRetries = 1; // Retry azaltıldı
     this.retryDelay = 1000;
+    this.cache = null; // OCRCache örneği (textProcessor config'e göre atar)
+    // Sunucudaki etkin modelin kimliği (önbellek anahtarı); model sıcak değişebildiği için
+    // /health'ten en fazla bu kadar eski kullanılır, her OCR yanıtıyla da güncellenir
+    this.modelIdentity = null;
+    this.modelIdentityAt = 0;
+    this.modelIdentityTtlMs = 10000;
+    this.tracer = new Tracer({ service: 'localQwenVL.js' }); // Span'ler OCR_TRACE_FILE'a
   }
 
   /**
@@ -25,6 +33,7 @@ class LocalQwenVL {
       
       if (response.status === 200) {
         const data = response.data;
+        this.setModelIdentity(data.model?.identity);
         return {
           status: data.model_loaded ? 'healthy' : 'model_not_loaded',
           message: data.model_loaded ? 'Qwen2.5-VL modeli hazır' : 'Model henüz yüklenmemiş',
@@ -50,11 +59,43 @@ class LocalQwenVL {
     }
   }
 
+  /**
+   * Önbellek anahtarı için sunucudaki etkin modelin kimliği (alınamazsa null: önbellek kullanılmaz)
+   */
+  async getModelIdentity() {
+    if (this.modelIdentity && Date.now() - this.modelIdentityAt < this.modelIdentityTtlMs) {
+      return this.modelIdentity;
+    }
+    try {
+      const response = await axios.get(`${this.apiUrl}/health`, { timeout: 10000 });
+      this.setModelIdentity(response.data?.model?.identity);
+    } catch (error) {
+      this.setModelIdentity(null);
+    }
+    return this.modelIdentity;
+  }
+
+  setModelIdentity(identity) {
+    this.modelIdentity = identity && Object.keys(identity).length ? identity : null;
+    this.modelIdentityAt = Date.now();
+  }
+
+  cacheKeyFor(imageBuffer, prompt, maxTokens, identity) {
+    return this.cache && identity
+      ? this.cache.constructor.keyFor(imageBuffer, { prompt, maxTokens, model: identity })
+      : null;
+  }
+
   /**
    * Görüntüden metin çıkarma
+   * options.parent verilirse (ör. sayfa span'i) istek o trace'in parçası olur
    */
-  async extractFromImage(imagePath, extractionType = 'text', customPrompt = null) {
+  async extractFromImage(imagePath, extractionType = 'text', customPrompt = null, options = {}) {
     const startTime = Date.now();
+    const span = this.tracer.startSpan('qwen.extract', {
+      parent: options.parent,
+      attributes: { image: path.basename(imagePath), extractionType }
+    });
     
     try {
       // Dosya var mı kontrol et
@@ -70,8 +111,10 @@ class LocalQwenVL {
       }
 
       // Görüntüyü base64'e çevir
+      const encodeSpan = span.child('client.encode');
       const imageBuffer = fs.readFileSync(imagePath);
       const imageBase64 = imageBuffer.toString('base64');
+      encodeSpan.setAttributes({ bytes: imageBuffer.length }).end();
 
       // Prompt belirle
       let prompt = customPrompt;
@@ -97,32 +140,55 @@ class LocalQwenVL {
         max_tokens: 2048
       };
 
+      // Aynı görüntü + prompt aynı modelle daha önce işlendiyse önbellekten dön
+      const cacheKey = this.cache
+        ? this.cacheKeyFor(imageBuffer, prompt, requestData.max_tokens, await this.getModelIdentity())
+        : null;
+      const cached = cacheKey ? this.cache.get(cacheKey) : null;
+      if (cached) {
+        console.log(`[Qwen OCR] ${path.basename(imagePath)} önbellekten alındı`);
+        span.setAttributes({ cached: true }).end();
+        return { ...cached, elapsedMs: Date.now() - startTime, cached: true, traceId: span.traceId };
+      }
+
       console.log(`[Qwen OCR] ${path.basename(imagePath)} işleniyor...`);
 
       let lastError = null;
       for (let attempt = 1; attempt <= this.maxRetries; attempt++) {
+        // Sunucu span'leri bu deneme span'inin altına bağlanır (traceparent)
+        const httpSpan = span.child('client.http', { attempt });
         try {
           const response = await axios.post(`${this.apiUrl}/ocr`, requestData, {
             timeout: this.timeout || 0, // Timeout kaldırıldı
             headers: {
-              'Content-Type': 'application/json'
+              'Content-Type': 'application/json',
+              ...httpSpan.headers()
             }
           });
+          httpSpan.setAttributes({ statusCode: response.status }).end();
 
           if (response.status === 200) {
             const result = response.data;
             const elapsedMs = Date.now() - startTime;
 
             if (result.success) {
-              return {
+              const ocrResult = {
                 success: true,
                 text: result.text || '',
                 processingTime: result.processing_time || 0,
                 elapsedMs: elapsedMs,
-                model: 'Qwen2.5-VL-3B-Instruct',
+                model: result.model?.model_id || 'Qwen2.5-VL-3B-Instruct',
                 extractionType: extractionType,
                 tokensUsed: Math.ceil((prompt.length + result.text.length) / 4) // Yaklaşık token sayısı
               };
+              // Sonuç, onu üreten modelin kimliğiyle saklanır (istek sırasında model değişmiş olabilir)
+              if (this.cache && result.model) {
+                this.setModelIdentity(result.model);
+                const resultKey = this.cacheKeyFor(imageBuffer, prompt, requestData.max_tokens, this.modelIdentity);
+                if (resultKey) this.cache.set(resultKey, ocrResult);
+              }
+              span.setAttributes({ attempts: attempt, serverMs: Math.round(ocrResult.processingTime * 1000) }).end();
+              return { ...ocrResult, traceId: span.traceId };
             } else {
               throw new Error(result.error || 'OCR işlemi başarısız');
             }
@@ -132,6 +198,7 @@ class LocalQwenVL {
 
         } catch (error) {
           lastError = error;
+          httpSpan.end(error);
           
           if (attempt < this.maxRetries) {
             console.log(`[Qwen OCR] Deneme ${attempt}/${this.maxRetries} başarısız, tekrar deneniyor...`);
@@ -145,12 +212,14 @@ class LocalQwenVL {
 
     } catch (error) {
       const elapsedMs = Date.now() - startTime;
+      span.end(error);
       
       return {
         success: false,
         error: error.message,
         elapsedMs: elapsedMs,
-        model: 'Qwen2.5-VL-3B-Instruct'
+        model: 'Qwen2.5-VL-3B-Instruct',
+        traceId: span.traceId
       };
     }
   }
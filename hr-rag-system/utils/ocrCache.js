@@ -0,0 +1,143 @@
+const crypto = require('crypto');
+const fs = require('fs');
+const os = require('os');
+const path = require('path');
+
+/**
+ * Kalıcı OCR sonuç önbelleği
+ * Render edilmiş sayfa görüntüsünün hash'i + OCR ayarları ile anahtarlanır;
+ * değişmeyen sayfalar yeniden yüklendiğinde Qwen2.5-VL'e tekrar gönderilmez.
+ * Her kayıt ayrı bir JSON dosyasıdır, boyut/kayıt sınırı aşılınca en uzun
+ * süredir kullanılmayan kayıtlar silinir (LRU).
+ */
+class OCRCache {
+  constructor(options = {}) {
+    this.dir = options.dir || path.join(os.homedir(), '.cache', 'sametei', 'qwen-ocr');
+    this.maxBytes = (options.maxMb || 256) * 1024 * 1024;
+    this.maxEntries = options.maxEntries || 20000;
+    this.hits = 0;
+    this.misses = 0;
+    this.evictions = 0;
+
+    fs.mkdirSync(this.dir, { recursive: true });
+
+    // Dizin bir kez taranır, sonrası bellekteki indeksle yürür
+    this.index = new Map();
+    this.totalBytes = 0;
+    for (const file of fs.readdirSync(this.dir)) {
+      if (!file.endsWith('.json')) continue;
+      const stat = fs.statSync(path.join(this.dir, file));
+      this.index.set(file.slice(0, -5), { size: stat.size, lastAccess: stat.mtimeMs });
+      this.totalBytes += stat.size;
+    }
+  }
+
+  /**
+   * Görüntü içeriği ve OCR parametrelerinden anahtar üret
+   */
+  static keyFor(imageBuffer, params = {}) {
+    return crypto
+      .createHash('sha256')
+      .update(imageBuffer)
+      .update(JSON.stringify(params))
+      .digest('hex');
+  }
+
+  filePath(key) {
+    return path.join(this.dir, `${key}.json`);
+  }
+
+  get(key) {
+    if (!this.index.has(key)) {
+      this.misses++;
+      return null;
+    }
+
+    try {
+      const value = JSON.parse(fs.readFileSync(this.filePath(key), 'utf-8'));
+      const now = Date.now();
+      this.index.get(key).lastAccess = now;
+      fs.utimesSync(this.filePath(key), new Date(now), new Date(now));
+      this.hits++;
+      return value;
+    } catch (e) {
+      // Bozuk veya başka süreçte silinmiş kayıt
+      this.remove(key);
+      this.misses++;
+      return null;
+    }
+  }
+
+  set(key, value) {
+    const data = JSON.stringify(value);
+    const size = Buffer.byteLength(data);
+
+    try {
+      fs.writeFileSync(this.filePath(key), data, 'utf-8');
+    } catch (e) {
+      console.warn(`[OCR Cache] Yazılamadı: ${e.message}`);
+      return;
+    }
+
+    const previous = this.index.get(key);
+    if (previous) this.totalBytes -= previous.size;
+    this.index.set(key, { size, lastAccess: Date.now() });
+    this.totalBytes += size;
+    this.evict();
+  }
+
+  remove(key) {
+    const entry = this.index.get(key);
+    if (!entry) return;
+    this.index.delete(key);
+    this.totalBytes -= entry.size;
+    try {
+      fs.unlinkSync(this.filePath(key));
+    } catch (e) {
+      // Dosya zaten yok
+    }
+  }
+
+  /**
+   * Sınır aşıldıysa en eski erişilen kayıtları %90'a inene kadar sil
+   */
+  evict() {
+    if (this.index.size <= this.maxEntries && this.totalBytes <= this.maxBytes) return;
+
+    const targetEntries = Math.floor(this.maxEntries * 0.9);
+    const targetBytes = Math.floor(this.maxBytes * 0.9);
+    const oldest = [...this.index.entries()].sort((a, b) => a[1].lastAccess - b[1].lastAccess);
+
+    for (const [key] of oldest) {
+      if (this.index.size <= targetEntries && this.totalBytes <= targetBytes) break;
+      this.remove(key);
+      this.evictions++;
+    }
+  }
+
+  /**
+   * Sayaçların anlık kopyası - report(since) ile tek bir belgenin isabet oranı alınır
+   */
+  snapshot() {
+    return { hits: this.hits, misses: this.misses };
+  }
+
+  /**
+   * Önbellek durumu; since verilirse isabet/ıska sayıları o andan bu yana sayılır
+   */
+  report(since = null) {
+    const hits = this.hits - (since?.hits || 0);
+    const misses = this.misses - (since?.misses || 0);
+    const lookups = hits + misses;
+    return {
+      hits,
+      misses,
+      hitRate: lookups ? Number((hits / lookups).toFixed(3)) : null,
+      evictions: this.evictions,
+      entries: this.index.size,
+      sizeMb: Number((this.totalBytes / (1024 * 1024)).toFixed(3))
+    };
+  }
+}
+
+module.exports = OCRCache;
@@ -0,0 +1,164 @@
+const { spawn } = require('child_process');
+const path = require('path');
+
+/**
+ * Kalıcı Python PDF servisi istemcisi (utils/pdf_service.py)
+ * Tek bir Python süreci başlatılır ve stdin/stdout üzerinden satır başına bir
+ * JSON-RPC mesajı ile konuşulur; her PDF Python tarafında bir kez açılır.
+ * Süreç ilk istekte başlatılır, çökerse bir sonraki istekte yeniden açılır ve
+ * bekleyen istek yokken Node'un kapanmasını engellemez.
+ */
+class PdfService {
+  constructor(options = {}) {
+    this.pythonExec = options.pythonPath || process.env.PYTHON_PATH || 'python';
+    this.scriptPath = options.scriptPath || path.join(__dirname, 'pdf_service.py');
+    this.timeout = options.timeout ?? 120000;
+    this.renderDir = options.renderDir;
+    this.maxDocs = options.maxDocs;
+    this.proc = null;
+    this.nextId = 1;
+    this.pending = new Map();
+    this.buffer = '';
+  }
+
+  start() {
+    if (this.proc) return this.proc;
+
+    const env = { ...process.env, PYTHONIOENCODING: 'utf-8' };
+    if (this.renderDir) env.PDF_SERVICE_RENDER_DIR = this.renderDir;
+    if (this.maxDocs) env.PDF_SERVICE_MAX_DOCS = String(this.maxDocs);
+
+    const proc = spawn(this.pythonExec, [this.scriptPath], { env, stdio: ['pipe', 'pipe', 'pipe'] });
+    this.proc = proc;
+    this.buffer = '';
+
+    proc.stdout.on('data', (data) => {
+      this.buffer += data.toString('utf8');
+      const lines = this.buffer.split('\n');
+      this.buffer = lines.pop();
+      lines.forEach((line) => this.handleLine(line));
+    });
+    proc.stderr.on('data', (data) => {
+      const message = data.toString('utf8').trim();
+      if (message) console.log(`[PDF Service] ${message}`);
+    });
+    proc.on('error', (error) => this.handleExit(error));
+    proc.on('close', (code) => this.handleExit(new Error(`PDF servisi kapandı (kod: ${code})`)));
+
+    this.setRef(false);
+    return proc;
+  }
+
+  handleLine(line) {
+    if (!line.trim()) return;
+    let message;
+    try {
+      message = JSON.parse(line);
+    } catch (e) {
+      console.warn(`[PDF Service] Geçersiz yanıt satırı atlandı: ${e.message}`);
+      return;
+    }
+
+    const request = this.pending.get(message.id);
+    if (!request) return;
+    this.pending.delete(message.id);
+    clearTimeout(request.timer);
+    if (this.pending.size === 0) this.setRef(false);
+
+    if (message.error) {
+      request.reject(new Error(message.error.message));
+    } else {
+      request.resolve(message.result);
+    }
+  }
+
+  handleExit(error) {
+    if (!this.proc) return;
+    this.proc = null;
+    for (const request of this.pending.values()) {
+      clearTimeout(request.timer);
+      request.reject(error);
+    }
+    this.pending.clear();
+  }
+
+  /**
+   * Bekleyen istek varken süreç Node'u açık tutar, yokken tutmaz
+   */
+  setRef(active) {
+    if (!this.proc) return;
+    const method = active ? 'ref' : 'unref';
+    this.proc[method]();
+    for (const stream of [this.proc.stdin, this.proc.stdout, this.proc.stderr]) {
+      if (stream && typeof stream[method] === 'function') stream[method]();
+    }
+  }
+
+  call(method, params = {}) {
+    const proc = this.start();
+    const id = this.nextId++;
+
+    return new Promise((resolve, reject) => {
+      const timer = this.timeout
+        ? setTimeout(() => {
+            this.pending.delete(id);
+            reject(new Error(`PDF servisi zaman aşımı: ${method} (${this.timeout}ms)`));
+            // Takılan süreç yeniden başlatılsın
+            this.stop();
+          }, this.timeout)
+        : null;
+
+      this.pending.set(id, { resolve, reject, timer });
+      this.setRef(true);
+      proc.stdin.write(JSON.stringify({ id, method, params }) + '\n');
+    });
+  }
+
+  /**
+   * Tek geçişte sayfa sayısı, sayfa metinleri ve OCR gerektiren sayfalar
+   * @returns {Promise<{pageCount: number, texts: Object, imagePages: number[]}>}
+   */
+  async inspect(pdfPath) {
+    const result = await this.call('inspect', { path: path.resolve(pdfPath) });
+    return {
+      pageCount: result.page_count,
+      texts: result.texts,
+      imagePages: result.image_pages
+    };
+  }
+
+  /**
+   * Sayfayı PNG'ye render et
+   * output: 'file' -> { path } (varsayılan tmpfs), 'memory' -> { buffer }
+   */
+  async renderPage(pdfPath, pageNumber = 1, options = {}) {
+    const output = options.output || 'file';
+    const result = await this.call('render', {
+      path: path.resolve(pdfPath),
+      page: pageNumber,
+      dpi: options.dpi || 300,
+      output,
+      dir: options.dir
+    });
+    if (output === 'memory') {
+      const { data, ...rest } = result;
+      return { ...rest, buffer: Buffer.from(data, 'base64') };
+    }
+    return result;
+  }
+
+  async closeDocument(pdfPath) {
+    if (!this.proc) return;
+    return this.call('close', { path: path.resolve(pdfPath) });
+  }
+
+  stop() {
+    if (!this.proc) return;
+    const proc = this.proc;
+    this.handleExit(new Error('PDF servisi durduruldu'));
+    proc.stdin.end();
+    proc.kill();
+  }
+}
+
+module.exports = PdfService;
@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Kalıcı PDF Servisi
+stdin/stdout üzerinden satır başına bir JSON-RPC isteği işleyen uzun ömürlü süreç
+
+İstek:  {"id": 1, "method": "inspect", "params": {"path": "belge.pdf"}}
+Yanıt:  {"id": 1, "result": {...}}  veya  {"id": 1, "error": {"message": "..."}}
+
+Metotlar:
+    ping                               Servis durumu
+    inspect  {path}                    Sayfa sayısı + sayfa metinleri + resimli sayfalar (tek geçiş)
+    render   {path, page, dpi, output} Sayfayı PNG'ye render et (output: "file" | "memory")
+    close    {path}                    Açık PDF'i bırak
+    shutdown                           Servisi kapat
+"""
+
+import os
+import sys
+import io
+import json
+import time
+import base64
+import logging
+import tempfile
+from collections import OrderedDict
+
+# PyMuPDF - PDF'i bir kez açıp metin, görsel ve render için kullanılır
+try:
+    import pymupdf as fitz
+except ImportError:
+    try:
+        import fitz
+    except ImportError:
+        fitz = None
+
+logging.basicConfig(level=logging.INFO, format='%(message)s', stream=sys.stderr)
+logger = logging.getLogger(__name__)
+
+# Aynı anda açık tutulan en fazla PDF sayısı (PDF_SERVICE_MAX_DOCS)
+MAX_OPEN_DOCS = int(os.environ.get('PDF_SERVICE_MAX_DOCS', 4))
+
+# Sayfa render çözünürlüğü (önceki pdf2image betiğiyle aynı)
+DEFAULT_RENDER_DPI = 300
+
+# Bu uzunluğun altındaki sayfa metinleri boş kabul edilir
+MIN_PAGE_TEXT = 5
+
+# Görsel içermeyen sayfa bu uzunluğun altında metne sahipse OCR gerekli sayılır
+OCR_TEXT_THRESHOLD = 50
+
+
+def default_render_dir():
+    """Render çıktıları için varsayılan dizin (varsa tmpfs: /dev/shm)"""
+    configured = os.environ.get('PDF_SERVICE_RENDER_DIR')
+    if configured:
+        return configured
+    if os.path.isdir('/dev/shm') and os.access('/dev/shm', os.W_OK):
+        return os.path.join('/dev/shm', 'sametei-pdf')
+    return os.path.join(tempfile.gettempdir(), 'sametei-pdf')
+
+
+class PdfService:
+    """
+    Açık PDF belgelerini önbellekte tutan istek işleyici
+
+    Her PDF yolu ilk istekte bir kez açılır; dosya değişmediği sürece (mtime +
+    boyut) sonraki inspect/render istekleri aynı belge nesnesini kullanır.
+    """
+
+    def __init__(self, max_docs=MAX_OPEN_DOCS, render_dir=None):
+        self.max_docs = max_docs
+        self.render_dir = render_dir or default_render_dir()
+        self.docs = OrderedDict()
+        self.requests = 0
+        self.started = time.time()
+
+    def _open(self, path):
+        """PDF'i önbellekten getir veya aç (en eski kullanılan belge kapatılır)"""
+        if fitz is None:
+            raise RuntimeError('PyMuPDF yüklü değil')
+
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        signature = (stat.st_mtime_ns, stat.st_size)
+
+        entry = self.docs.get(path)
+        if entry is not None and entry[0] == signature:
+            self.docs.move_to_end(path)
+            return entry[1]
+        if entry is not None:
+            entry[1].close()
+
+        doc = fitz.open(path)
+        self.docs[path] = (signature, doc)
+        self.docs.move_to_end(path)
+        while len(self.docs) > self.max_docs:
+            _, (_, oldest) = self.docs.popitem(last=False)
+            oldest.close()
+        return doc
+
+    def ping(self, params):
+        return {
+            "pid": os.getpid(),
+            "pymupdf": fitz is not None,
+            "open_docs": len(self.docs),
+            "requests": self.requests,
+            "uptime": round(time.time() - self.started, 1),
+            "render_dir": self.render_dir,
+        }
+
+    def inspect(self, params):
+        """
+        Tek geçişte sayfa sayısı, sayfa metinleri ve OCR gerektiren sayfalar
+
+        Returns:
+            dict: page_count, texts ({"1": metin}), image_pages ([1, 3, ...])
+        """
+        path = params['path']
+        min_text = params.get('min_text', MIN_PAGE_TEXT)
+        ocr_threshold = params.get('ocr_text_threshold', OCR_TEXT_THRESHOLD)
+
+        if fitz is None:
+            return self._inspect_fallback(path)
+
+        doc = self._open(path)
+        texts = {}
+        image_pages = []
+        for index in range(doc.page_count):
+            page = doc.load_page(index)
+            text = page.get_text().strip()
+            texts[str(index + 1)] = text if len(text) > min_text else ""
+
+            # Sayfa resim içeriyorsa veya çok az metin içeriyorsa OCR gerekli
+            if page.get_images() or len(text) < ocr_threshold:
+                image_pages.append(index + 1)
+
+        return {"page_count": doc.page_count, "texts": texts, "image_pages": image_pages}
+
+    def _inspect_fallback(self, path):
+        """PyMuPDF yoksa: sayfa sayısı poppler'dan, tüm sayfalar OCR'a"""
+        from pdf2image import pdfinfo_from_path
+
+        page_count = int(pdfinfo_from_path(path)['Pages'])
+        return {
+            "page_count": page_count,
+            "texts": {str(num): "" for num in range(1, page_count + 1)},
+            "image_pages": list(range(1, page_count + 1)),
+            "fallback": True,
+        }
+
+    def render(self, params):
+        """
+        Tek sayfayı PNG olarak render et
+
+        output="memory" ise PNG base64 olarak yanıtta döner, "file" ise render
+        dizinine (varsayılan tmpfs) yazılır ve yolu döner.
+        """
+        path = params['path']
+        page_num = int(params.get('page', 1))
+        dpi = int(params.get('dpi', DEFAULT_RENDER_DPI))
+        output = params.get('output', 'file')
+
+        if fitz is not None:
+            doc = self._open(path)
+            if not 1 <= page_num <= doc.page_count:
+                raise ValueError(f'Geçersiz sayfa: {page_num} (toplam {doc.page_count})')
+            pix = doc.load_page(page_num - 1).get_pixmap(dpi=dpi, alpha=False)
+            width, height = pix.width, pix.height
+            png = pix.tobytes('png')
+            del pix
+        else:
+            from pdf2image import convert_from_path
+
+            images = convert_from_path(path, first_page=page_num, last_page=page_num, dpi=dpi)
+            if not images:
+                raise ValueError(f'Sayfa render edilemedi: {page_num}')
+            buffer = io.BytesIO()
+            images[0].save(buffer, 'PNG')
+            width, height = images[0].size
+            png = buffer.getvalue()
+
+        result = {"page": page_num, "width": width, "height": height, "bytes": len(png)}
+        if output == 'memory':
+            result["data"] = base64.b64encode(png).decode('ascii')
+            return result
+
+        out_dir = params.get('dir') or self.render_dir
+        os.makedirs(out_dir, exist_ok=True)
+        out_path = os.path.join(out_dir, f"page{page_num}_{os.getpid()}_{time.time_ns()}.png")
+        with open(out_path, 'wb') as f:
+            f.write(png)
+        result["path"] = out_path
+        return result
+
+    def close(self, params=None):
+        """Belirtilen PDF'i (yol verilmezse tümünü) kapat"""
+        path = (params or {}).get('path')
+        paths = [os.path.abspath(path)] if path else list(self.docs)
+        closed = 0
+        for key in paths:
+            entry = self.docs.pop(key, None)
+            if entry is not None:
+                entry[1].close()
+                closed += 1
+        return {"closed": closed}
+
+    def handle(self, request):
+        """Tek isteği işle ve yanıt sözlüğünü döndür"""
+        request_id = request.get('id')
+        method = request.get('method')
+        handler = {
+            'ping': self.ping,
+            'inspect': self.inspect,
+            'render': self.render,
+            'close': self.close,
+        }.get(method)
+
+        self.requests += 1
+        if handler is None:
+            return {"id": request_id, "error": {"message": f"Bilinmeyen metot: {method}"}}
+        try:
+            return {"id": request_id, "result": handler(request.get('params') or {})}
+        except Exception as e:
+            logger.error(f"❌ {method} hatası: {e}")
+            return {"id": request_id, "error": {"message": str(e)}}
+
+
+def serve(stdin=None, stdout=None):
+    """stdin'den istek satırlarını oku, yanıtları stdout'a yaz (EOF veya shutdown'a kadar)"""
+    stdin = stdin or io.TextIOWrapper(sys.stdin.buffer, encoding='utf-8')
+    stdout = stdout or io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+    service = PdfService()
+    logger.info(f"📄 PDF servisi hazır (pid={os.getpid()}, pymupdf={'var' if fitz else 'yok'}, render={service.render_dir})")
+
+    try:
+        for line in stdin:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                request = json.loads(line)
+            except json.JSONDecodeError as e:
+                response = {"id": None, "error": {"message": f"Geçersiz JSON: {e}"}}
+            else:
+                if request.get('method') == 'shutdown':
+                    stdout.write(json.dumps({"id": request.get('id'), "result": {"shutdown": True}}) + '\n')
+                    stdout.flush()
+                    break
+                response = service.handle(request)
+
+            stdout.write(json.dumps(response, ensure_ascii=False) + '\n')
+            stdout.flush()
+    finally:
+        service.close()
+
+
+if __name__ == "__main__":
+    serve()
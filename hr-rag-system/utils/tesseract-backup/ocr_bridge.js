@@ -8,8 +8,13 @@ function runPythonOCR(pdfPath, options = {}) {
     const env = { ...process.env };
     if (options.lang) env.TESSERACT_LANG = options.lang;
     if (options.dpi) env.OCR_DPI = String(options.dpi);
+    if (options.workers) env.OCR_WORKERS = String(options.workers);
+    if (options.workerMemoryMb) env.OCR_WORKER_MEMORY_MB = String(options.workerMemoryMb);
+    // onPage verilirse Python sayfa bittikçe NDJSON satırı yazar
+    const streaming = typeof options.onPage === 'function';
+    if (streaming) env.OCR_STREAM = '1';
 
-    console.log(`[OCR] Türkçe Tablo OCR çağrılıyor: ${pythonExec} ${scriptPath} (lang=${env.TESSERACT_LANG}, dpi=${env.OCR_DPI})`);
+    console.log(`[OCR] Türkçe Tablo OCR çağrılıyor: ${pythonExec} ${scriptPath} (lang=${env.TESSERACT_LANG}, dpi=${env.OCR_DPI}, workers=${env.OCR_WORKERS || 1})`);
 
     const proc = spawn(pythonExec, [scriptPath, pdfPath], { 
       env,
@@ -17,9 +22,59 @@ function runPythonOCR(pdfPath, options = {}) {
     });
     let stdout = '';
     let stderr = '';
-    proc.stdout.on('data', (d) => (stdout += d.toString()));
+    let pending = '';
+    const pages = [];
+    let summary = null;
+
+    // Tamamlanan satırları hemen ayrıştır; sayfa satırları onPage'e iletilir
+    const handleLine = (line) => {
+      if (!line.trim()) return;
+      let json;
+      try {
+        json = JSON.parse(line);
+      } catch (e) {
+        console.warn(`[OCR] Geçersiz NDJSON satırı atlandı: ${e.message}`);
+        return;
+      }
+      if (json.type === 'page') {
+        pages.push(json);
+        try {
+          options.onPage(json);
+        } catch (e) {
+          console.warn(`[OCR] onPage hatası (sayfa ${json.page}): ${e.message}`);
+        }
+      } else {
+        summary = json;
+      }
+    };
+
+    proc.stdout.on('data', (d) => {
+      if (!streaming) {
+        stdout += d.toString();
+        return;
+      }
+      pending += d.toString();
+      const lines = pending.split('\n');
+      pending = lines.pop();
+      lines.forEach(handleLine);
+    });
     proc.stderr.on('data', (d) => (stderr += d.toString()));
     proc.on('close', (code) => {
+      if (streaming) {
+        handleLine(pending);
+        if (!summary) {
+          return reject(new Error(stderr || `Python exited with code ${code}`));
+        }
+        if (summary.success === false) return reject(new Error(summary.error || 'Python OCR failed'));
+        // Tam metin sayfa sırasıyla birleştirilir (tamponlu moddaki "text" ile aynı)
+        const text = pages
+          .sort((a, b) => a.page - b.page)
+          .map((p) => p.text)
+          .filter(Boolean)
+          .join('\n\n');
+        const { type, ...rest } = summary;
+        return resolve({ ...rest, text, character_count: text.length });
+      }
       if (code !== 0 && !stdout) {
         return reject(new Error(stderr || `Python exited with code ${code}`));
       }
@@ -10,45 +10,652 @@ import sys
 import json
 import re
 import gc
+import time
+import threading
+import multiprocessing
+import multiprocessing.util
 import cv2
 import numpy as np
 from PIL import Image
 import pytesseract
-from pdf2image import convert_from_path
+from pdf2image import convert_from_path, pdfinfo_from_path
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
 import logging
 
+from turkish_corrector import TurkishCorrector
+from page_cache import PageCache, page_content_hashes, bitmap_hash
+
+# PyMuPDF - sayfa sayfa render için tercih edilir (yoksa pdf2image kullanılır)
+try:
+    import pymupdf as fitz
+except ImportError:
+    try:
+        import fitz
+    except ImportError:
+        fitz = None
+
+# resource - worker bellek sınırı (RLIMIT_DATA) için; Windows'ta yok
+try:
+    import resource
+except ImportError:
+    resource = None
+
+# tesserocr - Tesseract C API bağlamı; varsa süreç içi kalıcı motor kullanılır
+try:
+    import tesserocr
+except ImportError:
+    tesserocr = None
+
 # Logging ayarları
 logging.basicConfig(level=logging.INFO, format='%(message)s', stream=sys.stderr)
 logger = logging.getLogger(__name__)
 
+# OCR için sayfanın uzun kenar üst sınırı (piksel) - render bu sınıra göre yapılır
+MAX_LONG_EDGE = 2500
+
+# Worker bellek tahmini (OCR_WORKER_MEMORY_MB bütçesi için)
+# Yorumlayıcı, OpenCV/NumPy/PyMuPDF yüklü boş worker süreci (ölçülen ~92 MB)
+WORKER_BASE_MB = 100
+# tur+eng LSTM modelleri yüklü bir Tesseract API'si ve thread yığınları
+# (worker'da OCR thread'i başına bir API)
+TESSERACT_HANDLE_MB = 96
+# Render ve ön işleme tamponları piksel başına (gri render, kontrast,
+# adaptiveThreshold ara tamponları, PIL kopyası; ölçülen ~7 bayt)
+PAGE_BYTES_PER_PIXEL = 9
+# Aynı anda çalışan her Tesseract API'sinin sayfa tamponları piksel başına
+# (Pix kopyası, eşiklenmiş görüntü, bölütleme yapıları)
+TESSERACT_BYTES_PER_PIXEL = 4
+# Bütçe hesabında alt sınır DPI
+MIN_BUDGET_DPI = 72
+
+# Tesseract sayfa bölümleme konfigürasyonları (PSM -> config)
+PSM_CONFIGS = {
+    '4': '--psm 4 --oem 1',  # Single column
+    '6': '--psm 6 --oem 1',  # Single uniform block
+    '3': '--psm 3 --oem 1',  # Fully automatic
+    '1': '--psm 1 --oem 1'   # Auto with OSD
+}
+
+# image_to_data sözlüğünde kullanılan alanlar
+DATA_FIELDS = ('text', 'conf', 'block_num', 'par_num', 'line_num', 'left', 'top', 'width', 'height')
+
+# Tesseract OCR motoru modu (1: LSTM)
+TESSERACT_OEM = 1
+
+# Yerleşim sondası için küçültme oranı
+PROBE_SCALE = 0.5
+
+# Yerleşim bölütlemesinin yapıldığı küçük kopyanın uzun kenarı (piksel)
+LAYOUT_LONG_EDGE = 1000
+
+# Bölge türüne göre PSM (tek satırlık hücreler için 7, bloklar için 6)
+REGION_PSM = {'block': '6', 'cell': '6', 'cell_line': '7'}
+
+# Mürekkep oranı bunun altındaki hücreler boş kabul edilir ve OCR'lanmaz
+EMPTY_CELL_INK = 0.01
+
+# pdf2image yedeğinde tek seferde render edilen en fazla sayfa sayısı
+RENDER_WINDOW = 2
+
+# Worker sürecindeki SmartOCR örneği (_init_worker ile oluşturulur)
+_worker_ocr = None
+
+
+def _init_worker(lang, dpi, threads, conf_threshold=70.0, cache_config=None, memory_mb=None):
+    """Process pool worker başlatıcı - her worker kendi SmartOCR örneğini kullanır"""
+    global _worker_ocr
+
+    _limit_worker_memory(memory_mb)
+
+    # Worker başına OpenCV thread sayısını sınırla, böylece havuz CPU'yu aşırı
+    # abone etmez (Tesseract/OpenMP sınırı worker başlatılmadan ortama konur,
+    # bkz. _worker_environment)
+    cv2.setNumThreads(threads)
+
+    cache = PageCache(**cache_config) if cache_config else None
+    _worker_ocr = SmartOCR(lang=lang, dpi=dpi, workers=1, conf_threshold=conf_threshold,
+                           psm_parallelism=threads, cache=cache)
+    # Worker kapanırken thread havuzu ve Tesseract API'leri kapatılır
+    multiprocessing.util.Finalize(_worker_ocr, _worker_ocr.close, exitpriority=10)
+
+
+def _limit_worker_memory(memory_mb):
+    """
+    Worker sürecinin özel veri belleğini (RLIMIT_DATA) bütçeyle sınırla
+
+    Sınır aşılırsa ayırma başarısız olur: Python tarafında MemoryError alınır,
+    Tesseract içinde worker sonlanır; her iki durumda sayfa ana süreçte yeniden
+    işlenir (bkz. SmartOCR._ocr_pages_parallel). RLIMIT_AS yerine RLIMIT_DATA
+    kullanılır; yalnızca ayrılmış (PROT_NONE) adres alanı sayılmaz.
+    """
+    if not memory_mb or resource is None:
+        return
+    limit = int(memory_mb * 1024 * 1024)
+    _, hard = resource.getrlimit(resource.RLIMIT_DATA)
+    if hard != resource.RLIM_INFINITY:
+        limit = min(limit, hard)
+    resource.setrlimit(resource.RLIMIT_DATA, (limit, hard))
+
+
+@contextmanager
+def _worker_environment(threads):
+    """
+    Başlatılan worker'ların devralacağı thread sınırlarını geçici olarak ayarla
+
+    libgomp ve OpenBLAS bu değişkenleri yalnızca yüklenirken okur; bu yüzden
+    worker'lar spawn ile başlatılır ve değişkenler tesserocr/NumPy içe
+    aktarılmadan önce ortamda bulunur. OpenBLAS thread başına tampon ayırdığından
+    sınır worker'ın bellek bütçesini de korur.
+    """
+    names = ('OMP_THREAD_LIMIT', 'OPENBLAS_NUM_THREADS')
+    previous = {name: os.environ.get(name) for name in names}
+    for name in names:
+        os.environ[name] = str(threads)
+    try:
+        yield
+    finally:
+        for name, value in previous.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+
+def _ocr_page_worker(pdf_path, page_num, dpi, page_hash=None):
+    """Tek sayfayı worker içinde render edip OCR'la"""
+    render_start = time.time()
+    pages = render_pdf_pages(pdf_path, dpi, first_page=page_num, last_page=page_num)
+    _, image = next(pages, (page_num, None))
+    pages.close()
+    render_time = round(time.time() - render_start, 3)
+
+    if image is None:
+        return page_num, "", {"page": page_num, "render_time": render_time, "ocr_time": 0.0}
+
+    page_text, timing = _worker_ocr.process_page(image, page_num, page_hash)
+    timing["render_time"] = render_time
+
+    del image
+    gc.collect()
+
+    return page_num, page_text, timing
+
+
+def pdf_page_info(pdf_path):
+    """
+    PDF sayfa sayısı ve ilk sayfanın boyutu
+
+    Returns:
+        tuple: (sayfa sayısı, (genişlik, yükseklik) inç veya None)
+    """
+    if fitz is not None:
+        with fitz.open(pdf_path) as doc:
+            if doc.page_count == 0:
+                return 0, None
+            rect = doc.load_page(0).rect
+            return doc.page_count, (rect.width / 72.0, rect.height / 72.0)
+
+    pdf_info = pdfinfo_from_path(pdf_path)
+    match = re.match(r'\s*([\d.]+)\s*x\s*([\d.]+)\s*pts', pdf_info.get("Page size", ""))
+    page_size = (float(match.group(1)) / 72.0, float(match.group(2)) / 72.0) if match else None
+    return int(pdf_info.get("Pages", 0)), page_size
+
+
+def effective_dpi(page_size_in, dpi, max_long_edge=MAX_LONG_EDGE):
+    """Uzun kenarı max_long_edge pikseli aşmayacak render DPI değeri"""
+    if not page_size_in or not max_long_edge:
+        return dpi
+    return min(dpi, max_long_edge / max(page_size_in))
+
+
+def render_pdf_pages(pdf_path, dpi, first_page=1, last_page=None, window=RENDER_WINDOW,
+                     max_long_edge=MAX_LONG_EDGE, pages=None, color=False):
+    """
+    PDF sayfalarını tek tek, doğrudan gri tonlamada render eden üreteç
+
+    Tüm belge bir kerede belleğe alınmaz; PyMuPDF ile aynı anda yalnızca bir
+    sayfa, pdf2image yedeğinde en fazla `window` sayfa bellekte tutulur.
+    DPI her sayfa için uzun kenar max_long_edge'i aşmayacak şekilde düşürülür,
+    böylece sonradan atılacak pikseller hiç render edilmez.
+
+    pages verilirse yalnızca bu sayfa numaraları (artan sırada) render edilir.
+    color=True ise sayfalar RGB render edilir (renkli zemin tespiti gibi işler için).
+
+    Yields:
+        tuple: (sayfa numarası, gri tonlamalı veya RGB PIL.Image)
+    """
+    if fitz is not None:
+        with fitz.open(pdf_path) as doc:
+            last_page = min(last_page or doc.page_count, doc.page_count)
+            page_nums = sorted(pages) if pages is not None else range(first_page, last_page + 1)
+
+            for page_num in page_nums:
+                page = doc.load_page(page_num - 1)
+                page_dpi = effective_dpi((page.rect.width / 72.0, page.rect.height / 72.0), dpi, max_long_edge)
+                matrix = fitz.Matrix(page_dpi / 72.0, page_dpi / 72.0)
+
+                mode = "RGB" if color else "L"
+                pix = page.get_pixmap(matrix=matrix, colorspace=fitz.csRGB if color else fitz.csGRAY, alpha=False)
+                image = Image.frombuffer(mode, (pix.width, pix.height), pix.samples, "raw", mode, pix.stride, 1)
+                del pix
+                yield page_num, image
+        return
+
+    page_count, page_size = pdf_page_info(pdf_path)
+    if last_page is None:
+        last_page = page_count
+
+    # pdf2image sayfa boyutlarını tek tek vermez; ilk sayfanın boyutu esas alınır,
+    # daha büyük sayfalar preprocess_image içindeki sınırla küçültülür
+    render_dpi = effective_dpi(page_size, dpi, max_long_edge)
+
+    # Ardışık sayfalar en fazla `window` uzunluğunda gruplar halinde render edilir
+    windows = []
+    for page_num in (sorted(pages) if pages is not None else range(first_page, last_page + 1)):
+        if windows and page_num == windows[-1][1] + 1 and page_num - windows[-1][0] < window:
+            windows[-1][1] = page_num
+        else:
+            windows.append([page_num, page_num])
+
+    for window_start, window_end in windows:
+        images = convert_from_path(
+            pdf_path,
+            dpi=render_dpi,
+            first_page=window_start,
+            last_page=window_end,
+            grayscale=not color,
+            thread_count=1
+        )
+
+        for offset in range(len(images)):
+            image, images[offset] = images[offset], None
+            yield window_start + offset, image
+
+        del images
+
+
+def _line_components(mask, horizontal):
+    """Çizgi maskesindeki ayrı çizgi sayısı"""
+    count, _, stats, _ = cv2.connectedComponentsWithStats(mask, connectivity=8)
+    axis = cv2.CC_STAT_WIDTH if horizontal else cv2.CC_STAT_HEIGHT
+    return sum(1 for i in range(1, count) if stats[i, axis] >= 8)
+
+
+def _group_rows(cells):
+    """Hücreleri dikey merkezlerine göre satırlara ayır (satır içinde soldan sağa)"""
+    if not cells:
+        return []
+    heights = sorted(c[3] - c[1] for c in cells)
+    tolerance = heights[len(heights) // 2] / 2.0
+
+    rows = []
+    for cell in sorted(cells, key=lambda c: (c[1] + c[3]) / 2.0):
+        center = (cell[1] + cell[3]) / 2.0
+        if rows and center - rows[-1]["center"] <= tolerance:
+            rows[-1]["cells"].append(cell)
+        else:
+            rows.append({"center": center, "cells": [cell]})
+
+    return [sorted(row["cells"], key=lambda c: c[0]) for row in rows]
+
+
+def segment_layout(image, long_edge=LAYOUT_LONG_EDGE):
+    """
+    Ön işlenmiş (siyah yazı / beyaz zemin) sayfayı tablo hücreleri ve metin bloklarına ayır
+
+    Morfolojik çizgi analizi küçültülmüş kopya üzerinde yapılır; kutular tam
+    çözünürlüğe ölçeklenerek döner.
+
+    Returns:
+        dict: tables ([{"box", "rows": [[hücre kutusu, ...], ...]}]), blocks ([kutu, ...]),
+              küçük kopyadaki hücre mürekkep oranları (ink) ve ölçek
+    """
+    gray = np.asarray(image)
+    if gray.ndim == 3:
+        gray = cv2.cvtColor(gray, cv2.COLOR_RGB2GRAY)
+    full_h, full_w = gray.shape[:2]
+
+    scale = min(1.0, long_edge / float(max(full_h, full_w)))
+    small = cv2.resize(gray, (max(1, int(full_w * scale)), max(1, int(full_h * scale))),
+                       interpolation=cv2.INTER_AREA) if scale < 1.0 else gray
+    h, w = small.shape[:2]
+
+    # Mürekkep maskesi (küçültmede incelen çizgiler korunsun diye düşük eşik)
+    ink = (small < 200).astype(np.uint8) * 255
+
+    # Yatay ve dikey çizgiler
+    horizontal = cv2.morphologyEx(ink, cv2.MORPH_OPEN,
+                                  cv2.getStructuringElement(cv2.MORPH_RECT, (max(10, w // 25), 1)))
+    vertical = cv2.morphologyEx(ink, cv2.MORPH_OPEN,
+                                cv2.getStructuringElement(cv2.MORPH_RECT, (1, max(10, h // 40))))
+    grid = cv2.dilate(cv2.bitwise_or(horizontal, vertical), np.ones((3, 3), np.uint8))
+
+    tables = []
+    text_mask = ink.copy()
+    contours, _ = cv2.findContours(grid, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    for contour in contours:
+        x, y, cw, ch = cv2.boundingRect(contour)
+        if cw < w * 0.2 or ch < h * 0.03:
+            continue
+        roi = (slice(y, y + ch), slice(x, x + cw))
+        if _line_components(horizontal[roi], True) < 2 or _line_components(vertical[roi], False) < 2:
+            continue
+
+        # Hücreler: tablo ızgarasının içindeki boş alanlar
+        count, _, stats, _ = cv2.connectedComponentsWithStats(
+            cv2.bitwise_not(grid[roi]), connectivity=4
+        )
+        cells = []
+        for i in range(1, count):
+            cx, cy, cell_w, cell_h = stats[i, :4]
+            touches_border = cx == 0 or cy == 0 or cx + cell_w >= cw or cy + cell_h >= ch
+            if touches_border or cell_w < 6 or cell_h < 5:
+                continue
+            cells.append((x + cx, y + cy, x + cx + cell_w, y + cy + cell_h))
+
+        if len(cells) < 2:
+            continue
+
+        tables.append({"box": (x, y, x + cw, y + ch), "rows": _group_rows(cells)})
+        text_mask[roi] = 0
+
+    # Metin blokları: tablo dışındaki mürekkebi kelime/satır ölçeğinde birleştir
+    merged = cv2.dilate(text_mask, cv2.getStructuringElement(
+        cv2.MORPH_RECT, (max(3, w // 60), max(2, h // 150))
+    ))
+    blocks = []
+    contours, _ = cv2.findContours(merged, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    for contour in contours:
+        x, y, bw, bh = cv2.boundingRect(contour)
+        if bw >= 4 and bh >= 4:
+            blocks.append((x, y, x + bw, y + bh))
+
+    # Boş hücre tespiti küçük kopyada yapılır
+    ink_ratio = {}
+    for table in tables:
+        for row in table["rows"]:
+            for box in row:
+                cell_ink = ink[box[1] + 1:box[3] - 1, box[0] + 1:box[2] - 1]
+                ink_ratio[box] = float(np.count_nonzero(cell_ink)) / max(1, cell_ink.size)
+
+    def _full(box, pad=0):
+        return (max(0, int(box[0] / scale) - pad), max(0, int(box[1] / scale) - pad),
+                min(full_w, int(box[2] / scale) + pad), min(full_h, int(box[3] / scale) + pad))
+
+    return {
+        "scale": scale,
+        "tables": [
+            {
+                "box": _full(table["box"]),
+                "rows": [[_full(cell) for cell in row] for row in table["rows"]],
+                "ink": [[ink_ratio[cell] for cell in row] for row in table["rows"]],
+            }
+            for table in tables
+        ],
+        "blocks": [_full(block, pad=4) for block in blocks],
+    }
+
+
+def reading_order(regions, page_height):
+    """Bölgeleri okuma sırasına diz (yukarıdan aşağı, aynı bantta soldan sağa)"""
+    band = max(1, int(page_height * 0.01))
+    return sorted(regions, key=lambda r: (r["box"][1] // band, r["box"][0]))
+
+
+def estimate_worker_memory_mb(page_size_in, dpi, threads=1):
+    """
+    Bir sayfayı işleyen worker sürecinin tahmini tepe bellek kullanımı (MB)
+
+    Sabit kısım: boş süreç + thread başına bir Tesseract API'si (dil modelleri).
+    Sayfa kısmı: render/ön işleme tamponları + eşzamanlı her Tesseract çağrısının
+    kendi görüntü kopyası. DPI, uzun kenar sınırından (effective_dpi) sonra uygulanır.
+    """
+    fixed = WORKER_BASE_MB + threads * TESSERACT_HANDLE_MB
+    if not page_size_in:
+        return fixed
+
+    render_dpi = effective_dpi(page_size_in, dpi)
+    pixels = page_size_in[0] * page_size_in[1] * render_dpi * render_dpi
+    per_pixel = PAGE_BYTES_PER_PIXEL + threads * TESSERACT_BYTES_PER_PIXEL
+    return fixed + pixels * per_pixel / (1024 * 1024)
+
+
+def dpi_for_memory_budget(page_size_in, budget_mb, max_dpi, threads=1):
+    """
+    Worker bellek bütçesine sığacak thread sayısı ve en yüksek DPI değerini hesapla
+
+    OCR kalitesi paralellikten önce gelir: thread sayısı, istenen render DPI'ı
+    (effective_dpi) bütçeye sığana kadar azaltılır; tek thread'de de sığmıyorsa
+    kalan bütçeye sığan en yüksek DPI kullanılır.
+
+    Args:
+        page_size_in (tuple): Sayfa boyutu (genişlik, yükseklik) inç
+        budget_mb (int): Worker başına bellek bütçesi (MB)
+        max_dpi (int): İstenen DPI
+        threads (int): Worker başına istenen OCR thread sayısı
+
+    Returns:
+        tuple: (DPI, thread sayısı) veya bütçe tek thread'e bile yetmiyorsa None
+    """
+    if not budget_mb:
+        return max_dpi, threads
+
+    target_dpi = int(effective_dpi(page_size_in, max_dpi))
+    for candidate in range(threads, 0, -1):
+        if estimate_worker_memory_mb(page_size_in, target_dpi, candidate) <= budget_mb:
+            return target_dpi, candidate
+
+    if estimate_worker_memory_mb(page_size_in, MIN_BUDGET_DPI, 1) > budget_mb:
+        return None
+
+    width_in, height_in = page_size_in
+    spare = budget_mb - (WORKER_BASE_MB + TESSERACT_HANDLE_MB)
+    max_pixels = spare * 1024 * 1024 / (PAGE_BYTES_PER_PIXEL + TESSERACT_BYTES_PER_PIXEL)
+    budget_dpi = int((max_pixels / (width_in * height_in)) ** 0.5)
+    return max(MIN_BUDGET_DPI, min(target_dpi, budget_dpi)), 1
+
+
+def available_memory_mb():
+    """Sistemde kullanılabilir bellek (MB); bilinmiyorsa None"""
+    try:
+        with open('/proc/meminfo') as f:
+            for line in f:
+                if line.startswith('MemAvailable:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    try:
+        return os.sysconf('SC_AVPHYS_PAGES') * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except (ValueError, OSError, AttributeError):
+        return None
+
+
+class TesseractEngine:
+    """
+    Tesseract erişim katmanı
+
+    tesserocr kuruluysa başlatılmış Tesseract API'leri bir havuzda süreç
+    boyunca canlı tutulur; her çağrı boştaki bir API'yi ödünç alıp geri verir,
+    böylece API sayısı eşzamanlı çağrı sayısını aşmaz ve dil verisi her API
+    için yalnızca bir kez yüklenir. Kurulu değilse her çağrıda ayrı bir
+    tesseract süreci başlatan pytesseract kullanılır. Her iki durumda da
+    pytesseract.image_to_data (Output.DICT) ile aynı formatta sonuç döner.
+    """
+
+    def __init__(self, lang='tur+eng', oem=TESSERACT_OEM, backend=None):
+        self.lang = lang
+        self.oem = oem
+        self.backend = backend or ('tesserocr' if tesserocr is not None else 'pytesseract')
+        self.tessdata_path = os.environ.get('TESSDATA_PREFIX')
+        self._handles = []
+        self._idle = []
+        self._handles_lock = threading.Lock()
+
+    def _checkout(self):
+        """Boştaki bir Tesseract API'sini ödünç al (yoksa yenisini başlat)"""
+        with self._handles_lock:
+            if self._idle:
+                return self._idle.pop()
+
+        kwargs = {'lang': self.lang, 'oem': self.oem}
+        if self.tessdata_path:
+            kwargs['path'] = self.tessdata_path
+        api = tesserocr.PyTessBaseAPI(**kwargs)
+        with self._handles_lock:
+            self._handles.append(api)
+        return api
+
+    def _checkin(self, api):
+        """Ödünç alınan API'yi havuza geri ver"""
+        with self._handles_lock:
+            if api in self._handles:
+                self._idle.append(api)
+
+    def image_to_data(self, image, psm):
+        """
+        Görüntüyü verilen PSM ile OCR'la
+
+        Returns:
+            dict: pytesseract.image_to_data(Output.DICT) ile aynı alanlar
+        """
+        if self.backend != 'tesserocr':
+            return pytesseract.image_to_data(
+                image, lang=self.lang, config=PSM_CONFIGS.get(psm, f'--psm {psm} --oem {self.oem}'),
+                output_type=pytesseract.Output.DICT
+            )
+
+        data = {field: [] for field in DATA_FIELDS}
+        level = tesserocr.RIL.WORD
+        api = self._checkout()
+
+        try:
+            api.SetPageSegMode(int(psm))
+            api.SetImage(image)
+            api.Recognize()
+
+            iterator = api.GetIterator()
+            if iterator is None:
+                return data
+
+            block = par = line = 0
+            for word in tesserocr.iterate_level(iterator, level):
+                if word.IsAtBeginningOf(tesserocr.RIL.BLOCK):
+                    block, par, line = block + 1, 0, 0
+                if word.IsAtBeginningOf(tesserocr.RIL.PARA):
+                    par, line = par + 1, 0
+                if word.IsAtBeginningOf(tesserocr.RIL.TEXTLINE):
+                    line += 1
+
+                try:
+                    text = word.GetUTF8Text(level)
+                except RuntimeError:
+                    continue
+
+                box = word.BoundingBox(level) or (0, 0, 0, 0)
+                data['text'].append(text)
+                data['conf'].append(word.Confidence(level))
+                data['block_num'].append(block)
+                data['par_num'].append(par)
+                data['line_num'].append(line)
+                data['left'].append(box[0])
+                data['top'].append(box[1])
+                data['width'].append(box[2] - box[0])
+                data['height'].append(box[3] - box[1])
+        finally:
+            # Sonuçları bırak, dil verisi yüklü kalsın
+            api.Clear()
+            self._checkin(api)
+
+        return data
+
+    def close(self):
+        """Tüm Tesseract API'lerini kapat"""
+        with self._handles_lock:
+            for api in self._handles:
+                api.End()
+            self._handles = []
+            self._idle = []
+
+
+def benchmark_engines(image, lang='tur+eng', psm='6', repeats=5):
+    """
+    Kalıcı motor ile süreç-başı-çağrı (pytesseract) maliyetini karşılaştır
+
+    Returns:
+        dict: Arka uç başına ortalama çağrı süresi (ms)
+    """
+    report = {}
+    backends = ['pytesseract'] + (['tesserocr'] if tesserocr is not None else [])
+
+    for backend in backends:
+        engine = TesseractEngine(lang=lang, backend=backend)
+        try:
+            # İlk çağrı (dil verisi yükleme) ayrı ölçülür
+            start = time.time()
+            engine.image_to_data(image, psm)
+            first_ms = (time.time() - start) * 1000
+
+            start = time.time()
+            for _ in range(repeats):
+                engine.image_to_data(image, psm)
+            mean_ms = (time.time() - start) * 1000 / repeats
+        finally:
+            engine.close()
+
+        report[backend] = {"first_call_ms": round(first_ms, 1), "mean_call_ms": round(mean_ms, 1)}
+
+    if 'tesserocr' in report:
+        report["overhead_removed_ms"] = round(
+            report['pytesseract']['mean_call_ms'] - report['tesserocr']['mean_call_ms'], 1
+        )
+
+    return report
+
+
 class SmartOCR:
     """Akıllı OCR sınıfı - basit ve etkili"""
     
-    def __init__(self, lang='tur+eng', dpi=300):
+    def __init__(self, lang='tur+eng', dpi=300, workers=1, worker_memory_mb=1024,
+                 conf_threshold=70.0, psm_parallelism=None, cache=None):
         self.lang = lang
         self.dpi = min(dpi, 450)  # Maksimum DPI sınırı
+        self.workers = max(1, workers)  # 1: sıralı işlem, >1: process pool
+        self.worker_memory_mb = worker_memory_mb
+        # Tahmin edilen PSM'in kabulü için gereken ortalama kelime güveni
+        self.conf_threshold = conf_threshold
+        # Yedek PSM denemelerinin paralellik derecesi
+        self.psm_parallelism = psm_parallelism or min(len(PSM_CONFIGS) - 1, os.cpu_count() or 1)
+        # Yedek PSM'ler ve yerleşim bölgeleri için sayfalar arasında paylaşılan thread havuzu
+        self._pool = None
+        self._pool_lock = threading.Lock()
         self.setup_tesseract()
+        self.engine = TesseractEngine(lang=self.lang)
+        logger.info(f"⚙️ Tesseract motoru: {self.engine.backend}")
         
-        # Türkçe kelime düzeltmeleri
-        self.turkish_fixes = {
-            # OCR'da sık karışan kelimeler
-            'Tanhi': 'Tarihi', 'tanhi': 'tarihi', 'Tarth': 'Tarih',
-            'Yen': 'Yeri', 'yen': 'yeri', 'Ginş': 'Giriş', 'ginş': 'giriş',
-            'Toni': 'Türü', 'toni': 'türü', 'Türü': 'Türü',
-            'Binmi': 'Birimi', 'binmi': 'birimi',
-            'Baslama': 'Başlama', 'baslama': 'başlama',
-            'edenm': 'ederim', 'Edenm': 'Ederim',
-            'Numarasi': 'Numarası', 'numarasi': 'numarası',
-            'Kirmlik': 'Kimlik', 'kirmlik': 'kimlik',
-            'izntn': 'iznin', 'İzntn': 'İznin',
-            'belirtiğim': 'belirttiğim', 'belirtigim': 'belirttiğim',
-            'tanhler': 'tarihler', 'Tanhler': 'Tarihler',
-            'ORAYI': 'ONAYI', 'orayi': 'onayı',
-            'İşveran': 'İşveren', 'işveran': 'işveren',
-            'Adi': 'Adı', 'adi': 'adı',
-            'imza': 'İmza'
-        }
+        # Türkçe kelime düzeltmeleri (hr_vocabulary.txt, OCR_VOCABULARY ile değiştirilebilir)
+        self.corrector = TurkishCorrector.from_file()
+
+        # Kalıcı sayfa önbelleği (PageCache ya da None)
+        self.cache = cache
     
+    def _thread_pool(self):
+        """Paylaşılan OCR thread havuzu (ilk kullanımda oluşturulur)"""
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.psm_parallelism,
+                                                thread_name_prefix='ocr')
+            return self._pool
+
+    def close(self):
+        """Thread havuzunu durdur ve Tesseract API'lerini kapat"""
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=True)
+                self._pool = None
+        self.engine.close()
+
     def setup_tesseract(self):
         """Tesseract yolunu ayarla"""
         if os.name == 'nt':  # Windows
@@ -68,237 +675,609 @@ class SmartOCR:
             logger.warning("⚠️ Tesseract yolu bulunamadı, sistem PATH'i kullanılacak")
     
     def preprocess_image(self, image):
-        """Basit görüntü ön işleme"""
+        """
+        Basit görüntü ön işleme
+
+        Sayfa gri tonlamada render edildiği için tek bir çalışma tamponu
+        oluşturulur ve kontrast/eşikleme adımları bu tampon üzerinde yerinde yapılır.
+        """
         try:
-            # PIL -> OpenCV
-            img_array = np.array(image)
-            if len(img_array.shape) == 3:
-                img = cv2.cvtColor(img_array, cv2.COLOR_RGB2BGR)
-            else:
-                img = cv2.cvtColor(img_array, cv2.COLOR_GRAY2BGR)
+            # PIL -> OpenCV (yazılabilir tek kanallı tampon)
+            gray = np.array(image)
+            if gray.ndim == 3:
+                # Renkli girdi (ör. eski çağıranlar) - doğrudan griye çevir
+                gray = cv2.cvtColor(gray, cv2.COLOR_RGB2GRAY)
             
-            # Boyut kontrolü
-            h, w = img.shape[:2]
-            if max(h, w) > 2500:
-                scale = 2500 / max(h, w)
+            # Boyut kontrolü (render zaten sınıra göre yapılır, yedek olarak kalır)
+            h, w = gray.shape[:2]
+            if max(h, w) > MAX_LONG_EDGE:
+                scale = MAX_LONG_EDGE / max(h, w)
                 new_w, new_h = int(w * scale), int(h * scale)
-                img = cv2.resize(img, (new_w, new_h), interpolation=cv2.INTER_LANCZOS4)
-            
-            # Gri tonlama
-            gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+                gray = cv2.resize(gray, (new_w, new_h), interpolation=cv2.INTER_AREA)
             
-            # Kontrast artırma
-            enhanced = cv2.convertScaleAbs(gray, alpha=1.3, beta=15)
+            # Kontrast artırma (yerinde)
+            cv2.convertScaleAbs(gray, dst=gray, alpha=1.3, beta=15)
             
-            # Adaptive threshold
-            binary = cv2.adaptiveThreshold(
-                enhanced, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, 
-                cv2.THRESH_BINARY, 11, 2
+            # Adaptive threshold (yerinde)
+            cv2.adaptiveThreshold(
+                gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, 
+                cv2.THRESH_BINARY, 11, 2, dst=gray
             )
             
-            return Image.fromarray(binary)
+            return Image.fromarray(gray)
             
         except Exception as e:
             logger.error(f"❌ Ön işleme hatası: {e}")
             return image
     
     def is_table_like(self, image):
-        """Basit tablo algılama"""
+        """Tablo algılama (küçültülmüş kopya üzerinde yerleşim bölütlemesi ile)"""
         try:
-            img_array = np.array(image)
-            
-            # Yatay çizgileri algıla
-            horizontal_kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (50, 1))
-            horizontal_lines = cv2.morphologyEx(img_array, cv2.MORPH_OPEN, horizontal_kernel)
-            
-            # Dikey çizgileri algıla
-            vertical_kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (1, 50))
-            vertical_lines = cv2.morphologyEx(img_array, cv2.MORPH_OPEN, vertical_kernel)
-            
-            # Çizgi yoğunluğu
-            h_density = np.sum(horizontal_lines > 0) / horizontal_lines.size
-            v_density = np.sum(vertical_lines > 0) / vertical_lines.size
-            
-            # Güçlü tablo sinyali gerekli
-            is_table = (h_density > 0.05 and v_density > 0.05)
-            
-            if is_table:
-                logger.info(f"📋 Güçlü tablo algılandı (H:{h_density:.3f}, V:{v_density:.3f})")
-            else:
-                logger.info(f"📄 Normal döküman (H:{h_density:.3f}, V:{v_density:.3f})")
-            
-            return is_table
-            
+            return bool(segment_layout(image)["tables"])
         except Exception as e:
             logger.error(f"❌ Tablo algılama hatası: {e}")
             return False
     
+    def _run_tesseract(self, image, psm):
+        """
+        Tek bir PSM ile OCR yap; metni ve kelime güvenlerini tek geçişte al
+
+        Returns:
+            dict: psm, ham metin, ortalama güven ve kelime sayısı
+        """
+        data = self.engine.image_to_data(image, psm)
+        return self._summarize_data(data, psm)
+
+    @staticmethod
+    def _summarize_data(data, psm):
+        """image_to_data çıktısından metni (blok/satır yapısıyla) ve güveni çıkar"""
+        lines = {}
+        confidences = []
+
+        for i, word in enumerate(data['text']):
+            word = word.strip()
+            conf = float(data['conf'][i])
+            if not word or conf < 0:
+                continue
+
+            key = (data['block_num'][i], data['par_num'][i], data['line_num'][i])
+            lines.setdefault(key, []).append(word)
+            confidences.append(conf)
+
+        text_lines = []
+        previous_block = None
+        for key in sorted(lines):
+            if previous_block is not None and key[0] != previous_block:
+                text_lines.append("")
+            text_lines.append(" ".join(lines[key]))
+            previous_block = key[0]
+
+        return {
+            "psm": psm,
+            "text": "\n".join(text_lines).strip(),
+            "mean_confidence": sum(confidences) / len(confidences) if confidences else 0.0,
+            "word_count": len(confidences)
+        }
+
+    def _probe_layout(self, image):
+        """
+        Küçültülmüş görüntü üzerinde ucuz bir yerleşim sondası ile en uygun PSM'i tahmin et
+
+        Returns:
+            str: Tahmin edilen PSM
+        """
+        w, h = image.size
+        probe = image.resize((max(1, int(w * PROBE_SCALE)), max(1, int(h * PROBE_SCALE))), Image.BILINEAR)
+        data = self.engine.image_to_data(probe, '3')
+
+        # Kelime içeren blokların kapsadığı alanlar
+        blocks = {}
+        for i, word in enumerate(data['text']):
+            if not word.strip() or float(data['conf'][i]) < 0:
+                continue
+            left, top = data['left'][i], data['top'][i]
+            right, bottom = left + data['width'][i], top + data['height'][i]
+            box = blocks.get(data['block_num'][i])
+            blocks[data['block_num'][i]] = (
+                (min(box[0], left), min(box[1], top), max(box[2], right), max(box[3], bottom))
+                if box else (left, top, right, bottom)
+            )
+
+        if len(blocks) <= 1:
+            return '6'
+
+        # Dikeyde örtüşüp yatayda ayrık bloklar varsa çok sütunlu yerleşim
+        boxes = list(blocks.values())
+        for i, a in enumerate(boxes):
+            for b in boxes[i + 1:]:
+                vertical_overlap = min(a[3], b[3]) - max(a[1], b[1])
+                horizontal_gap = max(a[0], b[0]) - min(a[2], b[2])
+                if vertical_overlap > 0 and horizontal_gap > 0:
+                    return '3'
+
+        return '4'
+
+    def _candidate_score(self, candidate, max_words):
+        """Ortalama güveni, az kelime okuyan adaylar öne geçmesin diye kapsamla ağırlıklandır"""
+        if not candidate["word_count"] or not max_words:
+            return 0.0
+        return candidate["mean_confidence"] * min(1.0, candidate["word_count"] / float(max_words))
+
     def smart_ocr(self, image):
-        """Akıllı OCR - çoklu yaklaşım"""
+        """
+        Akıllı OCR - güvene dayalı PSM seçimi
+
+        Önce yerleşim sondasının tahmin ettiği PSM çalıştırılır; ortalama kelime
+        güveni eşiği geçerse kabul edilir. Geçmezse diğer konfigürasyonlar paralel
+        denenir ve en iyi aday seçilir.
+
+        Returns:
+            tuple: (temizlenmiş metin, OCR istatistikleri)
+        """
+        stats = {"ocr_passes": 0, "probe_psm": None, "psm": None, "mean_confidence": 0.0}
+
         try:
-            # Farklı OCR konfigürasyonları
-            configs = [
-                '--psm 4 --oem 1',  # Single column
-                '--psm 6 --oem 1',  # Single uniform block
-                '--psm 3 --oem 1',  # Fully automatic
-                '--psm 1 --oem 1'   # Auto with OSD
-            ]
-            
-            best_text = ""
-            best_score = 0
-            
-            for i, config in enumerate(configs):
-                try:
-                    logger.info(f"  📝 OCR denemesi {i+1}/{len(configs)}")
-                    
-                    text = pytesseract.image_to_string(
-                        image, lang=self.lang, config=config
-                    ).strip()
-                    
-                    if text and len(text) > 5:
-                        # Basit kalite skoru
-                        cleaned_text = self.clean_text(text)
-                        word_count = len(cleaned_text.split())
-                        char_count = len(cleaned_text)
-                        unique_words = len(set(cleaned_text.lower().split()))
-                        
-                        if word_count > 0:
-                            diversity = unique_words / word_count
-                            score = char_count * diversity * 0.5 + word_count * 2
-                            
-                            if score > best_score:
-                                best_score = score
-                                best_text = cleaned_text
-                                logger.info(f"    ✅ Yeni en iyi skor: {score:.1f}")
-                        
-                except Exception as e:
-                    logger.info(f"    ❌ Config {i+1} başarısız: {e}")
-                    continue
-            
-            return best_text
+            try:
+                predicted = self._probe_layout(image)
+            except Exception as e:
+                logger.info(f"    ❌ Yerleşim sondası başarısız: {e}")
+                predicted = '4'
+            stats["probe_psm"] = predicted
+            # Sonda da (yarım ölçekte) tam bir PSM 3 geçişidir
+            stats["ocr_passes"] = 1
+
+            logger.info(f"  📝 OCR denemesi: --psm {predicted} (tahmin)")
+            candidates = []
+            try:
+                candidates.append(self._run_tesseract(image, predicted))
+            except Exception as e:
+                logger.info(f"    ❌ PSM {predicted} başarısız: {e}")
+            stats["ocr_passes"] += 1
+
+            accepted = candidates and candidates[0]["mean_confidence"] >= self.conf_threshold
+            if accepted:
+                logger.info(f"    ✅ Güven {candidates[0]['mean_confidence']:.1f} >= {self.conf_threshold:.0f}, kabul edildi")
+            else:
+                fallbacks = [psm for psm in PSM_CONFIGS if psm != predicted]
+                logger.info(f"  📝 Düşük güven, yedek PSM'ler paralel deneniyor: {', '.join(fallbacks)}")
+
+                pool = self._thread_pool()
+                futures = {psm: pool.submit(self._run_tesseract, image, psm) for psm in fallbacks}
+                for psm, future in futures.items():
+                    try:
+                        candidates.append(future.result())
+                    except Exception as e:
+                        logger.info(f"    ❌ PSM {psm} başarısız: {e}")
+                stats["ocr_passes"] += len(fallbacks)
+
+            if not candidates:
+                return "", stats
+
+            max_words = max(c["word_count"] for c in candidates)
+            best = max(candidates, key=lambda c: self._candidate_score(c, max_words))
+
+            stats["psm"] = best["psm"]
+            stats["mean_confidence"] = round(best["mean_confidence"], 1)
+            logger.info(f"    ✅ Seçilen PSM {best['psm']} (güven: {best['mean_confidence']:.1f}, "
+                        f"{stats['ocr_passes']} geçiş)")
+
+            if len(best["text"]) <= 5:
+                return "", stats
+
+            return self.clean_text(best["text"]), stats
             
         except Exception as e:
             logger.error(f"❌ OCR hatası: {e}")
-            return ""
+            return "", stats
     
     def clean_text(self, text):
         """Türkçe metin temizleme"""
-        if not text:
-            return ""
-        
-        # Türkçe kelime düzeltmeleri
-        for old, new in self.turkish_fixes.items():
-            text = text.replace(old, new)
-        
-        # Tarih düzeltmeleri - daha kapsamlı
-        text = re.sub(r'O(\d)', r'0\1', text)  # O2 -> 02
-        text = re.sub(r'(\d)O', r'\g<1>0', text)  # 2O -> 20
-        text = re.sub(r'(\d{2})\s+O(\d)', r'\1.0\2', text)  # 02 O1 -> 02.01
-        text = re.sub(r'(\d{2})\s+(\d{2})\s+(\d{4})', r'\1.\2.\3', text)  # 02 01 2020 -> 02.01.2020
-        
-        # Tarih formatında I harfi düzeltmeleri (OCR'da 1 rakamı I olarak okunuyor)
-        text = re.sub(r'(\d{2})\s+I(\d)', r'\1.0\2', text)  # 02 I1 -> 02.01
-        text = re.sub(r'(\d{2})\s+(\d{2})\s+I(\d{4})', r'\1.\2.0\3', text)  # 02 01 I2020 -> 02.01.02020
-        text = re.sub(r'(\d{2})\s+I(\d)\s+(\d{4})', r'\1.0\2.\3', text)  # 02 I1 2020 -> 02.01.2020
-        
-        # T.C düzeltmeleri - daha kapsamlı
-        text = re.sub(r'T\s*Ç', 'T.C', text)  # T Ç -> T.C
-        text = re.sub(r'T\s*C(?!\w)', 'T.C', text)  # T C -> T.C
-        text = re.sub(r'T\s*Ç(?!\w)', 'T.C', text)  # T Ç -> T.C
-        text = re.sub(r'T\.Ç', 'T.C', text)  # T.Ç -> T.C
-        
-        # Geçersiz karakterleri temizle
-        text = re.sub(r'[^\w\sğüşıöçĞÜŞİÖÇ.,!?:;()\-=|/]', ' ', text)
-        
-        # Çoklu boşlukları düzelt
-        text = re.sub(r'\s+', ' ', text)
-        
-        # Form düzeltmeleri
-        text = text.replace('T C', 'T.C.')
-        text = text.replace('TC', 'T.C.')
-        
-        # Anlamsız tekrarları filtrele
-        words = []
-        for word in text.split():
-            word = word.strip('.,!?:;()-')
-            # Anlamlı kelimeler
-            if (len(word) >= 2 and 
-                not re.match(r'^[A-Z]{1,2}$', word) and
-                not re.match(r'^[.,-]+$', word) and
-                word not in ['KE', 'Te', 'Ke', 'TE', 'ke', 'te']):
-                words.append(word)
-        
-        result = ' '.join(words).strip()
-        
-        # Son temizlik
-        result = re.sub(r'\n{3,}', '\n\n', result)
-        result = re.sub(r' {2,}', ' ', result)
-        
+        return self.corrector.clean(text)
+
+    def clean_cell(self, text):
+        """Tablo hücresi temizleme - kısa değerler (sayı, tek harf) korunur, satır yapısı tek satıra iner"""
+        text, _ = self.corrector.correct_words(text)
+        return ' '.join(text.split())
+
+    def _ocr_region(self, image, region):
+        """Tek bir bölgeyi kırp ve bölge türüne uygun PSM ile OCR'la"""
+        crop = image.crop(region["box"])
+        result = self._run_tesseract(crop, region["psm"])
+        result["region"] = region
         return result
+
+    def layout_ocr(self, image, layout):
+        """
+        Tablo hücrelerini ve metin bloklarını paralel OCR'la, okuma sırasında birleştir
+
+        Tablolar satır başına sekmeyle ayrılmış hücreler (TSV) olarak yazılır.
+
+        Returns:
+            tuple: (sayfa metni, OCR istatistikleri)
+        """
+        page_h = image.size[1]
+        regions = []
+        for index, box in enumerate(layout["blocks"]):
+            regions.append({"kind": "block", "box": box, "psm": REGION_PSM['block'], "index": index})
+
+        skipped = 0
+        for t, table in enumerate(layout["tables"]):
+            for r, row in enumerate(table["rows"]):
+                for c, box in enumerate(row):
+                    if table["ink"][r][c] < EMPTY_CELL_INK:
+                        skipped += 1
+                        continue
+                    # Grid çizgilerini kırpıntıdan uzak tut
+                    inset = (box[0] + 3, box[1] + 3, max(box[0] + 4, box[2] - 3), max(box[1] + 4, box[3] - 3))
+                    single_line = (box[3] - box[1]) < page_h * 0.03
+                    psm = REGION_PSM['cell_line'] if single_line else REGION_PSM['cell']
+                    regions.append({"kind": "cell", "box": inset, "psm": psm, "table": t, "row": r, "col": c})
+
+        results = []
+        pool = self._thread_pool()
+        for future in [pool.submit(self._ocr_region, image, region) for region in regions]:
+            try:
+                results.append(future.result())
+            except Exception as e:
+                logger.info(f"    ❌ Bölge OCR başarısız: {e}")
+
+        # Tablo hücrelerini satır/sütun ızgarasına yerleştir
+        cells = {}
+        block_parts = []
+        confidences = []
+        for result in results:
+            region = result["region"]
+            if result["word_count"]:
+                confidences.append((result["mean_confidence"], result["word_count"]))
+            if region["kind"] == "cell":
+                cells[(region["table"], region["row"], region["col"])] = self.clean_cell(result["text"])
+            elif len(result["text"]) > 1:
+                block_parts.append({"box": region["box"], "text": self.clean_text(result["text"])})
+
+        parts = [part for part in block_parts if part["text"]]
+        for t, table in enumerate(layout["tables"]):
+            rows = [
+                "\t".join(cells.get((t, r, c), "") for c in range(len(row)))
+                for r, row in enumerate(table["rows"])
+            ]
+            parts.append({"box": table["box"], "text": "\n".join(rows)})
+
+        words = sum(count for _, count in confidences)
+        stats = {
+            "ocr_passes": len(regions),
+            "probe_psm": None,
+            "psm": "layout",
+            "mean_confidence": round(sum(conf * count for conf, count in confidences) / words, 1) if words else 0.0,
+            "layout": {
+                "tables": len(layout["tables"]),
+                "cells": sum(len(row) for table in layout["tables"] for row in table["rows"]),
+                "empty_cells_skipped": skipped,
+                "blocks": len(layout["blocks"]),
+            },
+        }
+        logger.info(f"    ✅ Yerleşim OCR: {stats['layout']['tables']} tablo, {stats['layout']['cells']} hücre, "
+                    f"{stats['layout']['blocks']} blok ({len(regions)} bölge paralel)")
+
+        return "\n\n".join(part["text"] for part in reading_order(parts, page_h)), stats
     
-    def ocr_pdf(self, pdf_path):
-        """PDF'yi OCR ile işle - basit yaklaşım"""
+    def cache_settings(self, dpi=None):
+        """OCR çıktısını etkileyen motor ayarları (önbellek anahtarının parçası)"""
+        return {
+            "engine": self.engine.backend,
+            "lang": self.lang,
+            "dpi": dpi or self.dpi,
+            "max_long_edge": MAX_LONG_EDGE,
+            "conf_threshold": self.conf_threshold,
+            "corrector": self.corrector.signature,
+        }
+
+    def _lookup_cached_pages(self, pdf_path, dpi):
+        """
+        İçerik hash'i önbellekte olan sayfaları render etmeden bul
+
+        Returns:
+            tuple: ({sayfa: içerik hash'i}, {sayfa: (sayfa, metin, timing)})
+        """
+        if self.cache is None:
+            return {}, {}
+
         try:
-            logger.info(f"📄 PDF işleniyor: {os.path.basename(pdf_path)}")
+            hashes = page_content_hashes(pdf_path, fitz)
+        except Exception as e:
+            logger.warning(f"⚠️ Sayfa hash'leri hesaplanamadı: {e}")
+            return {}, {}
+
+        settings = self.cache_settings(dpi)
+        hits = {}
+        for page_num, page_hash in hashes.items():
+            cached = self.cache.get(PageCache.make_key(page_hash, settings))
+            if cached is not None:
+                page_text, timing = cached
+                hits[page_num] = (page_num, self._with_page_header(page_num, page_text),
+                                  {**timing, "page": page_num, "cache": "hit"})
+
+        if hashes:
+            logger.info(f"💾 Önbellek: {len(hits)}/{len(hashes)} sayfa değişmemiş, OCR atlanacak")
+        return hashes, hits
+
+    def _cache_report(self, page_results):
+        """Bu belge için isabet oranı + önbelleğin genel durumu"""
+        report = self.cache.report()
+        states = [timing.get("cache") for _, _, timing in page_results]
+        hits, misses = states.count("hit"), states.count("miss")
+        report.update({
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / (hits + misses), 3) if hits + misses else None,
+        })
+        return report
+
+    @staticmethod
+    def _with_page_header(page_num, page_text):
+        """Sayfa başlığı ekle (boş sayfa boş kalır)"""
+        return f"=== SAYFA {page_num} ===\n{page_text}" if page_text else ""
+
+    def process_page(self, image, page_num, page_hash=None):
+        """
+        Tek sayfayı ön işle ve OCR'la
+
+        Önbellek açıksa sonuç sayfa hash'i (verilmezse render edilmiş görüntünün
+        hash'i) ile saklanır; page_hash verilmemişse önce önbelleğe bakılır.
+
+        Returns:
+            tuple: (sayfa içeriği, sayfa süre bilgileri)
+        """
+        start_time = time.time()
+
+        cache_key = None
+        if self.cache is not None:
+            cache_key = PageCache.make_key(page_hash or bitmap_hash(image), self.cache_settings())
+            cached = self.cache.get(cache_key) if page_hash is None else None
+            if cached is not None:
+                page_text, timing = cached
+                logger.info(f"💾 Sayfa {page_num}: önbellekten alındı")
+                return self._with_page_header(page_num, page_text), {**timing, "page": page_num, "cache": "hit"}
+
+        # Görüntüyü ön işle
+        processed_img = self.preprocess_image(image)
+        
+        # Yerleşim bölütlemesi: tablo varsa bölgeler ayrı ayrı, yoksa tüm sayfa OCR'lanır
+        layout_start = time.time()
+        try:
+            layout = segment_layout(processed_img)
+        except Exception as e:
+            logger.error(f"❌ Yerleşim bölütleme hatası: {e}")
+            layout = {"tables": [], "blocks": []}
+        layout_time = round(time.time() - layout_start, 3)
+
+        if layout["tables"]:
+            logger.info(f"📋 Tablo algılandı ({len(layout['tables'])} adet), yerleşim OCR'ı kullanılıyor")
+            page_text, ocr_stats = self.layout_ocr(processed_img, layout)
+        else:
+            page_text, ocr_stats = self.smart_ocr(processed_img)
+        ocr_stats["layout_time"] = layout_time
+
+        timing = {
+            "page": page_num,
+            "ocr_time": round(time.time() - start_time, 3),
+            "characters": len(page_text),
+            **ocr_stats
+        }
+
+        if cache_key is not None:
+            # Sayfa numarası değişebileceği için başlıksız metin saklanır. Boş sonuç
+            # motor hatasından da gelebileceği için önbelleğe yazılmaz, sayfa sonraki
+            # çalıştırmada yeniden OCR'lanır
+            if page_text:
+                self.cache.put(cache_key, page_text, timing)
+            timing["cache"] = "miss"
+        
+        if page_text:
+            logger.info(f"✅ Sayfa {page_num}: {len(page_text)} karakter")
+        else:
+            logger.warning(f"⚠️ Sayfa {page_num}: Metin bulunamadı")
+
+        return self._with_page_header(page_num, page_text), timing
+
+    def _ocr_pages_sequential(self, pdf_path, on_page=None):
+        """Sayfaları tek süreçte sırayla işle - sayfalar render edildikçe OCR'lanır"""
+        page_count, _ = pdf_page_info(pdf_path)
+        logger.info(f"📊 {page_count} sayfa bulundu")
+
+        # Önbellekte olan sayfalar render edilmez
+        hashes, hits = self._lookup_cached_pages(pdf_path, self.dpi)
+        misses = [n for n in range(1, page_count + 1) if n not in hits] if hits else None
+        cached_order = sorted(hits)
+
+        results = []
+
+        def _add(result):
+            results.append(result)
+            if on_page:
+                on_page(*result)
+
+        pages = render_pdf_pages(pdf_path, self.dpi, pages=misses)
+
+        while True:
+            render_start = time.time()
+            page = next(pages, None)
+
+            # Sıradaki render edilen sayfadan önceki önbellek sonuçlarını sırayla ver
+            limit = page[0] if page is not None else page_count + 1
+            while cached_order and cached_order[0] < limit:
+                _add(hits[cached_order.pop(0)])
+
+            if page is None:
+                break
+
+            page_num, image = page
+            render_time = round(time.time() - render_start, 3)
+            logger.info(f"📄 Sayfa {page_num}/{page_count} işleniyor...")
             
-            # PDF'yi görüntülere çevir
             try:
-                images = convert_from_path(
-                    pdf_path,
-                    dpi=self.dpi,
-                    thread_count=1
-                )
+                page_text, timing = self.process_page(image, page_num, hashes.get(page_num))
+                timing["render_time"] = render_time
+                result = (page_num, page_text, timing)
             except Exception as e:
-                logger.error(f"❌ PDF dönüştürme hatası: {e}")
-                return {
-                    "success": False,
-                    "error": f"PDF dönüştürme hatası: {str(e)}",
-                    "text": ""
+                logger.error(f"❌ Sayfa {page_num} hatası: {e}")
+                result = (page_num, "", {"page": page_num, "error": str(e)})
+            finally:
+                # Memory temizliği
+                del image, page
+                gc.collect()
+            _add(result)
+
+        return page_count, results
+
+    def _ocr_pages_parallel(self, pdf_path, on_page=None):
+        """
+        Sayfaları process pool üzerinde paralel işle
+
+        on_page sayfalar bittikçe (tamamlanma sırasıyla) çağrılır; dönen liste sayfa sırasındadır.
+        """
+        page_count, page_size = pdf_page_info(pdf_path)
+        logger.info(f"📊 {page_count} sayfa bulundu")
+
+        if page_count == 0:
+            return 0, []
+
+        workers = min(self.workers, page_count)
+        available = available_memory_mb()
+        if available and self.worker_memory_mb:
+            fitting = max(1, int(available // self.worker_memory_mb))
+            if fitting < workers:
+                logger.info(f"📉 Kullanılabilir bellek ({available:.0f} MB) için worker sayısı düşürüldü: "
+                            f"{workers} -> {fitting}")
+                workers = fitting
+
+        threads = max(1, (os.cpu_count() or 1) // workers)
+        plan = dpi_for_memory_budget(page_size, self.worker_memory_mb, self.dpi, threads)
+        if plan is None:
+            logger.warning(f"⚠️ Worker bellek bütçesi ({self.worker_memory_mb} MB) tek Tesseract API'si için "
+                           f"yetersiz (en az {estimate_worker_memory_mb(page_size, MIN_BUDGET_DPI):.0f} MB); "
+                           f"sayfalar sırayla işleniyor")
+            return self._ocr_pages_sequential(pdf_path, on_page)
+
+        dpi, planned_threads = plan
+        if planned_threads < threads:
+            logger.info(f"📉 Worker bellek bütçesi için thread sayısı düşürüldü: {threads} -> {planned_threads}")
+            threads = planned_threads
+        if dpi < int(effective_dpi(page_size, self.dpi)):
+            logger.info(f"📉 Worker bellek bütçesi için DPI düşürüldü: {self.dpi} -> {dpi}")
+
+        logger.info(f"⚙️ Paralel OCR: {workers} worker, worker başına {threads} thread, "
+                    f"tahmini {estimate_worker_memory_mb(page_size, dpi, threads):.0f}/{self.worker_memory_mb} MB")
+
+        # Önbellekte olan sayfalar worker'lara gönderilmez
+        hashes, results = self._lookup_cached_pages(pdf_path, dpi)
+        if on_page:
+            for page_num in sorted(results):
+                on_page(*results[page_num])
+
+        misses = [n for n in range(1, page_count + 1) if n not in results]
+        if not misses:
+            return page_count, [results[n] for n in sorted(results)]
+
+        cache_config = None
+        if self.cache is not None:
+            cache_config = {
+                "path": self.cache.path,
+                "max_mb": self.cache.max_bytes / (1024 * 1024),
+                "max_entries": self.cache.max_entries,
+            }
+
+        # fork ile açılan worker'lar ebeveynde zaten yüklenmiş libgomp'u devralır ve
+        # thread sınırını görmez; spawn ile her worker modülü sıfırdan içe aktarır
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_init_worker,
+            initargs=(self.lang, dpi, threads, self.conf_threshold, cache_config, self.worker_memory_mb)
+        ) as pool:
+            # Worker süreçleri submit sırasında başlatılır
+            with _worker_environment(threads):
+                futures = {
+                    pool.submit(_ocr_page_worker, pdf_path, page_num, dpi, hashes.get(page_num)): page_num
+                    for page_num in misses
                 }
-            
-            logger.info(f"📊 {len(images)} sayfa bulundu")
-            
-            all_pages = []
-            
-            for page_num, image in enumerate(images, 1):
-                logger.info(f"📄 Sayfa {page_num}/{len(images)} işleniyor...")
-                
+            retry = []
+            for future in as_completed(futures):
+                page_num = futures[future]
                 try:
-                    # Görüntüyü ön işle
-                    processed_img = self.preprocess_image(image)
-                    
-                    # Tablo algılama (basit)
-                    is_table = self.is_table_like(processed_img)
-                    
-                    # OCR yap
-                    page_text = self.smart_ocr(processed_img)
-                    
-                    if page_text:
-                        # Sayfa başlığı ekle
-                        page_content = f"=== SAYFA {page_num} ===\n{page_text}"
-                        all_pages.append(page_content)
-                        logger.info(f"✅ Sayfa {page_num}: {len(page_text)} karakter")
-                    else:
-                        logger.warning(f"⚠️ Sayfa {page_num}: Metin bulunamadı")
-                
+                    results[page_num] = future.result()
+                except (BrokenProcessPool, MemoryError):
+                    # Worker bellek sınırına takıldı; sayfa aşağıda ana süreçte işlenir
+                    retry.append(page_num)
+                    continue
                 except Exception as e:
                     logger.error(f"❌ Sayfa {page_num} hatası: {e}")
-                    continue
+                    results[page_num] = (page_num, "", {"page": page_num, "error": str(e)})
+                if on_page:
+                    on_page(*results[page_num])
+
+        if retry:
+            logger.warning(f"⚠️ {len(retry)} sayfada worker sonlandı ya da bellek sınırını aştı, ana süreçte işleniyor")
+            for page_num, image in render_pdf_pages(pdf_path, dpi, pages=retry):
+                try:
+                    page_text, timing = self.process_page(image, page_num, hashes.get(page_num))
+                    timing["worker_retry"] = True
+                    results[page_num] = (page_num, page_text, timing)
+                except Exception as e:
+                    logger.error(f"❌ Sayfa {page_num} hatası: {e}")
+                    results[page_num] = (page_num, "", {"page": page_num, "error": str(e)})
                 finally:
-                    # Memory temizliği
                     del image
                     gc.collect()
+                if on_page:
+                    on_page(*results[page_num])
+
+        return page_count, [results[n] for n in sorted(results)]
+
+    def ocr_pdf(self, pdf_path, on_page=None):
+        """
+        PDF'yi OCR ile işle - sıralı veya process pool ile paralel
+
+        Args:
+            on_page: Her sayfa bittiğinde (page_num, page_text, timing) ile çağrılır
+        """
+        try:
+            logger.info(f"📄 PDF işleniyor: {os.path.basename(pdf_path)}")
+            start_time = time.time()
             
-            # Final metin
+            try:
+                if self.workers > 1:
+                    page_count, page_results = self._ocr_pages_parallel(pdf_path, on_page)
+                else:
+                    page_count, page_results = self._ocr_pages_sequential(pdf_path, on_page)
+            except Exception as e:
+                logger.error(f"❌ PDF dönüştürme hatası: {e}")
+                return {
+                    "success": False,
+                    "error": f"PDF dönüştürme hatası: {str(e)}",
+                    "text": ""
+                }
+            
+            # Final metin (sayfa sırasıyla)
+            all_pages = [page_text for _, page_text, _ in page_results if page_text]
             final_text = "\n\n".join(all_pages)
             
             logger.info(f"🎉 OCR tamamlandı: {len(final_text)} karakter")
+            cache_report = self._cache_report(page_results) if self.cache is not None else None
+            if cache_report:
+                logger.info(f"💾 Önbellek isabeti: {cache_report['hits']}/{cache_report['hits'] + cache_report['misses']} "
+                            f"sayfa ({cache_report['entries']} kayıt, {cache_report['size_mb']} MB)")
             
             return {
                 "success": True,
                 "text": final_text,
-                "pages": len(images),
-                "character_count": len(final_text)
+                "pages": page_count,
+                "character_count": len(final_text),
+                "workers": min(self.workers, page_count) if page_count else self.workers,
+                "total_time": round(time.time() - start_time, 3),
+                "ocr_passes": sum(timing.get("ocr_passes", 0) for _, _, timing in page_results
+                                  if timing.get("cache") != "hit"),
+                "cache": cache_report,
+                "page_timings": [timing for _, _, timing in page_results]
             }
             
         except Exception as e:
@@ -323,7 +1302,9 @@ def main():
             print(json.dumps(result, ensure_ascii=False))
             return
         
-        pdf_path = sys.argv[1]
+        # Motor karşılaştırması: python ocr_py.py --benchmark-engine <pdf>
+        benchmark = sys.argv[1] == '--benchmark-engine'
+        pdf_path = sys.argv[2] if benchmark and len(sys.argv) > 2 else sys.argv[1]
         
         if not os.path.exists(pdf_path):
             result = {"success": False, "error": f"Dosya bulunamadı: {pdf_path}"}
@@ -333,18 +1314,51 @@ def main():
         # OCR ayarları
         lang = os.environ.get("TESSERACT_LANG", "tur+eng")
         dpi = int(os.environ.get("OCR_DPI", "300"))
+
+        if benchmark:
+            ocr = SmartOCR(lang=lang, dpi=dpi)
+            _, image = next(render_pdf_pages(pdf_path, ocr.dpi, last_page=1))
+            ocr.close()
+            result = benchmark_engines(ocr.preprocess_image(image), lang=lang)
+            print(json.dumps({"success": True, "benchmark": result}, ensure_ascii=False))
+            return
+
+        workers = int(os.environ.get("OCR_WORKERS", "1"))
+        worker_memory_mb = int(os.environ.get("OCR_WORKER_MEMORY_MB", "1024"))
+        conf_threshold = float(os.environ.get("OCR_CONF_THRESHOLD", "70"))
+        stream = os.environ.get("OCR_STREAM", "0") == "1"
         
-        logger.info(f"🚀 Akıllı OCR başlatılıyor (lang={lang}, dpi={dpi})")
+        logger.info(f"🚀 Akıllı OCR başlatılıyor (lang={lang}, dpi={dpi}, workers={workers})")
         
         # OCR işlemi
-        ocr = SmartOCR(lang=lang, dpi=dpi)
-        result = ocr.ocr_pdf(pdf_path)
+        ocr = SmartOCR(lang=lang, dpi=dpi, workers=workers, worker_memory_mb=worker_memory_mb,
+                       conf_threshold=conf_threshold, cache=PageCache.from_env())
+        if stream:
+            # NDJSON: sayfa bittikçe bir satır, en sonda özet satırı (metin sayfa satırlarındadır)
+            def emit_page(page_num, page_text, timing):
+                line = {"type": "page", "page": page_num, "text": page_text, "timing": timing}
+                print(json.dumps(line, ensure_ascii=False), flush=True)
+
+            try:
+                result = ocr.ocr_pdf(pdf_path, on_page=emit_page)
+            finally:
+                ocr.close()
+            result.pop("text", None)
+            print(json.dumps({"type": "summary", **result}, ensure_ascii=False), flush=True)
+            return
+
+        try:
+            result = ocr.ocr_pdf(pdf_path)
+        finally:
+            ocr.close()
         
         # Sonucu yazdır
         print(json.dumps(result, ensure_ascii=False))
         
     except Exception as e:
         result = {"success": False, "error": str(e)}
+        if os.environ.get("OCR_STREAM", "0") == "1":
+            result = {"type": "summary", **result}
         print(json.dumps(result, ensure_ascii=False))
 
 if __name__ == "__main__":
@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Sayfa Düzeyinde Kalıcı OCR Önbelleği
+Sayfa içerik hash'i + motor ayarlarına göre anahtarlanan SQLite deposu
+"""
+
+import os
+import sys
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+
+# Varsayılan önbellek konumu ve sınırları (OCR_CACHE_PATH / OCR_CACHE_MAX_MB / OCR_CACHE_MAX_ENTRIES)
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser('~'), '.cache', 'sametei', 'ocr_pages.sqlite')
+DEFAULT_MAX_MB = 256
+DEFAULT_MAX_ENTRIES = 50000
+
+# Sınır aşıldığında önbellek bu orana kadar boşaltılır (her eklemede tahliye yapılmasın)
+EVICTION_TARGET = 0.9
+
+# Anahtar biçimi değiştiğinde eski kayıtların kullanılmaması için sürüm
+CACHE_VERSION = 1
+
+
+def page_content_hashes(pdf_path, fitz_module):
+    """
+    PDF sayfalarının içerik hash'leri (render etmeden)
+
+    Sayfanın içerik akışları, kullandığı görseller ve form XObject'leri, sayfa
+    boyutu ve döndürmesi hash'lenir. Paylaşılan görseller bir kez hash'lenir.
+
+    Returns:
+        dict: {sayfa numarası: hex hash}; PyMuPDF yoksa boş sözlük
+    """
+    if fitz_module is None:
+        return {}
+
+    hashes = {}
+    xref_hashes = {}
+
+    def _xref_hash(doc, xref):
+        if xref not in xref_hashes:
+            try:
+                xref_hashes[xref] = hashlib.sha256(doc.xref_stream_raw(xref) or b'').hexdigest()
+            except Exception:
+                xref_hashes[xref] = str(xref)
+        return xref_hashes[xref]
+
+    with fitz_module.open(pdf_path) as doc:
+        for index in range(doc.page_count):
+            page = doc.load_page(index)
+            digest = hashlib.sha256()
+            digest.update(f"{tuple(page.rect)}|{page.rotation}".encode())
+            digest.update(page.read_contents() or b'')
+            for image in page.get_images(full=True):
+                digest.update(_xref_hash(doc, image[0]).encode())
+            for xobject in page.get_xobjects():
+                digest.update(_xref_hash(doc, xobject[0]).encode())
+            hashes[index + 1] = digest.hexdigest()
+
+    return hashes
+
+
+def bitmap_hash(image):
+    """Render edilmiş sayfanın hash'i (PyMuPDF yoksa içerik hash'i yerine kullanılır)"""
+    digest = hashlib.sha256(f"{image.mode}|{image.size}".encode())
+    digest.update(image.tobytes())
+    return digest.hexdigest()
+
+
+class PageCache:
+    """
+    Kalıcı sayfa OCR önbelleği
+
+    Kayıtlar SQLite'ta tutulur; boyut veya kayıt sayısı sınırı aşılınca en
+    uzun süredir kullanılmayan kayıtlar silinir (LRU). Aynı dosya birden çok
+    süreçten (paralel OCR worker'ları) güvenle kullanılabilir.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_mb=DEFAULT_MAX_MB, max_entries=DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS pages ('
+            ' key TEXT PRIMARY KEY, text TEXT NOT NULL, meta TEXT NOT NULL,'
+            ' size INTEGER NOT NULL, created REAL NOT NULL, last_access REAL NOT NULL)'
+        )
+        self._conn.execute('CREATE INDEX IF NOT EXISTS pages_last_access ON pages (last_access)')
+        self._conn.execute('CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL)')
+        self._conn.commit()
+
+    @classmethod
+    def from_env(cls):
+        """Ortam değişkenlerinden önbellek oluştur (OCR_CACHE=0 ise None)"""
+        if os.environ.get('OCR_CACHE', '1') == '0':
+            return None
+        return cls(
+            path=os.environ.get('OCR_CACHE_PATH', DEFAULT_CACHE_PATH),
+            max_mb=float(os.environ.get('OCR_CACHE_MAX_MB', DEFAULT_MAX_MB)),
+            max_entries=int(os.environ.get('OCR_CACHE_MAX_ENTRIES', DEFAULT_MAX_ENTRIES)),
+        )
+
+    @staticmethod
+    def make_key(page_hash, settings):
+        """Sayfa hash'i ve motor ayarlarından önbellek anahtarı"""
+        payload = json.dumps({"v": CACHE_VERSION, "page": page_hash, "settings": settings}, sort_keys=True)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def _bump(self, name, amount=1):
+        self._conn.execute(
+            'INSERT INTO counters (name, value) VALUES (?, ?) '
+            'ON CONFLICT(name) DO UPDATE SET value = value + excluded.value',
+            (name, amount)
+        )
+
+    def get(self, key):
+        """
+        Kaydı getir
+
+        Returns:
+            tuple: (metin, meta sözlüğü) ya da None
+        """
+        with self._lock:
+            row = self._conn.execute('SELECT text, meta FROM pages WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                self._bump('misses')
+            else:
+                self.hits += 1
+                self._bump('hits')
+                self._conn.execute('UPDATE pages SET last_access = ? WHERE key = ?', (time.time(), key))
+            self._conn.commit()
+
+        if row is None:
+            return None
+        return row[0], json.loads(row[1])
+
+    def put(self, key, text, meta=None):
+        """Kaydı ekle/güncelle ve gerekirse tahliye yap"""
+        meta_json = json.dumps(meta or {}, ensure_ascii=False)
+        size = len(text.encode('utf-8')) + len(meta_json.encode('utf-8'))
+        now = time.time()
+
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO pages (key, text, meta, size, created, last_access) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                (key, text, meta_json, size, now, now)
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        """Sınırlar aşıldıysa en eski erişilen kayıtları sil"""
+        count, total = self._conn.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM pages').fetchone()
+        if count <= self.max_entries and total <= self.max_bytes:
+            return
+
+        target_count = int(self.max_entries * EVICTION_TARGET)
+        target_bytes = int(self.max_bytes * EVICTION_TARGET)
+        removed = []
+        for key, size in self._conn.execute('SELECT key, size FROM pages ORDER BY last_access ASC'):
+            if count <= target_count and total <= target_bytes:
+                break
+            removed.append((key,))
+            count -= 1
+            total -= size
+
+        self._conn.executemany('DELETE FROM pages WHERE key = ?', removed)
+        self._bump('evictions', len(removed))
+        self.evictions += len(removed)
+
+    def report(self):
+        """Bu oturumun ve önbelleğin ömür boyu isabet oranı raporu"""
+        with self._lock:
+            count, total = self._conn.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM pages').fetchone()
+            counters = dict(self._conn.execute('SELECT name, value FROM counters').fetchall())
+
+        lookups = self.hits + self.misses
+        lifetime_lookups = counters.get('hits', 0) + counters.get('misses', 0)
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+            "evictions": self.evictions,
+            "entries": count,
+            "size_mb": round(total / (1024 * 1024), 3),
+            "max_mb": round(self.max_bytes / (1024 * 1024), 1),
+            "lifetime_hit_rate": round(counters.get('hits', 0) / lifetime_lookups, 3) if lifetime_lookups else None,
+            "lifetime_evictions": counters.get('evictions', 0),
+        }
+
+    def clear(self):
+        """Tüm kayıtları ve sayaçları sil"""
+        with self._lock:
+            self._conn.execute('DELETE FROM pages')
+            self._conn.execute('DELETE FROM counters')
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def main():
+    """Komut satırı: python page_cache.py [report|clear]"""
+    import io
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+
+    command = sys.argv[1] if len(sys.argv) > 1 else 'report'
+    cache = PageCache.from_env() or PageCache()
+    try:
+        if command == 'clear':
+            cache.clear()
+            print(json.dumps({"success": True, "cleared": True}, ensure_ascii=False))
+        else:
+            print(json.dumps({"success": True, "cache": cache.report()}, ensure_ascii=False))
+    finally:
+        cache.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,604 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Türkçe OCR Son Düzeltme Motoru
+Sözlük tabanlı, kelime sınırına duyarlı, tek geçişli düzeltme
+"""
+
+import os
+import sys
+import json
+import re
+import time
+import hashlib
+import itertools
+import operator
+from collections import Counter
+from functools import lru_cache
+
+# Varsayılan İK sözlüğü (OCR_VOCABULARY ortam değişkeniyle değiştirilebilir)
+DEFAULT_VOCABULARY = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'hr_vocabulary.txt')
+
+# SymSpell varsayılanları
+SYMSPELL_MAX_DISTANCE = 2
+SYMSPELL_MIN_LENGTH = 5
+
+# Türkçe büyük/küçük harf dönüşümü (str.lower 'İ' ve 'I' için yanlış sonuç verir)
+_TR_LOWER = str.maketrans({'İ': 'i', 'I': 'ı'})
+_TR_UPPER = str.maketrans({'i': 'İ', 'ı': 'I'})
+
+# Eşleştirme anahtarı: noktalı/noktasız i ayrımı kaldırılır. OCR büyük harfli metinde
+# 'İ' yerine çoğunlukla 'I' okur ("TANHI"), bu yüzden 'I' hem 'i' hem 'ı' olabilir
+_LOOSE_FOLD = str.maketrans({'İ': 'i', 'I': 'i', 'ı': 'i'})
+
+# Harf duyarsız anahtarlarda bir harfin kabul edilen yazımları (varsayılan: kendisi + büyüğü)
+_CASE_VARIANTS = {'i': 'iIİ', 'ı': 'ıI'}
+
+# Kelime ve kelimeler arası boşluk
+_WORD_RE = re.compile(r'\w+')
+_TOKEN_RE = re.compile(r'(\w+)')
+_GAP_RE = re.compile(r'[ \t]+')
+
+# Bir anahtar için üretilen en fazla büyük harfli yazım (i başına İ/I iki seçenek)
+MAX_UPPER_SPELLINGS = 64
+
+# Bellekte tutulan en fazla SymSpell önerisi (uzun ömürlü süreçlerde sınırsız büyümesin)
+SUGGESTION_CACHE_SIZE = 50000
+
+# Tarih düzeltmeleri (OCR'da 0 rakamı O, 1 rakamı I olarak okunuyor)
+_DATE_RULES = (
+    (re.compile(r'O(\d)'), r'0\1'),  # O2 -> 02
+    (re.compile(r'(\d)O'), r'\g<1>0'),  # 2O -> 20
+    (re.compile(r'(\d{2})\s+O(\d)'), r'\1.0\2'),  # 02 O1 -> 02.01
+    (re.compile(r'(\d{2})\s+(\d{2})\s+(\d{4})'), r'\1.\2.\3'),  # 02 01 2020 -> 02.01.2020
+    (re.compile(r'(\d{2})\s+I(\d)'), r'\1.0\2'),  # 02 I1 -> 02.01
+    (re.compile(r'(\d{2})\s+(\d{2})\s+I(\d{4})'), r'\1.\2.0\3'),  # 02 01 I2020 -> 02.01.02020
+    (re.compile(r'(\d{2})\s+I(\d)\s+(\d{4})'), r'\1.0\2.\3'),  # 02 I1 2020 -> 02.01.2020
+)
+
+# T.C düzeltmeleri (T Ç, T C, T.Ç -> T.C)
+_TC_RE = re.compile(r'T\s*Ç|T\s*C(?!\w)|T\.Ç')
+
+# Geçersiz karakterler ve çoklu boşluk
+_INVALID_RE = re.compile(r'[^\w\sğüşıöçĞÜŞİÖÇ.,!?:;()\-=|/]')
+_SPACES_RE = re.compile(r'\s+')
+
+# Anlamsız kısa token filtreleri
+_SHORT_UPPER_RE = re.compile(r'^[A-Z]{1,2}$')
+_PUNCT_ONLY_RE = re.compile(r'^[.,-]+$')
+_NOISE_TOKENS = frozenset(['KE', 'Te', 'Ke', 'TE', 'ke', 'te'])
+
+# Kelime kalitesi: yalnız harflerden oluşan kelimeler; 4+ ardışık ünsüz ya da
+# aynı harfin üç kez tekrarı Türkçede görülmez
+_LETTERS_RE = re.compile(r'[^\W\d_]+')
+
+# Dosya verilmezse ölçüm bu tipik OCR sayfasının tekrarı üzerinde yapılır
+BENCHMARK_PAGE = (
+    "İzin Tanhi: 02 O1 2020 Adi Soyadi Kadir Yılmaz T C Kimlik Numarasi 123\n"
+    "ORAYI verilen imza ve İşveran onayı. TANHI gorevi Ginş tarth\n"
+    "Belirtigim tarihler arasında izntn verilmesini arz edenm. KE te\n"
+)
+BENCHMARK_PAGES = 2000
+_VOWEL_RE = re.compile(r'[aeıioöuüâîû]')
+_CONSONANT_RUN_RE = re.compile(r'[^aeıioöuüâîû]{4,}|(.)\1\1')
+
+
+def tr_lower(text):
+    """Türkçe kurallarıyla küçük harfe çevir"""
+    return text.translate(_TR_LOWER).lower()
+
+
+def tr_upper(text):
+    """Türkçe kurallarıyla büyük harfe çevir"""
+    return text.translate(_TR_UPPER).upper()
+
+
+def loose_fold(text):
+    """Eşleştirme için katla: küçük harf, i/ı/I/İ ayrımı yok (uzunluk korunur)"""
+    return text.translate(_LOOSE_FOLD).lower()
+
+
+def _case_variants(ch):
+    """Harf duyarsız anahtardaki bir harfin metinde kabul edilen yazımları"""
+    if ch in _CASE_VARIANTS:
+        return _CASE_VARIANTS[ch]
+    upper = tr_upper(ch)
+    return ch + upper if len(upper) == 1 and upper != ch else ch
+
+
+def _spellings(key, right):
+    """
+    Harf duyarsız anahtarın metindeki yazımları ve her birinin düzeltmesi
+
+    Küçük harf, baş harfi büyük ve tümü büyük yazımlar üretilir; büyük harfli
+    yazımlarda 'i' hem 'İ' hem 'I' olabilir ("TANHI" -> "TARİHİ").
+
+    Returns:
+        dict: {yazım: düzeltme}
+    """
+    uppers = [_case_variants(ch)[1:] or ch for ch in key]
+    spellings = {key: right}
+    for first in uppers[0]:
+        spellings.setdefault(first + key[1:], _apply_case('Aa', right))
+    if len(key) > 1:
+        combinations = 1
+        for options in uppers:
+            combinations *= len(options)
+        upper_forms = ([''.join(chars) for chars in itertools.product(*uppers)]
+                       if combinations <= MAX_UPPER_SPELLINGS else [tr_upper(key), key.upper()])
+        for form in upper_forms:
+            spellings.setdefault(form, tr_upper(right))
+    return spellings
+
+
+def _case_compatible(source, key):
+    """Metindeki kelime, harf duyarsız anahtarın bir yazımı mı (ör. "TANHI" ~ "tanhi", "ADI" ~ "adı")"""
+    if len(source) != len(key):
+        return False
+    return all(s in _case_variants(k) for s, k in zip(source, key))
+
+
+def _apply_case(source, replacement):
+    """Kaynak kelimenin büyük/küçük harf biçimini düzeltmeye aktar"""
+    if len(source) > 1 and source.isupper():
+        return tr_upper(replacement)
+    if source[:1].isupper():
+        return tr_upper(replacement[:1]) + replacement[1:]
+    return replacement
+
+
+def _apply_phrase_case(source, replacement):
+    """Çok kelimeli eşleşmede her kelimenin biçimini düzeltmenin karşılık gelen kelimesine aktar"""
+    source_words = source.split()
+    right_words = replacement.split(' ')
+    if len(source_words) != len(right_words):
+        return _apply_case(source, replacement)
+    return ' '.join(map(_apply_case, source_words, right_words))
+
+
+def damerau_distance(a, b, max_distance):
+    """
+    Sınırlı Damerau-Levenshtein (bitişik harf yer değiştirme dahil) mesafesi
+
+    Returns:
+        int: Mesafe; max_distance aşılırsa max_distance + 1
+    """
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+
+    prev_prev = None
+    prev = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(prev[j] + 1, current[j - 1] + 1, prev[j - 1] + cost)
+            if (prev_prev is not None and i > 1 and j > 1
+                    and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]):
+                current[j] = min(current[j], prev_prev[j - 2] + 1)
+        if min(current) > max_distance:
+            return max_distance + 1
+        prev_prev, prev = prev, current
+
+    return prev[-1]
+
+
+def _deletes(word, max_distance):
+    """SymSpell: kelimeden en fazla max_distance harf silinerek elde edilen varyantlar"""
+    results = {word}
+    frontier = {word}
+    for _ in range(max_distance):
+        next_frontier = set()
+        for item in frontier:
+            if len(item) <= 1:
+                continue
+            for i in range(len(item)):
+                next_frontier.add(item[:i] + item[i + 1:])
+        next_frontier -= results
+        results |= next_frontier
+        frontier = next_frontier
+    return results
+
+
+def parse_vocabulary(lines):
+    """
+    Sözlük satırlarını ayrıştır
+
+    Returns:
+        tuple: (düzeltmeler {anahtar: doğru}, kelime frekansları {kelime: frekans})
+    """
+    fixes = {}
+    lexicon = {}
+    for raw in lines:
+        line = raw.strip()
+        if not line or line.startswith('#'):
+            continue
+        if '=>' in line:
+            wrong, right = (part.strip() for part in line.split('=>', 1))
+            if wrong and right:
+                fixes[wrong] = right
+            continue
+        parts = line.split()
+        frequency = int(parts[1]) if len(parts) > 1 and parts[1].isdigit() else 1
+        word = tr_lower(parts[0])
+        lexicon[word] = lexicon.get(word, 0) + frequency
+    return fixes, lexicon
+
+
+def _char_pattern(ch, case_sensitive):
+    """Trie karakteri için regex parçası (büyük/küçük harf duyarsızsa tüm yazımları kabul eder)"""
+    if ch == ' ':
+        return r'[ \t]+'
+    variants = ch if case_sensitive else _case_variants(ch)
+    if len(variants) == 1:
+        return re.escape(ch)
+    return '[' + ''.join(re.escape(v) for v in variants) + ']'
+
+
+def _trie_regex(node):
+    """Karakter trie'sini ortak önekleri paylaşan tek bir regex'e derle"""
+    branches = [fragment + _trie_regex(child) for fragment, child in node.items() if fragment is not None]
+    if None in node:
+        # Kelime sonu: daha uzun dallar önce denenir, eşleşme kelime sınırında biter
+        branches.append(r'(?!\w)')
+    if len(branches) == 1:
+        return branches[0]
+    return '(?:' + '|'.join(branches) + ')'
+
+
+class TurkishCorrector:
+    """
+    Türkçe OCR düzeltici
+
+    Her düzeltme anahtarının metinde görülebilecek yazımları (küçük, baş
+    harfi büyük, tümü büyük) yükleme sırasında tek bir sözlükte toplanır.
+    Metin bir kez kelimelere bölünür; metinde geçen kelimelerle bu sözlüğün
+    kesişimi boşsa metne dokunulmaz, değilse kelimeler C tarafında tek bir
+    map geçişiyle değiştirilir - kelime başına Python kodu çalışmaz. Eşleşme
+    tam kelime üzerinden yapıldığı için uzun kelimelerin içindeki parçalar
+    (ör. "Kadir" içindeki "adi") bozulmaz. Çok kelimeli anahtarlar ortak
+    önekleri paylaşan bir trie regex'ine derlenir ve tek kelimelik
+    düzeltmelerden sonra, yalnızca ilk kelimeleri metinde geçiyorsa çalıştırılır;
+    böylece tek başına belirsiz kelimeler ("Adi") yalnızca form etiketi
+    içinde ("Adi Soyadi") düzeltilir. İsteğe bağlı SymSpell araması sözlükte
+    olmayan kelimeleri en yakın sözlük kelimesine çevirir.
+    """
+
+    def __init__(self, fixes=None, lexicon=None, symspell=False,
+                 max_distance=SYMSPELL_MAX_DISTANCE, min_length=SYMSPELL_MIN_LENGTH):
+        self.lexicon = dict(lexicon or {})
+        self.symspell = symspell
+        self.max_distance = max_distance
+        self.min_length = min_length
+
+        # Büyük harf içeren anahtarlar birebir, diğerleri harf duyarsız eşleşir
+        self.exact_fixes = {}
+        self.folded_fixes = {}
+        # Tek kelimelik anahtarların metindeki yazımı -> düzeltme
+        self._word_fixes = {}
+        # Çok kelimeli anahtarlar tek kelimelik düzeltmelerden sonra uygulanır
+        phrases = []
+        for wrong, right in (fixes or {}).items():
+            key = ' '.join(_WORD_RE.findall(wrong))
+            if not key:
+                continue
+            case_sensitive = any(ch.isupper() for ch in key)
+            if case_sensitive:
+                self.exact_fixes[key] = right
+            else:
+                self.folded_fixes[key] = right
+
+            if ' ' in key:
+                phrases.append((key, right, case_sensitive))
+            elif not case_sensitive:
+                for spelling, fix in _spellings(key, right).items():
+                    self._word_fixes.setdefault(spelling, fix)
+
+            # Düzeltmelerin hedefleri de bilinen kelimelerdir
+            for word in _WORD_RE.findall(right):
+                self.lexicon.setdefault(tr_lower(word), 1)
+
+        # Birebir yazım kuralları harf duyarsız yazımlara göre önceliklidir
+        self._word_fixes.update((key, right) for key, right in self.exact_fixes.items() if ' ' not in key)
+
+        # Çok kelimeli anahtarlar, kelimeleri tek kelimelik kurallardan geçmiş
+        # haliyle aranır ("adi soyadi" metinde "Adi Soyadı" olarak bulunur);
+        # böylece metin tek kez kelimelere bölünür
+        self._phrase_heads = set()
+        self._exact_phrases = {}
+        self._phrase_fixes = {}
+        trie = {}
+        for key, right, case_sensitive in phrases:
+            key = ' '.join(self._word_fixes.get(word, word) for word in key.split(' '))
+            self._phrase_heads.add(loose_fold(key.split(' ', 1)[0]))
+            if case_sensitive:
+                self._exact_phrases[key] = right
+            else:
+                self._phrase_fixes.setdefault(loose_fold(key), []).append((key, right))
+            node = trie
+            for ch in key:
+                node = node.setdefault(_char_pattern(ch, case_sensitive), {})
+            node[None] = {}
+        self.phrase_pattern = re.compile(r'(?<!\w)' + _trie_regex(trie)) if trie else None
+        self.deletes = self._build_deletes() if symspell else {}
+        self._suggestions = {}
+
+        # Düzeltme sonucunu etkileyen her şeyin özeti (OCR önbellek anahtarında kullanılır)
+        self.signature = hashlib.sha256(json.dumps(
+            [fixes or {}, self.lexicon, symspell, max_distance, min_length], sort_keys=True
+        ).encode('utf-8')).hexdigest()[:16]
+
+    @classmethod
+    def from_file(cls, path=None, symspell=None):
+        """Sözlük dosyasından düzeltici oluştur (ortam değişkenleri varsayılanları belirler)"""
+        path = path or os.environ.get('OCR_VOCABULARY') or DEFAULT_VOCABULARY
+        if symspell is None:
+            symspell = os.environ.get('OCR_SYMSPELL', '0') == '1'
+        mtime = os.path.getmtime(path) if os.path.exists(path) else None
+        return _load_corrector(path, mtime, symspell)
+
+    def _build_deletes(self):
+        """SymSpell silme indeksini oluştur"""
+        index = {}
+        for word in self.lexicon:
+            if len(word) < self.min_length - self.max_distance:
+                continue
+            for variant in _deletes(word, self.max_distance):
+                index.setdefault(variant, []).append(word)
+        return index
+
+    def _replacement(self, source):
+        """
+        Çok kelimeli eşleşmenin düzeltmesi
+
+        Birebir yazım kuralı önceliklidir; harf duyarsız kurallarda kaynağın
+        büyük/küçük harf biçimi kelime kelime düzeltmeye aktarılır
+        ("Adi Soyadi" -> "Adı Soyadı").
+
+        Returns:
+            str: Düzeltme ya da eşleşen kural yoksa None
+        """
+        key = _GAP_RE.sub(' ', source)
+        if key in self._exact_phrases:
+            return self._exact_phrases[key]
+        for candidate, right in self._phrase_fixes.get(loose_fold(key), ()):
+            if _case_compatible(key, candidate):
+                return _apply_phrase_case(key, right)
+        return None
+
+    def suggest(self, word):
+        """
+        SymSpell ile bilinmeyen kelime için en yakın sözlük kelimesini bul
+
+        Returns:
+            str: Öneri ya da None
+        """
+        if word in self._suggestions:
+            return self._suggestions[word]
+
+        folded = tr_lower(word)
+        best = None
+        if folded not in self.lexicon:
+            candidates = set()
+            for variant in _deletes(folded, self.max_distance):
+                candidates.update(self.deletes.get(variant, ()))
+
+            for candidate in candidates:
+                distance = damerau_distance(folded, candidate, self.max_distance)
+                if distance > self.max_distance:
+                    continue
+                rank = (distance, -self.lexicon[candidate])
+                if best is None or rank < best[0]:
+                    best = (rank, candidate)
+
+        suggestion = _apply_case(word, best[1]) if best else None
+        if len(self._suggestions) >= SUGGESTION_CACHE_SIZE:
+            self._suggestions.clear()
+        self._suggestions[word] = suggestion
+        return suggestion
+
+    def correct_words(self, text):
+        """
+        Sözlük düzeltmelerini (ve açıksa SymSpell önerilerini) tek geçişte uygula
+
+        Returns:
+            tuple: (düzeltilmiş metin, istatistikler)
+        """
+        stats = {"dictionary_fixes": 0, "symspell_fixes": 0}
+        if not text:
+            return text, stats
+
+        tokens = _TOKEN_RE.split(text)
+        words = set(tokens[1::2])
+
+        # Tek kelimelik kurallar ve SymSpell önerileri tek bir yazım -> düzeltme tablosunda
+        replacements = {word: self._word_fixes[word] for word in words.intersection(self._word_fixes)}
+        suggested = {}
+        if self.symspell:
+            for word in words.difference(replacements):
+                if len(word) < self.min_length or word.isupper() or not word.isalpha():
+                    continue
+                suggestion = self.suggest(word)
+                if suggestion is not None:
+                    suggested[word] = suggestion
+            replacements.update(suggested)
+
+        if replacements:
+            sequence = tokens[1::2]
+            corrected = list(map(replacements.get, sequence, sequence))
+            # Değişmeyen kelimeler aynı nesnedir; sayım C tarafında yapılır
+            fixes = len(sequence) - sum(map(operator.is_, corrected, sequence))
+            if suggested:
+                stats["symspell_fixes"] = sum(Counter(filter(suggested.__contains__, sequence)).values())
+            stats["dictionary_fixes"] += fixes - stats["symspell_fixes"]
+
+            tokens[1::2] = corrected
+            text = ''.join(tokens)
+            words.update(replacements.values())
+
+        # Çok kelimeli kurallar: yalnızca ilk kelimelerden biri metinde geçiyorsa
+        if self.phrase_pattern is not None and not self._phrase_heads.isdisjoint(map(loose_fold, words)):
+            def _phrase(match):
+                right = self._replacement(match.group())
+                if right is None:
+                    return match.group()
+                stats["dictionary_fixes"] += 1
+                return right
+
+            text = self.phrase_pattern.sub(_phrase, text)
+
+        return text, stats
+
+    def word_quality(self, text, min_length=3):
+        """
+        Metindeki kelimelerin sözlük isabet oranı (OCR yönlendirme sinyali)
+
+        Sözlükteki kelimeler isabettir. İK sözlüğü genel metni kapsamadığı için
+        sözlükte olmayan ama Türkçe kelime biçimine uyan kelimeler (sesli harf
+        içeren, 4+ ardışık ünsüz ya da üçlü harf tekrarı içermeyen, harf biçimi
+        tutarlı) de isabet sayılır; OCR çöpü ("lJrnlş", "ıııı", "HeLLo") bu
+        denetimden geçemez. Sayılar hesaba katılmaz.
+
+        Returns:
+            dict: words, dictionary_hits, well_formed, hit_rate (kelime yoksa None)
+        """
+        words = dictionary_hits = well_formed = 0
+        for match in _WORD_RE.finditer(text or ''):
+            word = match.group()
+            if len(word) < min_length or word.isdigit():
+                continue
+            words += 1
+            folded = tr_lower(word)
+            if folded in self.lexicon:
+                dictionary_hits += 1
+            elif (_LETTERS_RE.fullmatch(word)
+                  and (word.islower() or word.isupper() or word.istitle())
+                  and _VOWEL_RE.search(folded)
+                  and not _CONSONANT_RUN_RE.search(folded)):
+                well_formed += 1
+
+        return {
+            "words": words,
+            "dictionary_hits": dictionary_hits,
+            "well_formed": well_formed,
+            "hit_rate": round((dictionary_hits + well_formed) / words, 3) if words else None,
+        }
+
+    def clean(self, text):
+        """OCR metnini düzelt ve temizle (SmartOCR.clean_text ile aynı çıktı biçimi)"""
+        if not text:
+            return ""
+
+        text, _ = self.correct_words(text)
+
+        for pattern, replacement in _DATE_RULES:
+            text = pattern.sub(replacement, text)
+
+        text = _TC_RE.sub('T.C', text)
+        text = _INVALID_RE.sub(' ', text)
+        text = _SPACES_RE.sub(' ', text)
+
+        # Form düzeltmeleri
+        text = text.replace('T C', 'T.C.')
+        text = text.replace('TC', 'T.C.')
+
+        # Anlamsız tekrarları filtrele
+        words = []
+        for word in text.split():
+            word = word.strip('.,!?:;()-')
+            if (len(word) >= 2 and
+                    not _SHORT_UPPER_RE.match(word) and
+                    not _PUNCT_ONLY_RE.match(word) and
+                    word not in _NOISE_TOKENS):
+                words.append(word)
+
+        return ' '.join(words).strip()
+
+
+@lru_cache(maxsize=4)
+def _load_corrector(path, mtime, symspell):
+    """Sözlük dosyasını yükle (yol + değişiklik zamanına göre önbellekli)"""
+    if mtime is None:
+        return TurkishCorrector(symspell=symspell)
+    with open(path, encoding='utf-8') as f:
+        fixes, lexicon = parse_vocabulary(f)
+    return TurkishCorrector(fixes, lexicon, symspell=symspell)
+
+
+def legacy_replace(text, fixes):
+    """Eski yöntem: düzeltme başına tam metin taraması, alt dizgi eşleşmesi (karşılaştırma için)"""
+    for old, new in fixes.items():
+        text = text.replace(old, new)
+    return text
+
+
+def benchmark(text, corrector, repeats=5):
+    """
+    Düzeltici verimini ölç (çok sayfalı OCR çıktısı üzerinde)
+
+    Returns:
+        dict: Yöntem başına ortalama süre ve MB/s
+    """
+    size_mb = len(text.encode('utf-8')) / (1024 * 1024)
+
+    # Eski sözlük gibi küçük ve baş harfi büyük yazımları ayrı girdiler olarak tut
+    legacy_fixes = {}
+    for key, right in corrector.exact_fixes.items():
+        legacy_fixes[key] = right
+    for key, right in corrector.folded_fixes.items():
+        legacy_fixes[key] = right
+        legacy_fixes[_apply_case('Aa', key)] = _apply_case('Aa', right)
+
+    methods = {
+        "legacy_replace": lambda: legacy_replace(text, legacy_fixes),
+        "corrector": lambda: corrector.correct_words(text),
+        "clean": lambda: corrector.clean(text),
+    }
+    if not corrector.symspell:
+        symspell = TurkishCorrector(
+            dict(corrector.exact_fixes, **corrector.folded_fixes), corrector.lexicon, symspell=True
+        )
+        # Öneri önbelleği her ölçümde boşaltılır (soğuk başlangıç)
+        methods["corrector_symspell"] = lambda: (symspell._suggestions.clear(), symspell.correct_words(text))
+
+    report = {"chars": len(text), "size_mb": round(size_mb, 3), "fixes": len(legacy_fixes)}
+    for name, method in methods.items():
+        method()
+        start = time.time()
+        for _ in range(repeats):
+            method()
+        elapsed = (time.time() - start) / repeats
+        report[name] = {
+            "mean_ms": round(elapsed * 1000, 2),
+            "mb_per_sec": round(size_mb / elapsed, 2) if elapsed else None,
+        }
+
+    return report
+
+
+def main():
+    """Komut satırı: python turkish_corrector.py [--benchmark] [metin dosyası]"""
+    import io
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+
+    args = [arg for arg in sys.argv[1:] if arg != '--benchmark']
+    if args:
+        with open(args[0], encoding='utf-8') as f:
+            text = f.read()
+    elif '--benchmark' in sys.argv:
+        text = BENCHMARK_PAGE * BENCHMARK_PAGES
+    else:
+        print(json.dumps({"success": False, "error": "Metin dosyası gerekli"}, ensure_ascii=False))
+        return
+
+    corrector = TurkishCorrector.from_file()
+    if '--benchmark' in sys.argv:
+        print(json.dumps({"success": True, "benchmark": benchmark(text, corrector)}, ensure_ascii=False))
+        return
+
+    _, stats = corrector.correct_words(text)
+    print(json.dumps({"success": True, "text": corrector.clean(text), "stats": stats}, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -7,6 +7,9 @@ const { encoding_for_model } = require('tiktoken');
 const config = require('../config');
 // OCR import'ları - Sadece Qwen2.5-VL OCR
 const LocalQwenVL = require('./localQwenVL'); // Ana ve tek OCR sistemi
+const OCRCache = require('./ocrCache');
+const PdfService = require('./pdfService');
+const { Tracer } = require('./tracing');
 
 class TextProcessor {
   constructor() {
@@ -24,6 +27,13 @@ class TextProcessor {
       if (config.ocr.qwenVL.maxRetries !== undefined) {
         this.localQwenVL.maxRetries = config.ocr.qwenVL.maxRetries;
       }
+      // Değişmeyen sayfaların yeniden OCR'lanmaması için kalıcı önbellek
+      if (config.ocr.qwenVL.cache?.enabled) {
+        this.localQwenVL.cache = new OCRCache(config.ocr.qwenVL.cache);
+      }
+      // Sayfa -> OCR isteği -> api.py aşamaları tek trace altında (OCR_TRACE_FILE)
+      this.tracer = new Tracer({ service: 'textProcessor', ...config.ocr.tracing });
+      this.localQwenVL.tracer = this.tracer;
       
       console.log(`[TextProcessor] Qwen2.5-VL OCR API bağlantısı hazır (timeout: ${this.localQwenVL.timeout || 'sınırsız'})`);
       
@@ -34,7 +44,9 @@ class TextProcessor {
       console.log('[TextProcessor] Qwen2.5-VL OCR devre dışı');
     }
 
-    
+    // PDF sayfa metni / resim tespiti / render için tek kalıcı Python süreci
+    this.pdfService = new PdfService(config.ocr?.pdfService || {});
+
     try {
       this.encoder = encoding_for_model('gpt-3.5-turbo');
     } catch (error) {
@@ -245,81 +257,14 @@ class TextProcessor {
   }
 
   /**
-   * PDF'in ilk sayfasını image'a çevir (Python ile)
+   * PDF sayfasını image'a çevir (kalıcı PDF servisi ile, varsayılan tmpfs'e)
    */
   async convertPdfToImage(pdfPath, pageNumber = 1) {
     try {
-      const { spawn } = require('child_process');
-      const tempDir = path.join(__dirname, '..', 'temp');
-      
-      // Temp dizin yoksa oluştur
-      if (!fs.existsSync(tempDir)) {
-        fs.mkdirSync(tempDir, { recursive: true });
-      }
-      
-      const outputPath = path.join(tempDir, `temp_page${pageNumber}_${Date.now()}.png`);
-      
-      // Python ile PDF'i image'a çevir
-      const pythonScript = `
-# -*- coding: utf-8 -*-
-import sys
-from pdf2image import convert_from_path
-import os
-import io
-
-# UTF-8 encoding için
-sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
-
-pdf_path = sys.argv[1]
-output_path = sys.argv[2]
-page_num = int(sys.argv[3]) if len(sys.argv) > 3 else 1
-
-try:
-    # Belirtilen sayfayı PNG'ye çevir
-    images = convert_from_path(pdf_path, first_page=page_num, last_page=page_num, dpi=300)
-    if images:
-        images[0].save(output_path, 'PNG')
-        print(output_path)
-    else:
-        print("ERROR: No images converted")
-except Exception as e:
-    print(f"ERROR: {str(e)}")
-`;
-      
-      const tempScriptPath = path.join(tempDir, `convert_${Date.now()}.py`);
-      fs.writeFileSync(tempScriptPath, pythonScript, 'utf8');
-      
-      return new Promise((resolve) => {
-        const python = spawn('python', [tempScriptPath, pdfPath, outputPath, pageNumber.toString()], {
-          env: { ...process.env, PYTHONIOENCODING: 'utf-8' },
-          stdio: ['pipe', 'pipe', 'pipe']
-        });
-        let output = '';
-        
-        python.stdout.on('data', (data) => {
-          output += data.toString('utf8');
-        });
-        
-        python.on('close', (code) => {
-          // Geçici script dosyasını temizle
-          if (fs.existsSync(tempScriptPath)) {
-            fs.unlinkSync(tempScriptPath);
-          }
-          
-          if (code === 0 && output.trim() && !output.includes('ERROR')) {
-            const imagePath = output.trim();
-            if (fs.existsSync(imagePath)) {
-              resolve(imagePath);
-            } else {
-              resolve(null);
-            }
-          } else {
-            console.error('[PDF to Image] Python hatası:', output);
-            resolve(null);
-          }
-        });
+      const result = await this.pdfService.renderPage(pdfPath, pageNumber, {
+        dpi: config.ocr?.pdfService?.renderDpi || 300
       });
-      
+      return result.path && fs.existsSync(result.path) ? result.path : null;
     } catch (error) {
       console.error('[PDF to Image] Hata:', error.message);
       return null;
@@ -385,193 +330,31 @@ except Exception as e:
   }
 
   /**
-   * PDF'i sayfa bazında metne böl
+   * PDF'i tek geçişte incele: sayfa sayısı, sayfa metinleri ve resim içeren sayfalar
    */
-  async extractPageTexts(pdfPath) {
+  async inspectPdf(pdfPath) {
     try {
-      const { spawn } = require('child_process');
-      const tempDir = path.join(__dirname, '..', 'temp');
-      
-      if (!fs.existsSync(tempDir)) {
-        fs.mkdirSync(tempDir, { recursive: true });
-      }
-      
-      // Python ile PDF'deki her sayfanın metnini ayrı ayrı çıkar
-      const pythonScript = `
-# -*- coding: utf-8 -*-
-import sys
-import fitz  # PyMuPDF
-import json
-import io
-
-# UTF-8 encoding için
-sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
-
-pdf_path = sys.argv[1]
-
-try:
-    doc = fitz.open(pdf_path)
-    page_texts = {}
-    
-    for page_num in range(len(doc)):
-        page = doc[page_num]
-        text = page.get_text().strip()
-        # Boş veya çok kısa metinleri filtrele
-        if len(text) > 5:
-            page_texts[str(page_num + 1)] = text  # 1-based sayfa numarası
-        else:
-            page_texts[str(page_num + 1)] = ""
-    
-    doc.close()
-    print(json.dumps(page_texts, ensure_ascii=False, indent=None))
-        
-except Exception as e:
-    print(f"ERROR: {str(e)}")
-`;
-      
-      const tempScriptPath = path.join(tempDir, `extract_pages_${Date.now()}.py`);
-      fs.writeFileSync(tempScriptPath, pythonScript, 'utf8');
-      
-      return new Promise((resolve) => {
-        const python = spawn('python', [tempScriptPath, pdfPath], {
-          env: { ...process.env, PYTHONIOENCODING: 'utf-8' },
-          stdio: ['pipe', 'pipe', 'pipe']
-        });
-        let output = '';
-        
-        python.stdout.on('data', (data) => {
-          output += data.toString('utf8');
-        });
-        
-        python.on('close', (code) => {
-          // Geçici script dosyasını temizle
-          if (fs.existsSync(tempScriptPath)) {
-            fs.unlinkSync(tempScriptPath);
-          }
-          
-          const outputStr = output.trim();
-          
-          if (!outputStr.startsWith('ERROR:')) {
-            try {
-              const pageTexts = JSON.parse(outputStr);
-              resolve(pageTexts);
-            } catch (e) {
-              console.error('[PDF Page Extract] JSON parse hatası:', e.message);
-              resolve({});
-            }
-          } else {
-            console.error('[PDF Page Extract] Python hatası:', outputStr);
-            resolve({});
-          }
-        });
-      });
-      
+      return await this.pdfService.inspect(pdfPath);
     } catch (error) {
-      console.error('[PDF Page Extract] Hata:', error.message);
-      return {};
+      console.error('[PDF Inspect] Hata:', error.message);
+      return null;
     }
   }
 
+  /**
+   * PDF'i sayfa bazında metne böl
+   */
+  async extractPageTexts(pdfPath) {
+    const inspection = await this.inspectPdf(pdfPath);
+    return inspection ? inspection.texts : {};
+  }
+
   /**
    * PDF'deki tüm sayfaları kontrol et ve resim içeren sayfaları tespit et
    */
   async detectPagesWithImages(pdfPath) {
-    try {
-      const { spawn } = require('child_process');
-      const tempDir = path.join(__dirname, '..', 'temp');
-      
-      if (!fs.existsSync(tempDir)) {
-        fs.mkdirSync(tempDir, { recursive: true });
-      }
-      
-      // Python ile PDF'deki resimleri tespit et
-      const pythonScript = `
-# -*- coding: utf-8 -*-
-import sys
-from pdf2image import convert_from_path
-import fitz  # PyMuPDF
-import os
-import io
-
-# UTF-8 encoding için
-sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
-
-pdf_path = sys.argv[1]
-
-try:
-    # PDF'i aç
-    doc = fitz.open(pdf_path)
-    pages_with_images = []
-    
-    for page_num in range(len(doc)):
-        page = doc[page_num]
-        image_list = page.get_images()
-        text_length = len(page.get_text().strip())
-        
-        # Sayfa resim içeriyorsa veya çok az metin içeriyorsa OCR gerekli
-        if len(image_list) > 0 or text_length < 50:
-            pages_with_images.append(page_num + 1)  # 1-based sayfa numarası
-    
-    doc.close()
-    
-    if pages_with_images:
-        print("PAGES_WITH_IMAGES:" + ",".join(map(str, pages_with_images)))
-    else:
-        print("NO_IMAGES_FOUND")
-        
-except Exception as e:
-    # Fallback: pdf2image ile kontrol et
-    try:
-        images = convert_from_path(pdf_path, dpi=150)
-        total_pages = len(images)
-        print(f"FALLBACK_ALL_PAGES:1-{total_pages}")
-    except Exception as e2:
-        print(f"ERROR: {str(e2)}")
-`;
-      
-      const tempScriptPath = path.join(tempDir, `detect_images_${Date.now()}.py`);
-      fs.writeFileSync(tempScriptPath, pythonScript, 'utf8');
-      
-      return new Promise((resolve) => {
-        const python = spawn('python', [tempScriptPath, pdfPath], {
-          env: { ...process.env, PYTHONIOENCODING: 'utf-8' },
-          stdio: ['pipe', 'pipe', 'pipe']
-        });
-        let output = '';
-        
-        python.stdout.on('data', (data) => {
-          output += data.toString('utf8');
-        });
-        
-        python.on('close', (code) => {
-          // Geçici script dosyasını temizle
-          if (fs.existsSync(tempScriptPath)) {
-            fs.unlinkSync(tempScriptPath);
-          }
-          
-          const outputStr = output.trim();
-          
-          if (outputStr.startsWith('PAGES_WITH_IMAGES:')) {
-            const pageNumbers = outputStr.replace('PAGES_WITH_IMAGES:', '').split(',').map(num => parseInt(num));
-            resolve(pageNumbers);
-          } else if (outputStr.startsWith('FALLBACK_ALL_PAGES:')) {
-            const range = outputStr.replace('FALLBACK_ALL_PAGES:', '');
-            const [start, end] = range.split('-').map(num => parseInt(num));
-            const allPages = Array.from({length: end - start + 1}, (_, i) => start + i);
-            resolve(allPages);
-          } else if (outputStr === 'NO_IMAGES_FOUND') {
-            resolve([]);
-          } else {
-            console.error('[PDF Image Detection] Python hatası:', outputStr);
-            resolve([]);
-          }
-        });
-      });
-      
-    } catch (error) {
-      console.error('[PDF Image Detection] Hata:', error.message);
-      return [];
-    }
+    const inspection = await this.inspectPdf(pdfPath);
+    return inspection ? inspection.imagePages : [];
   }
 
   /**
@@ -593,17 +376,25 @@ except Exception as e:
         });
       }
       case 'pdf': {
-        const dataBuffer = fs.readFileSync(filePath);
-        const pdfData = await pdfParse(dataBuffer);
-        
-        console.log(`[PDF] ${path.basename(filePath)} - ${pdfData.numpages} sayfa başlatılıyor`);
+        // İsabet oranı bu belge için raporlanır (süreç genelindeki sayaçlardan fark)
+        const cacheStart = this.localQwenVL?.cache?.snapshot();
+
+        // 1-2. Sayfa sayısı, resim içeren sayfalar ve sayfa metinleri tek geçişte
+        const inspection = await this.inspectPdf(filePath);
+        let pdfData, pagesWithImages, pageTexts;
+        if (inspection) {
+          pdfData = { numpages: inspection.pageCount };
+          pagesWithImages = inspection.imagePages;
+          pageTexts = inspection.texts;
+        } else {
+          // PDF servisi kullanılamıyorsa sayfa sayısı pdf-parse'tan, tüm sayfalar OCR'a
+          pdfData = await pdfParse(fs.readFileSync(filePath));
+          pagesWithImages = Array.from({ length: pdfData.numpages }, (_, i) => i + 1);
+          pageTexts = {};
+        }
 
-        // 1. Resim içeren sayfaları tespit et
-        const pagesWithImages = await this.detectPagesWithImages(filePath);
+        console.log(`[PDF] ${path.basename(filePath)} - ${pdfData.numpages} sayfa başlatılıyor`);
         console.log(`[PDF] Resim içeren sayfalar: ${pagesWithImages.length > 0 ? pagesWithImages.join(', ') : 'yok'}`);
-
-        // 2. Sayfa bazında metinleri çıkar
-        const pageTexts = await this.extractPageTexts(filePath);
         console.log(`[PDF] ${Object.keys(pageTexts).length} sayfa metni çıkarıldı`);
 
         let allContent = [];
@@ -614,6 +405,9 @@ except Exception as e:
           
           if (isImagePage && this.localQwenVL && config.ocr?.qwenVL?.enabled) {
             // Resim içeren sayfa: Hibrit işleme (PDF Text + Text OCR + Table OCR)
+            const pageSpan = this.tracer.startSpan('pdf.page', {
+              attributes: { file: path.basename(filePath), page: pageNum }
+            });
             try {
               console.log(`[PDF] Sayfa ${pageNum}: Hibrit işleme başlatılıyor...`);
               
@@ -631,13 +425,15 @@ except Exception as e:
               }
 
               // 2. OCR işlemleri
+              const renderSpan = pageSpan.child('pdf.render');
               const imagePath = await this.convertPdfToImage(filePath, pageNum);
+              renderSpan.setAttributes({ rendered: Boolean(imagePath) }).end();
               if (imagePath) {
                 console.log(`[PDF] Sayfa ${pageNum}: OCR işlemleri başlatılıyor...`);
                 
                 // 2a. Text OCR (paragraflar, normal metinler için)
                 try {
-                  const textOcrResult = await this.localQwenVL.extractFromImage(imagePath, 'text');
+                  const textOcrResult = await this.localQwenVL.extractFromImage(imagePath, 'text', null, { parent: pageSpan });
                   if (textOcrResult.success && textOcrResult.text && textOcrResult.text.length > 20) {
                     sources.push({
                       content: textOcrResult.text.trim(),
@@ -654,7 +450,7 @@ except Exception as e:
 
                 // 2b. Table OCR (tablolar, formlar için)
                 try {
-                  const tableOcrResult = await this.localQwenVL.extractFromImage(imagePath, 'table');
+                  const tableOcrResult = await this.localQwenVL.extractFromImage(imagePath, 'table', null, { parent: pageSpan });
                   if (tableOcrResult.success && tableOcrResult.text && tableOcrResult.text.length > 20) {
                     sources.push({
                       content: tableOcrResult.text.trim(),
@@ -701,9 +497,11 @@ except Exception as e:
               }
 
               console.log(`[PDF] ✅ Sayfa ${pageNum}: ${pageChunkCount} chunk (${uniqueSources.length} benzersiz kaynak)`);
+              pageSpan.setAttributes({ sources: uniqueSources.length, chunks: pageChunkCount }).end();
 
             } catch (e) {
               console.error(`[PDF] Sayfa ${pageNum} hibrit işleme hatası:`, e.message);
+              pageSpan.end(e);
               
               // Hata durumunda normal metni kullan
               const pageText = pageTexts[pageNum.toString()];
@@ -755,6 +553,10 @@ except Exception as e:
         console.log(`  - Table OCR chunk: ${tableOcrChunks.length}`);
         console.log(`  - Resim sayfaları: ${pagesWithImages.join(', ')}`);
         console.log(`  - İşlenen sayfalar: 1-${pdfData.numpages}`);
+        if (this.localQwenVL?.cache) {
+          const cacheReport = this.localQwenVL.cache.report(cacheStart);
+          console.log(`  - OCR önbelleği (bu belge): ${cacheReport.hits} isabet / ${cacheReport.misses} ıska (oran: ${cacheReport.hitRate ?? '-'}, toplam ${cacheReport.entries} kayıt, ${cacheReport.sizeMb} MB)`);
+        }
 
         return allContent.length > 0 ? allContent : [{
           content: 'PDF işlenemedi',
@@ -0,0 +1,125 @@
+const crypto = require('crypto');
+const fs = require('fs');
+const path = require('path');
+
+const REQUEST_ID_HEADER = 'X-Request-ID';
+
+/**
+ * Süreçler arası istek izleme (tracing.py'nin Node karşılığı)
+ * W3C traceparent başlığı ile trace bağlamı api.py'ye taşınır; span'ler
+ * aynı JSONL dosyasına (OTLP alan adlarıyla) satır başına bir kayıt olarak
+ * yazılır. Dosya verilmezse yalnızca kimlikler üretilir, hiçbir şey yazılmaz.
+ */
+class Span {
+  constructor(tracer, name, traceId, parentSpanId = null, attributes = {}) {
+    this.tracer = tracer;
+    this.name = name;
+    this.traceId = traceId;
+    this.spanId = crypto.randomBytes(8).toString('hex');
+    this.parentSpanId = parentSpanId;
+    this.attributes = { ...attributes };
+    this.startNs = Tracer.nowNs();
+    this.endNs = null;
+    this.status = 'ok';
+  }
+
+  setAttributes(attributes) {
+    Object.assign(this.attributes, attributes);
+    return this;
+  }
+
+  traceparent() {
+    return `00-${this.traceId}-${this.spanId}-01`;
+  }
+
+  /**
+   * Giden HTTP isteğine eklenecek izleme başlıkları
+   */
+  headers() {
+    return { traceparent: this.traceparent(), [REQUEST_ID_HEADER]: this.traceId };
+  }
+
+  child(name, attributes = {}) {
+    return this.tracer.startSpan(name, { parent: this, attributes });
+  }
+
+  end(error = null) {
+    if (this.endNs !== null) return;
+    this.endNs = Tracer.nowNs();
+    if (error) {
+      this.status = 'error';
+      this.attributes.error = error.message || String(error);
+    }
+    this.tracer.export(this);
+  }
+
+  toJSON() {
+    return {
+      traceId: this.traceId,
+      spanId: this.spanId,
+      parentSpanId: this.parentSpanId,
+      name: this.name,
+      service: this.tracer.service,
+      startTimeUnixNano: this.startNs.toString(),
+      endTimeUnixNano: this.endNs.toString(),
+      durationMs: Number((Number(this.endNs - this.startNs) / 1e6).toFixed(3)),
+      status: this.status,
+      attributes: this.attributes
+    };
+  }
+}
+
+class Tracer {
+  constructor(options = {}) {
+    this.service = options.service || 'node';
+    this.file = options.file || process.env.OCR_TRACE_FILE || null;
+    this.maxBytes = (options.maxMb || Number(process.env.OCR_TRACE_MAX_MB) || 50) * 1024 * 1024;
+  }
+
+  // Unix zamanı (ns) - BigInt; monotonik sayaçla ms altı çözünürlük
+  static nowNs() {
+    return Tracer.originNs + (process.hrtime.bigint() - Tracer.originHr);
+  }
+
+  get enabled() {
+    return Boolean(this.file);
+  }
+
+  startSpan(name, { parent = null, attributes = {} } = {}) {
+    const traceId = parent ? parent.traceId : crypto.randomBytes(16).toString('hex');
+    return new Span(this, name, traceId, parent ? parent.spanId : null, attributes);
+  }
+
+  /**
+   * fn'i span içinde çalıştır; hata olursa span hata durumuyla kapanır
+   */
+  async withSpan(name, options, fn) {
+    const span = this.startSpan(name, options);
+    try {
+      const result = await fn(span);
+      span.end();
+      return result;
+    } catch (error) {
+      span.end(error);
+      throw error;
+    }
+  }
+
+  export(span) {
+    if (!this.file) return;
+    try {
+      fs.mkdirSync(path.dirname(path.resolve(this.file)), { recursive: true });
+      if (this.maxBytes && fs.existsSync(this.file) && fs.statSync(this.file).size > this.maxBytes) {
+        fs.renameSync(this.file, `${this.file}.1`);
+      }
+      fs.appendFileSync(this.file, JSON.stringify(span) + '\n', 'utf-8');
+    } catch (e) {
+      // İzleme asla isteği bozmaz
+    }
+  }
+}
+
+Tracer.originNs = BigInt(Date.now()) * 1000000n;
+Tracer.originHr = process.hrtime.bigint();
+
+module.exports = { Tracer, Span, REQUEST_ID_HEADER };